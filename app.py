@@ -1,5 +1,7 @@
 import streamlit as st
-from src.database import load_data_from_db
+from src.database import load_data_from_db, load_filter_options, empty_dataset
+from src.database.aggregation import get_aggregation_mode
+from src.database.filter_index import get_filter_index, filter_frame
 from src.utils import parse_log_file, load_data_from_file
 from src.views import show_metrics, show_standard_view, show_developer_view
 from datetime import datetime
@@ -11,15 +13,21 @@ st.set_page_config(
     layout="wide"
 )
 
-def apply_filters(df):
-    """Применение фильтров к данным"""
+def select_filters(index):
+    """
+    Отображение фильтров и получение их состояния.
+
+    index — границы дат и списки значений: индекс фильтров загруженного
+    датасета (get_filter_index) или результат load_filter_options.
+    """
+    
     st.write("### Фильтры")
     col1, col2, col3 = st.columns(3)
     
     with col1:
         # Фильтр по датам
-        min_date = df['timestamp'].min().date()
-        max_date = df['timestamp'].max().date()
+        min_date = index['min_date']
+        max_date = index['max_date']
         start_date = st.date_input(
             "Период с",
             value=min_date,
@@ -35,7 +43,7 @@ def apply_filters(df):
     
     with col2:
         # Фильтр по категориям
-        categories = ['Все'] + list(df['category'].unique())
+        categories = ['Все'] + index['distinct']['category']
         selected_category = st.selectbox('Категория', categories)
         
         if selected_category == 'Учеба':
@@ -51,30 +59,43 @@ def apply_filters(df):
     
     with col3:
         # Фильтр по кампусам
-        campuses = ['Все'] + list(df['campus'].unique())
+        campuses = ['Все'] + index['distinct']['campus']
         selected_campus = st.selectbox('Кампус', campuses)
         
         # Фильтр по уровню образования
-        education_levels = ['Все'] + list(df['education_level'].unique())
+        education_levels = ['Все'] + index['distinct']['education_level']
         selected_education = st.selectbox('Уровень образования', education_levels)
     
-    # Применяем фильтры
-    mask = (df['timestamp'].dt.date >= start_date) & (df['timestamp'].dt.date <= end_date)
-    if selected_category != 'Все':
-        mask &= df['category'] == selected_category
-    if selected_subcategory != 'Все' and selected_category == 'Учеба':
-        mask &= df['subcategory'] == selected_subcategory
-    if selected_campus != 'Все':
-        mask &= df['campus'] == selected_campus
-    if selected_education != 'Все':
-        mask &= df['education_level'] == selected_education
-    
-    return df[mask]
+    # None означает, что фильтр не задан ("Все")
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'category': None if selected_category == 'Все' else selected_category,
+        'subcategory': (selected_subcategory
+                        if selected_subcategory != 'Все' and selected_category == 'Учеба'
+                        else None),
+        'campus': None if selected_campus == 'Все' else selected_campus,
+        'education_level': None if selected_education == 'Все' else selected_education
+    }
+
+def apply_filters(df, filters):
+    """Применение фильтров к данным"""
+    # Диапазон дат ищется бинарным поиском, остальные фильтры — пересечением битовых карт
+    return filter_frame(df, filters)
 
 def main():
-    # Загрузка данных
-    df = load_data_from_db()
-    if df.empty:
+    # В режимах pushdown и rollup строки в память не загружаются: для
+    # фильтров читаются только их значения, а представления считают
+    # агрегаты и читают страницы строк запросами к базе
+    pushdown = get_aggregation_mode() != 'pandas'
+    if pushdown:
+        index = load_filter_options()
+        has_data = index is not None and index['min_date'] is not None
+    else:
+        df = load_data_from_db()
+        has_data = not df.empty
+        index = get_filter_index(df) if has_data else None
+    if not has_data:
         st.error("Не удалось загрузить данные из базы данных")
         st.stop()
     
@@ -99,21 +120,26 @@ def main():
     st.session_state.page = selected_page
     
     # Фильтруем данные
-    filtered_df = apply_filters(df)
+    filters = select_filters(index)
+    if pushdown:
+        # Агрегаты и страницы строк представления читают из базы по фильтрам
+        filtered_df = empty_dataset()
+    else:
+        filtered_df = apply_filters(df, filters)
     
     # Отображаем контент в зависимости от выбранной страницы
     if st.session_state.page == 'main':
         st.title("📊 Основные метрики")
-        show_metrics(filtered_df)
+        show_metrics(filtered_df, filters=filters)
     elif st.session_state.page == 'success_rate':
         st.title("📈 Анализ успешности ответов")
-        show_standard_view(filtered_df)
+        show_standard_view(filtered_df, filters=filters)
     elif st.session_state.page == 'categories':
         st.title("🎓 Анализ категорий")
-        show_developer_view(filtered_df)
+        show_developer_view(filtered_df, filters=filters)
     elif st.session_state.page == 'response_time':
         st.title("⏱️ Анализ времени ответа")
-        show_standard_view(filtered_df, section='response_time')
+        show_standard_view(filtered_df, section='response_time', filters=filters)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,28 @@
+import argparse
+from src.database.pool import connect
+from src.ingest import ensure_error_type, backfill_error_types
+
+def main():
+    parser = argparse.ArgumentParser(description='Классификация неудовлетворительных ответов chatbot_logs по типу ошибки')
+    parser.add_argument('--all', action='store_true',
+                        help='пересчитать типы всех ответов (например, после изменения правил)')
+    args = parser.parse_args()
+
+    conn = None
+    try:
+        conn = connect()
+        with conn.cursor() as cur:
+            # Новая колонка заполняется сразу, иначе — только пропущенные строки
+            updated = ensure_error_type(cur) or backfill_error_types(cur, reclassify=args.all)
+        conn.commit()
+        print(f"Обновлено строк: {updated}")
+    except Exception as e:
+        print(f"Ошибка: {str(e)}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import sys
+from benchmarks.results import load_results
+
+# Сравнение двух файлов результатов (например, до и после изменения):
+#
+#   python -m benchmarks.compare results/dashboard-abc123.json results/dashboard-def456.json
+#
+# Код возврата 1, если какой-то замер стал медленнее порога.
+
+def compare(baseline, current, threshold=1.2):
+    """
+    Отношение медианного времени замеров current к baseline.
+
+    Сравниваются замеры с одинаковыми name и rows.
+
+    Returns:
+        list: (name, rows, время baseline, время current, отношение, замедление)
+    """
+    previous = {(result['name'], result['rows']): result['median'] for result in baseline['results']}
+    rows = []
+    for result in current['results']:
+        key = (result['name'], result['rows'])
+        if key not in previous:
+            continue
+        ratio = result['median'] / previous[key] if previous[key] else float('inf')
+        rows.append((*key, previous[key], result['median'], ratio, ratio > threshold))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Сравнение результатов замеров между коммитами')
+    parser.add_argument('baseline', help='файл результатов до изменения')
+    parser.add_argument('current', help='файл результатов после изменения')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='допустимое отношение времени (по умолчанию 1.2)')
+    args = parser.parse_args()
+
+    baseline = load_results(args.baseline)
+    current = load_results(args.current)
+    print(f"{baseline.get('commit')} -> {current.get('commit')}")
+    rows = compare(baseline, current, args.threshold)
+    for name, size, before, after, ratio, slower in rows:
+        mark = '  медленнее' if slower else ''
+        print(f"{name:<28} {size:>10} {before * 1000:>10.1f} мс {after * 1000:>10.1f} мс {ratio:>6.2f}x{mark}")
+    if any(row[-1] for row in rows):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
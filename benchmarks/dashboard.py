@@ -0,0 +1,133 @@
+import argparse
+import gc
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from src.database.schema import compact_frame, format_time_offsets
+from src.database.filter_index import build_filter_index, filter_frame
+from src.database.aggregation import aggregate
+from src.database.pagination import PAGE_SIZE, _frame_page
+from src.ingest.classifier import classify_errors
+from src.views.standard import calculate_response_time
+from benchmarks.results import parse_size, time_call, write_results
+from benchmarks.synthetic import generate_rows, generate_responses
+
+# Замеры обработки данных дашборда без базы и без отрисовки Streamlit:
+# подготовка загруженных строк (compact_frame), индекс и применение
+# фильтров, расчет времени ответа, классификация ошибок и агрегации
+# каждой страницы в режиме 'pandas'.
+#
+#   python -m benchmarks.dashboard --sizes 10k 100k 1M 10M
+
+DEFAULT_SIZES = ['10k', '100k', '1M', '10M']
+
+# Агрегации страниц: (измерения, метрики, условия) — те же вызовы aggregate,
+# что делают представления в src/views
+VIEW_AGGREGATIONS = {
+    'metrics': [
+        ([], ['count', 'error_count', 'satisfied_count', 'avg_response_time'], None),
+        (['category'], ['count'], None)
+    ],
+    'standard': [
+        (['campus'], ['count'], None),
+        (['category'], ['count', 'error_count'], None)
+    ],
+    'response_time': [
+        # Группировка по часам выбрана на странице по умолчанию
+        (['hour'], ['avg_response_time', 'count'], None),
+        ([], ['avg_response_time', 'median_response_time', 'min_response_time', 'max_response_time'], None),
+        (['category'], ['avg_response_time'], None)
+    ],
+    'developer': [
+        (['category'], ['count', 'success_rate'], None),
+        (['subcategory'], ['count', 'success_rate'], {'category': 'Учеба'}),
+        (['hour'], ['count', 'success_rate'], None),
+        (['date', 'hour'], ['count'], None)
+    ],
+    'error_analysis': [
+        (['error_type'], ['count'], {'satisfaction': 0})
+    ]
+}
+
+def filter_sets(df):
+    """Типичные состояния фильтров: весь период, одна категория, несколько фильтров, месяц"""
+    start = df['timestamp'].iloc[0].date()
+    end = df['timestamp'].iloc[-1].date()
+    empty = {'category': None, 'subcategory': None, 'campus': None, 'education_level': None}
+    return {
+        'all': {'start_date': start, 'end_date': end, **empty},
+        'category': {'start_date': start, 'end_date': end, **empty, 'category': 'Учеба'},
+        'combined': {
+            'start_date': start, 'end_date': end, **empty,
+            'category': 'Учеба', 'subcategory': 'ГИА', 'campus': 'Москва', 'education_level': 'Бакалавриат'
+        },
+        'month': {'start_date': end - timedelta(days=30), 'end_date': end, **empty, 'campus': 'Пермь'}
+    }
+
+def run_view(df, aggregations):
+    """Все агрегации страницы по очереди"""
+    for dimensions, metrics, conditions in aggregations:
+        aggregate(df, dimensions, metrics, conditions=conditions, mode='pandas')
+
+def benchmark_size(rows, repeat, seed=0):
+    """
+    Замеры для одного размера данных.
+
+    Returns:
+        list: замеры {name, rows, min, median, max, timings, rows_per_second}
+    """
+    results = []
+
+    def record(name, timing):
+        rate = rows / timing['median'] if timing['median'] else None
+        results.append({'name': name, 'rows': rows, **timing, 'rows_per_second': rate})
+        print(f"{rows:>10} {name:<28} {timing['median'] * 1000:>10.1f} мс")
+
+    raw = generate_rows(rows, seed)
+    record('compact_frame', time_call(lambda: compact_frame(raw), repeat))
+    df = compact_frame(raw)
+    del raw
+    gc.collect()
+
+    record('build_filter_index', time_call(lambda: build_filter_index(df), repeat))
+    for name, filters in filter_sets(df).items():
+        # Первый вызов строит индекс, дальше замеряется только выборка строк
+        filter_frame(df, filters)
+        record(f'apply_filters[{name}]', time_call(lambda: filter_frame(df, filters), repeat))
+
+    # Время ответа считается для источников без колонки response_time
+    # (например, загруженного файла), где время вопроса и ответа — строки
+    # ЧЧ:ММ:СС; строки берутся из общего набора, чтобы не занимать лишнюю память
+    clock = format_time_offsets(pd.Series(np.arange(86400))).to_numpy()
+    times = pd.DataFrame({column: clock[df[column].to_numpy()] for column in ['question_time', 'answer_time']})
+    record('calculate_response_time', time_call(calculate_response_time, repeat, setup=times.copy))
+    del times
+
+    responses = generate_responses(df['satisfaction'], seed)
+    record('classify_errors', time_call(lambda: classify_errors(responses, df['satisfaction']), repeat))
+    del responses
+
+    for view, aggregations in VIEW_AGGREGATIONS.items():
+        record(f'view[{view}]', time_call(lambda: run_view(df, aggregations), repeat))
+    record('detail_page', time_call(lambda: _frame_page(df, None, PAGE_SIZE), repeat))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Замеры обработки данных дашборда на синтетических логах')
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES,
+                        help='размеры данных, например 10k 100k 1M 10M')
+    parser.add_argument('--repeat', type=int, default=3, help='число повторов каждого замера')
+    parser.add_argument('--seed', type=int, default=0, help='зерно генератора данных')
+    parser.add_argument('--output', help='файл результатов (по умолчанию benchmarks/results/dashboard-<коммит>.json)')
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes]
+    results = []
+    for rows in sizes:
+        results += benchmark_size(rows, args.repeat, args.seed)
+        gc.collect()
+    path = write_results('dashboard', results, args.output, sizes=sizes, repeat=args.repeat, seed=args.seed)
+    print(f"Результаты записаны в {path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from config import DB_CONFIG
+from src.database.pool import configure_pool, connect, connect_direct
+from benchmarks.results import memory_usage_mb, parse_size, write_results
+from benchmarks.synthetic import write_log_file, write_csv_file
+
+# Замеры скорости загрузки для всех способов импорта:
+#   load_logs_to_db        — лог-файл, одна вставка на строку (load_logs.py)
+#   transfer_data          — лог-файл, вставка пачками (db_transfer.py)
+#   transfer_data_parallel — то же с разбором в нескольких процессах
+#   load_csv_to_db         — выгрузка CSV через COPY или execute_batch (load_logs.py)
+#
+# Каждый запуск идет в отдельном процессе и в новой временной базе на
+# сервере из DB_CONFIG (база удаляется после запуска), поэтому пиковая
+# память процесса и время не зависят от предыдущих запусков.
+#
+#   python -m benchmarks.ingest --rows 100k --batch-sizes 100 1000 5000
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INIT_SQL = os.path.join(REPO_DIR, 'init.sql')
+
+# Функции, время в которых считается разбором и записью, для каждого способа
+# (модуль, имя функции); остальное время — чтение файла и служебные запросы
+TIMED_FUNCTIONS = {
+    'load_logs_to_db': {
+        'parse': [('load_logs', 'parse_log_line')],
+        'write': [('load_logs', 'execute_values')]
+    },
+    'transfer_data': {
+        'parse': [('db_transfer', 'parse_log_line')],
+        'write': [('db_transfer', 'insert_batch')]
+    },
+    # Разбор идет в дочерних процессах и здесь не замеряется
+    'transfer_data_parallel': {
+        'parse': [],
+        'write': [('db_transfer', 'insert_batch')]
+    },
+    'load_csv_to_db': {
+        'parse': [('load_logs', 'prepare_csv_frame')],
+        'write': [('load_logs', '_write_rows'), ('load_logs', 'insert_new_from_staging')]
+    }
+}
+
+def _timed(function, totals, kind, lock):
+    """Обертка, суммирующая время вызовов function в totals[kind]"""
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            with lock:
+                totals[kind] += time.perf_counter() - started
+    return wrapper
+
+def _prepare_schema(path):
+    """Таблица chatbot_logs в схеме, которую ожидает способ загрузки"""
+    conn = connect()
+    try:
+        if path == 'load_csv_to_db':
+            with open(INIT_SQL, encoding='utf-8') as file:
+                script = file.read().replace('\\c chatbot_metrics;', '')
+            with conn.cursor() as cur:
+                cur.execute(script)
+            conn.commit()
+        elif path == 'load_logs_to_db':
+            from db_transfer import create_table
+            create_table(conn)
+    finally:
+        conn.close()
+
+def run_case(path, options, source):
+    """
+    Загрузка файла source одним способом (выполняется в дочернем процессе).
+
+    Returns:
+        dict: общее время, время разбора, записи и остальное, число строк
+            в таблице и пиковая память процесса загрузки
+    """
+    import importlib
+    configure_pool(size=options.get('writers', 1) + 1, statement_timeout_ms=0)
+    _prepare_schema(path)
+
+    totals = {'parse': 0.0, 'write': 0.0}
+    lock = threading.Lock()
+    for kind, functions in TIMED_FUNCTIONS[path].items():
+        for module_name, name in functions:
+            module = importlib.import_module(module_name)
+            setattr(module, name, _timed(getattr(module, name), totals, kind, lock))
+
+    started = time.perf_counter()
+    if path == 'load_logs_to_db':
+        from load_logs import load_logs_to_db
+        load_logs_to_db(source, incremental=False)
+    elif path in ('transfer_data', 'transfer_data_parallel'):
+        from db_transfer import transfer_data
+        transfer_data(source, incremental=False, **options)
+    else:
+        from load_logs import load_csv_to_db
+        load_csv_to_db(source, incremental=False, **options)
+    seconds = time.perf_counter() - started
+
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM chatbot_logs")
+            inserted = cur.fetchone()[0]
+    finally:
+        conn.close()
+
+    parse = totals['parse'] if TIMED_FUNCTIONS[path]['parse'] else None
+    return {
+        'seconds': seconds,
+        'parse_seconds': parse,
+        'write_seconds': totals['write'],
+        'other_seconds': seconds - (parse or 0.0) - totals['write'],
+        'inserted': inserted,
+        'peak_rss_mb': memory_usage_mb()[1]
+    }
+
+def _admin(statement):
+    """Служебная команда на базе postgres (создание и удаление временной базы)"""
+    conn = connect_direct(dbname='postgres')
+    try:
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            cur.execute(statement)
+    finally:
+        conn.close()
+
+def run_isolated(path, options, source, workdir):
+    """
+    Запуск способа загрузки в отдельном процессе и временной базе.
+
+    Returns:
+        dict: результат run_case
+    """
+    database = f"chatbot_bench_{os.getpid()}"
+    result_file = os.path.join(workdir, 'result.json')
+    _admin(f"DROP DATABASE IF EXISTS {database}")
+    _admin(f"CREATE DATABASE {database}")
+    try:
+        process = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.ingest', '--run-case',
+             json.dumps({'path': path, 'options': options, 'source': source, 'result': result_file})],
+            cwd=workdir,
+            env={**os.environ, 'DB_NAME': database, 'PYTHONPATH': REPO_DIR},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        if process.returncode != 0:
+            raise RuntimeError(process.stderr.strip().splitlines()[-1])
+        with open(result_file, encoding='utf-8') as file:
+            result = json.load(file)
+        return result
+    finally:
+        _admin(f"DROP DATABASE IF EXISTS {database} WITH (FORCE)")
+
+def build_cases(batch_sizes, chunk_sizes, workers, methods):
+    """Список запусков (способ, параметры) для всех способов загрузки и размеров пачек"""
+    cases = [('load_logs_to_db', {})]
+    cases += [('transfer_data', {'batch_size': size}) for size in batch_sizes]
+    if workers > 1:
+        cases += [
+            ('transfer_data_parallel', {'batch_size': size, 'workers': workers, 'writers': workers})
+            for size in batch_sizes
+        ]
+    cases += [
+        ('load_csv_to_db', {'method': method, 'chunk_size': size})
+        for method in methods for size in chunk_sizes
+    ]
+    return cases
+
+def case_name(path, options):
+    """Имя замера, например transfer_data[batch_size=1000]"""
+    if not options:
+        return path
+    return f"{path}[{','.join(f'{key}={value}' for key, value in options.items())}]"
+
+def summarize(path, options, rows, runs):
+    """Замер по нескольким запускам одного способа: медианы времени, максимум памяти"""
+    seconds = [run['seconds'] for run in runs]
+    median = statistics.median(seconds)
+
+    def median_of(key):
+        values = [run[key] for run in runs if run[key] is not None]
+        return statistics.median(values) if values else None
+
+    return {
+        'name': case_name(path, options),
+        'path': path,
+        'options': options,
+        'rows': rows,
+        'inserted': runs[-1]['inserted'],
+        'min': min(seconds),
+        'median': median,
+        'max': max(seconds),
+        'timings': seconds,
+        'rows_per_second': rows / median if median else None,
+        'parse_seconds': median_of('parse_seconds'),
+        'write_seconds': median_of('write_seconds'),
+        'other_seconds': median_of('other_seconds'),
+        # Для transfer_data_parallel — память основного процесса, без процессов разбора
+        'peak_rss_mb': max(run['peak_rss_mb'] for run in runs)
+    }
+
+def print_report(results):
+    """Таблица результатов по убыванию скорости"""
+    print(f"\n{'способ':<60} {'строк/с':>10} {'разбор':>8} {'запись':>8} {'прочее':>8} {'RSS, МБ':>8}")
+    for result in sorted(results, key=lambda item: -(item['rows_per_second'] or 0)):
+        share = {
+            key: '—' if result[key] is None else f"{result[key] / result['median'] * 100:.0f}%"
+            for key in ('parse_seconds', 'write_seconds', 'other_seconds')
+        }
+        print(f"{result['name']:<60} {result['rows_per_second']:>10.0f} {share['parse_seconds']:>8} "
+              f"{share['write_seconds']:>8} {share['other_seconds']:>8} {result['peak_rss_mb']:>8.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Замеры скорости загрузки логов в PostgreSQL всеми способами')
+    parser.add_argument('--rows', default='20k', help='число строк в синтетических файлах (например 20k, 1M)')
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[100, 1000, 5000],
+                        help='размеры пачек db_transfer')
+    parser.add_argument('--chunk-sizes', nargs='+', type=int, default=[5000, 50000],
+                        help='размеры пачек load_csv_to_db')
+    parser.add_argument('--methods', nargs='+', default=['copy', 'batch'], choices=['copy', 'batch'],
+                        help='способы записи load_csv_to_db')
+    parser.add_argument('--workers', type=int, default=2,
+                        help='число процессов разбора transfer_data_parallel (1 — не запускать)')
+    parser.add_argument('--paths', nargs='+', choices=list(TIMED_FUNCTIONS),
+                        help='запускать только эти способы')
+    parser.add_argument('--repeat', type=int, default=1, help='число запусков каждого способа')
+    parser.add_argument('--seed', type=int, default=0, help='зерно генератора данных')
+    parser.add_argument('--output', help='файл результатов (по умолчанию benchmarks/results/ingest-<коммит>.json)')
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        case = json.loads(args.run_case)
+        result = run_case(case['path'], case['options'], case['source'])
+        with open(case['result'], 'w', encoding='utf-8') as file:
+            json.dump(result, file)
+        return
+
+    rows = parse_size(args.rows)
+    cases = build_cases(args.batch_sizes, args.chunk_sizes, args.workers, args.methods)
+    if args.paths:
+        cases = [case for case in cases if case[0] in args.paths]
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='ingest-bench-') as workdir:
+        sources = {
+            'log': os.path.join(workdir, 'chatbot.log'),
+            'csv': os.path.join(workdir, 'chatbotlog.csv')
+        }
+        write_log_file(sources['log'], rows, args.seed)
+        write_csv_file(sources['csv'], rows, args.seed)
+        print(f"Сервер {DB_CONFIG['host']}:{DB_CONFIG['port']}, {rows} строк")
+
+        for path, options in cases:
+            source = sources['csv' if path == 'load_csv_to_db' else 'log']
+            try:
+                runs = [run_isolated(path, options, source, workdir) for _ in range(args.repeat)]
+            except Exception as e:
+                print(f"{case_name(path, options)}: ошибка {e}")
+                continue
+            result = summarize(path, options, rows, runs)
+            if result['inserted'] != rows:
+                print(f"{result['name']}: загружено {result['inserted']} строк из {rows}")
+            print(f"{result['name']:<60} {result['median']:>8.2f} с {result['rows_per_second']:>10.0f} строк/с")
+            results.append(result)
+
+    print_report(results)
+    path = write_results('ingest', results, args.output, rows=rows, repeat=args.repeat, seed=args.seed,
+                         server=f"{DB_CONFIG['host']}:{DB_CONFIG['port']}")
+    print(f"Результаты записаны в {path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+# Результаты замеров пишутся в JSON: метаданные запуска (коммит, версии
+# библиотек, машина) и список замеров {name, rows, min, median, max, ...},
+# который сравнивает benchmarks/compare.py.
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+def parse_size(value):
+    """Размер вида 10k, 1M или 2500 в число строк"""
+    multipliers = {'k': 1_000, 'm': 1_000_000}
+    value = value.strip().lower()
+    if value[-1] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(value)
+
+def time_call(function, repeat=3, setup=None):
+    """
+    Время выполнения функции в секундах за repeat запусков.
+
+    Args:
+        function: функция; получает результат setup(), если он задан
+        repeat: число запусков
+        setup: подготовка аргумента перед каждым запуском (не замеряется)
+
+    Returns:
+        dict: min, median и max времени и список всех замеров
+    """
+    timings = []
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        started = time.perf_counter()
+        function(argument) if setup else function()
+        timings.append(time.perf_counter() - started)
+    return {
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'max': max(timings),
+        'timings': timings
+    }
+
+def memory_usage_mb():
+    """
+    Текущая (VmRSS) и пиковая (VmHWM) память процесса в МБ.
+
+    Пик берется из /proc, а не из ru_maxrss: ru_maxrss после fork и exec
+    наследует пик родительского процесса.
+
+    Returns:
+        tuple: (текущая, пиковая); (None, None), если /proc недоступен
+    """
+    usage = {}
+    try:
+        with open('/proc/self/status', encoding='utf-8') as file:
+            for line in file:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'VmHWM'):
+                    usage[key] = int(value.split()[0]) / 1024
+    except OSError:
+        pass
+    return usage.get('VmRSS'), usage.get('VmHWM')
+
+def _git_commit():
+    """Текущий коммит репозитория (None, если git недоступен)"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_metadata():
+    """Метаданные запуска для сравнения результатов между коммитами"""
+    import numpy as np
+    import pandas as pd
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count()
+    }
+
+def write_results(suite, results, path=None, **parameters):
+    """
+    Записывает результаты замеров в JSON.
+
+    Args:
+        suite: имя набора замеров
+        results: список замеров
+        path: файл результатов (по умолчанию results/<suite>-<коммит>.json)
+        parameters: параметры запуска (размеры, число повторов и т.п.)
+
+    Returns:
+        str: путь к записанному файлу
+    """
+    metadata = run_metadata()
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{suite}-{metadata['commit'] or 'local'}.json")
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({
+            'suite': suite,
+            **metadata,
+            'parameters': parameters,
+            'results': results
+        }, file, ensure_ascii=False, indent=2)
+    return path
+
+def load_results(path):
+    """Читает файл результатов"""
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
@@ -0,0 +1,240 @@
+import argparse
+import gc
+import os
+import threading
+import time
+from datetime import timedelta
+import numpy as np
+from streamlit.testing.v1 import AppTest
+from config import AGGREGATION_MODE, DB_CONFIG
+from src.database import get_cache_stats, get_pool_stats
+from benchmarks.results import memory_usage_mb, write_results
+
+# Нагрузочный тест дашборда: N сессий одновременно открывают app.py через
+# streamlit.testing (без браузера и сервера), переключают страницы и
+# фильтры с паузами, как пользователи, и для каждого N замеряется время
+# перезапуска скрипта, память процесса и число запросов к базе.
+#
+#   python -m benchmarks.sessions --sessions 1 5 10 20 --actions 10 --think 1
+#
+# Все сессии работают в одном процессе, как на сервере Streamlit, и делят
+# кэш данных и пул соединений. AppTest подменяет глобальный Runtime на
+# время запуска, поэтому сами перезапуски выполняются по очереди; время
+# ожидания очереди входит в задержку, как ожидание занятого процессора.
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+PAGES = ['main', 'success_rate', 'categories', 'response_time']
+
+# Действия пользователя и их доли
+ACTIONS = {
+    'navigate': 0.35,
+    'category': 0.25,
+    'campus': 0.15,
+    'education_level': 0.1,
+    'period': 0.1,
+    'reset': 0.05
+}
+
+FILTER_LABELS = {
+    'category': 'Категория',
+    'campus': 'Кампус',
+    'education_level': 'Уровень образования'
+}
+
+PERCENTILES = [50, 90, 95, 99]
+
+_run_lock = threading.Lock()
+
+def _selectbox(at, label):
+    """Выпадающий список по подписи"""
+    return next(widget for widget in at.selectbox if widget.label == label)
+
+def _date_input(at, label):
+    """Поле даты по подписи"""
+    return next(widget for widget in at.date_input if widget.label == label)
+
+def apply_action(at, action, rng, first_date):
+    """
+    Меняет виджеты сессии at для действия action (без перезапуска).
+
+    Args:
+        at: AppTest сессии после хотя бы одного запуска
+        action: ключ ACTIONS
+        rng: генератор случайных чисел сессии
+        first_date: начало периода по умолчанию (фильтр «Период с»)
+    """
+    if action == 'navigate':
+        navigation = _selectbox(at, 'Навигация')
+        navigation.set_value(str(rng.choice([page for page in PAGES if page != navigation.value])))
+    elif action in FILTER_LABELS:
+        widget = _selectbox(at, FILTER_LABELS[action])
+        widget.set_value(str(rng.choice(widget.options)))
+    elif action == 'period':
+        # Последние 7–90 дней или снова весь период
+        end_date = _date_input(at, 'По').value
+        start = _date_input(at, 'Период с')
+        if start.value == first_date:
+            start.set_value(max(first_date, end_date - timedelta(days=int(rng.integers(7, 91)))))
+        else:
+            start.set_value(first_date)
+    else:
+        for label in FILTER_LABELS.values():
+            _selectbox(at, label).set_value('Все')
+        _date_input(at, 'Период с').set_value(first_date)
+
+def timed_run(at, timeout):
+    """
+    Перезапуск сессии с замером ожидания очереди, выполнения и числа запросов.
+
+    Перезапуски идут по одному, поэтому разница счетчика запросов пула
+    относится только к этому перезапуску.
+    """
+    requested = time.perf_counter()
+    with _run_lock:
+        started = time.perf_counter()
+        queries = get_pool_stats()['queries']
+        at.run(timeout=timeout)
+        finished = time.perf_counter()
+        queries = get_pool_stats()['queries'] - queries
+    return {
+        'wait': started - requested,
+        'run': finished - started,
+        'latency': finished - requested,
+        'queries': queries,
+        'error': bool(at.exception) or len(at.error) > 0
+    }
+
+def run_session(index, actions, think, seed, timeout, reruns):
+    """
+    Одна пользовательская сессия: открытие дашборда и actions действий
+    с паузами (экспоненциальное распределение со средним think секунд).
+    Замеры перезапусков добавляются в reruns.
+    """
+    rng = np.random.default_rng(seed + index)
+    names = list(ACTIONS)
+    weights = np.array(list(ACTIONS.values()))
+
+    # Пользователи заходят не одновременно
+    time.sleep(rng.uniform(0, think))
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    reruns.append({'session': index, 'action': 'open', **timed_run(at, timeout)})
+    if at.exception or not at.date_input:
+        return
+    first_date = _date_input(at, 'Период с').value
+
+    for _ in range(actions):
+        time.sleep(rng.exponential(think))
+        action = names[rng.choice(len(names), p=weights / weights.sum())]
+        apply_action(at, action, rng, first_date)
+        reruns.append({'session': index, 'action': action, **timed_run(at, timeout)})
+        if at.exception:
+            return
+
+def _sample_rss(stop, samples, interval=0.2):
+    """Замер текущей памяти процесса, пока не установлен stop"""
+    while not stop.wait(interval):
+        samples.append(memory_usage_mb()[0])
+
+def run_level(sessions, actions, think, seed, timeout):
+    """
+    Нагрузка из sessions одновременных сессий.
+
+    Returns:
+        dict: задержки перезапусков (перцентили), время в очереди и
+        выполнения, память процесса и число запросов к базе
+    """
+    gc.collect()
+    rss_before = memory_usage_mb()[0]
+    queries_before = get_pool_stats()['queries']
+    reruns = []
+    samples = []
+    stop = threading.Event()
+    sampler = threading.Thread(target=_sample_rss, args=(stop, samples), daemon=True)
+    sampler.start()
+
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=run_session, args=(index, actions, think, seed, timeout, reruns))
+        for index in range(sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+    stop.set()
+    sampler.join()
+
+    latency = np.array([rerun['latency'] for rerun in reruns])
+    run = np.array([rerun['run'] for rerun in reruns])
+    wait = np.array([rerun['wait'] for rerun in reruns])
+    queries = get_pool_stats()['queries'] - queries_before
+    return {
+        'name': 'rerun',
+        # Масштаб замера для benchmarks.compare — число сессий
+        'rows': sessions,
+        'sessions': sessions,
+        'reruns': len(reruns),
+        'errors': sum(rerun['error'] for rerun in reruns),
+        'min': float(latency.min()),
+        'median': float(np.median(latency)),
+        'max': float(latency.max()),
+        **{f'p{p}': float(np.percentile(latency, p)) for p in PERCENTILES},
+        'run_median': float(np.median(run)),
+        'run_p95': float(np.percentile(run, 95)),
+        'wait_p95': float(np.percentile(wait, 95)),
+        'reruns_per_second': len(reruns) / duration,
+        'queries': queries,
+        'queries_per_rerun': queries / len(reruns),
+        'rss_before_mb': rss_before,
+        'rss_peak_mb': max(samples + [memory_usage_mb()[0]]),
+        'rss_after_mb': memory_usage_mb()[0],
+        'actions': {
+            action: float(np.median([rerun['latency'] for rerun in reruns if rerun['action'] == action]))
+            for action in {rerun['action'] for rerun in reruns}
+        }
+    }
+
+def print_report(results):
+    """Таблица результатов по числу сессий"""
+    print(f"\n{'сессий':>7} {'перезапусков':>13} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9} "
+          f"{'запросов':>9} {'на запуск':>10} {'RSS, МБ':>8} {'ошибок':>7}")
+    for result in results:
+        print(f"{result['sessions']:>7} {result['reruns']:>13} {result['p50'] * 1000:>9.0f} "
+              f"{result['p95'] * 1000:>9.0f} {result['p99'] * 1000:>9.0f} {result['queries']:>9} "
+              f"{result['queries_per_rerun']:>10.1f} {result['rss_peak_mb']:>8.0f} {result['errors']:>7}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочный тест дашборда: несколько сессий Streamlit одновременно')
+    parser.add_argument('--sessions', nargs='+', type=int, default=[1, 5, 10, 20],
+                        help='числа одновременных сессий')
+    parser.add_argument('--actions', type=int, default=10, help='число действий в каждой сессии')
+    parser.add_argument('--think', type=float, default=1.0, help='средняя пауза между действиями, с')
+    parser.add_argument('--timeout', type=float, default=120, help='предельное время одного перезапуска, с')
+    parser.add_argument('--seed', type=int, default=0, help='зерно генератора действий')
+    parser.add_argument('--output', help='файл результатов (по умолчанию benchmarks/results/sessions-<коммит>.json)')
+    args = parser.parse_args()
+
+    # Первый запуск загружает данные в общий кэш процесса
+    print(f"Режим {AGGREGATION_MODE}, база {DB_CONFIG['dbname']} на {DB_CONFIG['host']}:{DB_CONFIG['port']}")
+    cold = timed_run(AppTest.from_file(APP_PATH, default_timeout=args.timeout), args.timeout)
+    print(f"Первый запуск: {cold['run']:.2f} с, запросов {cold['queries']}, RSS {memory_usage_mb()[0]:.0f} МБ")
+
+    results = []
+    for sessions in args.sessions:
+        result = run_level(sessions, args.actions, args.think, args.seed, args.timeout)
+        print(f"{sessions:>4} сессий: p50 {result['p50'] * 1000:.0f} мс, p95 {result['p95'] * 1000:.0f} мс, "
+              f"RSS {result['rss_peak_mb']:.0f} МБ")
+        results.append(result)
+
+    print_report(results)
+    path = write_results(
+        'sessions', results, args.output,
+        mode=AGGREGATION_MODE, actions=args.actions, think=args.think, seed=args.seed,
+        cold_start=cold, cache=get_cache_stats()
+    )
+    print(f"Результаты записаны в {path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+from src.database.schema import format_time_offsets
+from src.ingest.classifier import ERROR_TYPE_RULES
+from load_logs import CSV_COLUMNS
+
+# Синтетические логи в форме строк chatbot_logs (как их возвращает
+# _fetch_rows) с распределениями, близкими к реальным: большая часть
+# запросов из Москвы и бакалавриата, учебные вопросы преобладают, днем
+# запросов больше, чем ночью.
+
+CAMPUSES = {
+    'Москва': 0.55,
+    'Санкт-Петербург': 0.2,
+    'Нижний Новгород': 0.15,
+    'Пермь': 0.1
+}
+
+EDUCATION_LEVELS = {
+    'Бакалавриат': 0.65,
+    'Магистратура': 0.3,
+    'Аспирантура': 0.05
+}
+
+CATEGORIES = {
+    'Учеба': 0.55,
+    'Общежитие': 0.15,
+    'Финансы': 0.15,
+    'Другое': 0.15
+}
+
+# Подкатегории учебных запросов (см. select_filters в app.py)
+SUBCATEGORIES = {
+    'Учебный процесс': 0.3,
+    'Практическая подготовка': 0.12,
+    'ГИА': 0.1,
+    'Траектория обучения': 0.1,
+    'Английский язык': 0.08,
+    'Цифровые компетенции': 0.07,
+    'Перемещения / Изменение статуса студента': 0.06,
+    'онлайн-обучение': 0.06,
+    'Дополнительное образование': 0.05,
+    'ОВЗ': 0.03,
+    'Выпускникам': 0.03
+}
+
+# Доля запросов по часам суток (пик днем)
+HOUR_WEIGHTS = np.array([
+    1, 1, 1, 1, 1, 1, 2, 4, 8, 12, 14, 14, 13, 13, 14, 14, 13, 12, 10, 9, 8, 6, 4, 2
+], dtype=float)
+
+SATISFACTION_RATE = 0.75
+USERS = 5000
+DAYS = 365
+START_DATE = '2025-01-01'
+
+# Число различных текстов ответов: ответы бота в основном повторяются
+RESPONSE_TEMPLATES = 400
+
+def _choice(rng, weights, size):
+    """Выбор значений словаря {значение: вес} с учетом весов (object-массив)"""
+    values = np.array(list(weights), dtype=object)
+    probabilities = np.array(list(weights.values()), dtype=float)
+    return values[rng.choice(len(values), size=size, p=probabilities / probabilities.sum())]
+
+def generate_rows(rows, seed=0):
+    """
+    Синтетические строки в форме результата _fetch_rows.
+
+    Строки упорядочены по дате и времени вопроса, как при загрузке из базы;
+    колонки измерений — строки (object), дата — datetime.date.
+
+    Args:
+        rows: число строк
+        seed: зерно генератора случайных чисел
+
+    Returns:
+        DataFrame с колонками ROW_COLUMNS_SQL
+    """
+    rng = np.random.default_rng(seed)
+    days = np.sort(rng.integers(0, DAYS, rows))
+    hours = rng.choice(24, size=rows, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+    question_time = (hours * 3600 + rng.integers(0, 3600, rows)).astype('int64')
+    # Сортировка по времени внутри дня
+    order = np.lexsort((question_time, days))
+    days = days[order]
+    question_time = question_time[order]
+
+    # Время ответа: логнормальное с медианой около двух секунд
+    response_time = np.round(rng.lognormal(mean=0.7, sigma=0.6, size=rows)).astype('int64') + 1
+    answer_time = (question_time + response_time) % 86400
+
+    category = _choice(rng, CATEGORIES, rows)
+    subcategory = np.full(rows, None, dtype=object)
+    study = category == 'Учеба'
+    subcategory[study] = _choice(rng, SUBCATEGORIES, int(study.sum()))
+
+    satisfaction = (rng.random(rows) < SATISFACTION_RATE).astype('int64')
+    error_type = np.full(rows, None, dtype=object)
+    failed = satisfaction == 0
+    types = np.array([name for name, _ in ERROR_TYPE_RULES] + ['Другие ошибки'], dtype=object)
+    error_type[failed] = types[rng.choice(len(types), size=int(failed.sum()), p=[0.2, 0.2, 0.2, 0.4])]
+
+    names = np.array([f'Пользователь {i}' for i in range(USERS)], dtype=object)
+    dates = (pd.Timestamp(START_DATE) + pd.to_timedelta(days, unit='D'))
+
+    return pd.DataFrame({
+        'id': np.arange(1, rows + 1, dtype='int64'),
+        'date': dates.date,
+        'question_time': question_time,
+        'answer_time': answer_time,
+        'name': names[rng.integers(0, USERS, rows)],
+        'campus': _choice(rng, CAMPUSES, rows),
+        'education_level': _choice(rng, EDUCATION_LEVELS, rows),
+        'category': category,
+        'subcategory': subcategory,
+        'satisfaction': satisfaction,
+        'response_time': ((answer_time - question_time) % 86400).astype('float64'),
+        'error_type': error_type
+    })
+
+def generate_responses(satisfaction, seed=0):
+    """
+    Тексты ответов бота для строк с оценками satisfaction.
+
+    Неудовлетворительные ответы берутся из RESPONSE_TEMPLATES шаблонов,
+    часть которых содержит фразы правил классификации ошибок.
+    """
+    rng = np.random.default_rng(seed)
+    phrases = [phrases[0] for _, phrases in ERROR_TYPE_RULES] + ['не удалось найти ответ']
+    failed_templates = np.array([
+        f"К сожалению, {phrases[i % len(phrases)]}. Попробуйте переформулировать вопрос (вариант {i})"
+        for i in range(RESPONSE_TEMPLATES)
+    ], dtype=object)
+    success_templates = np.array([
+        f"Ответ на вопрос по теме {i}: подробности на портале"
+        for i in range(RESPONSE_TEMPLATES)
+    ], dtype=object)
+    satisfaction = np.asarray(satisfaction)
+    picks = rng.integers(0, RESPONSE_TEMPLATES, len(satisfaction))
+    return pd.Series(np.where(satisfaction == 0, failed_templates[picks], success_templates[picks]))
+
+def _text_columns(rows, seed):
+    """Даты, время и тексты запросов и ответов для файлов-источников"""
+    frame = generate_rows(rows, seed)
+    clock = format_time_offsets(pd.Series(np.arange(86400))).to_numpy()
+    return frame.assign(
+        date=pd.to_datetime(frame['date']).dt.strftime('%Y-%m-%d'),
+        question_time=clock[frame['question_time'].to_numpy()],
+        answer_time=clock[frame['answer_time'].to_numpy()],
+        query='Вопрос номер ' + frame['id'].astype(str),
+        response=generate_responses(frame['satisfaction'], seed)
+    )
+
+def write_log_file(path, rows, seed=0):
+    """
+    Лог-файл в формате chatbot.log (см. parse_log_line в db_transfer.py и load_logs.py).
+
+    Returns:
+        int: число записанных строк
+    """
+    frame = _text_columns(rows, seed)
+    lines = (
+        frame['date'] + ' ' + frame['question_time']
+        + ' | query: ' + frame['query']
+        + ' | response: ' + frame['response']
+        + ' | satisfaction: ' + frame['satisfaction'].astype(str)
+        + np.where(frame['satisfaction'] == 0, ' | incorrect_answer', '')
+    )
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('\n'.join(lines) + '\n')
+    return rows
+
+def write_csv_file(path, rows, seed=0):
+    """
+    Выгрузка CSV в формате load_csv_to_db (колонки CSV_COLUMNS из load_logs.py).
+
+    Returns:
+        int: число записанных строк
+    """
+    frame = _text_columns(rows, seed)
+    frame[list(CSV_COLUMNS.values())].set_axis(list(CSV_COLUMNS), axis=1).to_csv(path, index=False)
+    return rows
@@ -8,3 +8,40 @@ DB_CONFIG = {
     'host': os.getenv('DB_HOST', 'localhost'),
     'port': os.getenv('DB_PORT', '5432')
 }
+
+# Пул соединений с базой (src/database/pool.py): число постоянных соединений,
+# дополнительных при пиковой нагрузке, время ожидания свободного соединения
+# (в секундах) и ограничение времени выполнения запроса (в мс, 0 — без ограничения)
+DB_POOL_CONFIG = {
+    'size': int(os.getenv('DB_POOL_SIZE', '5')),
+    'max_overflow': int(os.getenv('DB_POOL_MAX_OVERFLOW', '5')),
+    'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+    'statement_timeout_ms': int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '30000')),
+    'application_name': os.getenv('DB_APPLICATION_NAME', 'chatbot_dashboard')
+}
+
+# Время жизни кэша данных дашборда (в секундах)
+DATA_CACHE_TTL = int(os.getenv('DATA_CACHE_TTL', '60'))
+
+# Предел памяти кэша выборок по фильтрам и других результатов запросов
+# (в МБ, см. get_cached_selection в src/database/cache.py)
+SELECTION_CACHE_MAX_BYTES = int(os.getenv('SELECTION_CACHE_MAX_MB', '256')) * 1024 * 1024
+
+# Предел памяти кэша готовых графиков Plotly (в МБ, см. src/views/figure_cache.py)
+FIGURE_CACHE_MAX_BYTES = int(os.getenv('FIGURE_CACHE_MAX_MB', '64')) * 1024 * 1024
+
+# Режим агрегации для графиков: 'pandas' (по данным в памяти),
+# 'pushdown' (GROUP BY на стороне PostgreSQL) или 'rollup'
+# (по таблице почасовых агрегатов). В режиме 'pandas' таблица загружается
+# в память целиком и фильтруется там; фильтры выполняются в базе только
+# в режимах 'pushdown' и 'rollup'
+AGGREGATION_MODE = os.getenv('AGGREGATION_MODE', 'pandas')
+
+# Предел размера файла выгрузки для скачивания (в МБ, см. src/views/export.py).
+# Streamlit отдает скачиваемый файл из памяти процесса целиком, поэтому
+# выгрузки больше предела не скачиваются
+EXPORT_MAX_DOWNLOAD_BYTES = int(os.getenv('EXPORT_MAX_DOWNLOAD_MB', '200')) * 1024 * 1024
+
+# Каталог для снимка датасета на диске (быстрый старт нового процесса);
+# пустая строка отключает снимок
+DATA_SNAPSHOT_DIR = os.getenv('DATA_SNAPSHOT_DIR', '.snapshots')
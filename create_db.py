@@ -1,18 +1,11 @@
-import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
-from config import DB_CONFIG
+from src.database.pool import connect, connect_direct
 
 def create_database():
     conn = None
     try:
         # Connect to default postgres database first
-        conn = psycopg2.connect(
-            dbname='postgres',
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password'],
-            host=DB_CONFIG['host'],
-            port=DB_CONFIG['port']
-        )
+        conn = connect_direct(dbname='postgres')
         conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
         
         with conn.cursor() as cur:
@@ -28,7 +21,7 @@ def create_database():
         
         # Connect to the created database to create tables
         conn.close()
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = connect()
         with conn.cursor() as cur:
             # Create tables
             cur.execute("""
@@ -1,9 +1,30 @@
+import argparse
 import psycopg2
-from psycopg2.extras import execute_batch
+from psycopg2.extras import execute_values
 from datetime import datetime
 import logging
-from config import DB_CONFIG
+import os
+from src.ingest import (
+    ensure_checkpoint_table,
+    get_checkpoint,
+    save_checkpoint,
+    file_fingerprint,
+    is_same_file,
+    iter_lines_from,
+    LOG_CONTENT_HASH_SQL,
+    LOG_CONTENT_KEY,
+    LOG_INSERT_SQL,
+    LOG_ROW_TEMPLATE,
+    ensure_content_hash,
+    ROLLUP_TABLE,
+    LOG_SOURCE,
+    ensure_rollup_table
+)
+from src.database.pool import configure_pool, connect, lift_statement_timeout
 import re
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from typing import Optional, Tuple, List
 import sys
 
@@ -17,6 +38,9 @@ logging.basicConfig(
     ]
 )
 
+# Approximate size of a byte range parsed by one worker in parallel mode
+CHUNK_BYTES = 8 * 1024 * 1024
+
 def parse_log_line(line: str) -> Optional[Tuple[datetime, str, str, int, str]]:
     """
     Parse a single line from the chatbot log file.
@@ -42,101 +66,389 @@ def parse_log_line(line: str) -> Optional[Tuple[datetime, str, str, int, str]]:
         logging.error(f"Error details: {str(e)}")
         return None
 
+# Columns of the log file schema written by this module
+LOG_TABLE_COLUMNS = ['timestamp', 'query', 'response', 'satisfaction', 'error_category']
+
+def check_log_schema(cur) -> None:
+    """
+    Make sure chatbot_logs has the log file schema.
+    
+    Log lines carry only a timestamp, the texts, satisfaction and an error
+    category, while the dashboard schema (init.sql) also requires the
+    answer time, user, campus, education level and category. Those cannot
+    be derived from the log, so loading into a dashboard database is
+    refused instead of failing on every batch or inventing the values.
+    
+    Args:
+        cur: Cursor of the target database
+        
+    Raises:
+        RuntimeError: chatbot_logs has a different schema
+    """
+    cur.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_name = 'chatbot_logs' AND table_schema = current_schema()
+    """)
+    columns = {row[0] for row in cur.fetchall()}
+    missing = [column for column in LOG_TABLE_COLUMNS if column not in columns]
+    if missing:
+        raise RuntimeError(
+            f"chatbot_logs has no log file columns ({', '.join(missing)}): it uses the "
+            "dashboard schema, which log lines cannot fill; load the dashboard CSV "
+            "export with load_logs.load_csv_to_db instead"
+        )
+
 def create_table(conn: psycopg2.extensions.connection) -> None:
     """
     Create the chatbot_logs table if it doesn't exist.
     
+    Existing rows are kept; the content hash column and its unique index
+    are added so that repeated transfers skip rows already loaded, and the
+    hourly rollup table is created next to it. An existing table with the
+    dashboard schema is rejected (see check_log_schema).
+    
     Args:
         conn: PostgreSQL database connection
+        
+    Raises:
+        RuntimeError: chatbot_logs exists with the dashboard schema
     """
     try:
         with conn.cursor() as cur:
-            # Drop existing table if exists
-            cur.execute("DROP TABLE IF EXISTS chatbot_logs")
-            
-            # Create new table
             cur.execute("""
-                CREATE TABLE chatbot_logs (
+                CREATE TABLE IF NOT EXISTS chatbot_logs (
                     id SERIAL PRIMARY KEY,
                     timestamp TIMESTAMP NOT NULL,
                     query TEXT NOT NULL,
                     response TEXT NOT NULL,
                     satisfaction BOOLEAN NOT NULL,
                     error_category VARCHAR(50),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    content_hash CHAR(32)
                 )
             """)
+            check_log_schema(cur)
+            ensure_content_hash(cur, LOG_CONTENT_HASH_SQL, LOG_CONTENT_KEY)
+            ensure_rollup_table(cur, LOG_SOURCE)
+            ensure_checkpoint_table(cur)
         conn.commit()
         logging.info("Table chatbot_logs created or already exists")
     except Exception as e:
         logging.error(f"Error creating table: {str(e)}")
         raise
 
-def insert_batch(conn: psycopg2.extensions.connection, batch: List[Tuple]) -> None:
+def insert_batch(conn: psycopg2.extensions.connection, batch: List[Tuple],
+                 checkpoint: Optional[Tuple] = None) -> int:
     """
-    Insert a batch of records into the database.
+    Insert a batch of records into the database, skipping rows already loaded.
+    
+    The hourly rollups are updated with the inserted rows in the same statement.
     
     Args:
         conn: PostgreSQL database connection
         batch: List of tuples containing the data to insert
+        checkpoint: Optional save_checkpoint arguments (source, byte offset,
+            fingerprint[, completed, inode]) saved in the same transaction
+            as the batch
+        
+    Returns:
+        int: Number of records actually inserted
     """
     try:
         with conn.cursor() as cur:
-            execute_batch(cur, """
-                INSERT INTO chatbot_logs (timestamp, query, response, satisfaction, error_category)
-                VALUES (%s, %s, %s, %s, %s)
-            """, batch)
+            # Bulk inserts are not limited by the dashboard statement timeout
+            lift_statement_timeout(cur)
+            # One statement per batch: rows and hourly rollups are written together
+            inserted = len(execute_values(
+                cur, LOG_INSERT_SQL, batch, template=LOG_ROW_TEMPLATE,
+                page_size=len(batch), fetch=True
+            )) if batch else 0
+            if checkpoint:
+                save_checkpoint(cur, *checkpoint)
         conn.commit()
-        logging.info(f"Inserted batch of {len(batch)} records")
+        logging.info(f"Inserted batch of {inserted} records ({len(batch) - inserted} already loaded)")
+        return inserted
     except Exception as e:
         logging.error(f"Error inserting batch: {str(e)}")
         conn.rollback()
         raise
 
-def transfer_data(log_file_path: str) -> None:
+def serial_transfer(conn: psycopg2.extensions.connection, log_file_path: str,
+                    offset: int, fingerprint: str, batch_size: int = 1000) -> Tuple[int, int, int]:
+    """
+    Parse the log file line by line in this process and insert it in batches.
+    
+    Args:
+        conn: PostgreSQL database connection
+        log_file_path (str): Path to the log file
+        offset (int): Byte offset to start reading from
+        fingerprint (str): Fingerprint of the log file saved with checkpoints
+        batch_size (int): Number of records inserted per transaction
+        
+    Returns:
+        Tuple[int, int, int]: (records processed, records inserted, errors)
+    """
+    source = os.path.abspath(log_file_path)
+    batch = []
+    total_processed = 0
+    total_inserted = 0
+    error_count = 0
+    
+    # A trailing line without a newline may still be being written,
+    # so it is left for the next run
+    for line_num, (line, offset) in enumerate(
+            iter_lines_from(log_file_path, offset, include_partial=False), 1):
+        result = parse_log_line(line)
+        if result:
+            batch.append(result)
+            total_processed += 1
+        else:
+            error_count += 1
+        
+        if len(batch) >= batch_size:
+            total_inserted += insert_batch(conn, batch, (source, offset, fingerprint))
+            batch = []
+        
+        if line_num % 10000 == 0:
+            logging.info(f"Processed {line_num} lines...")
+    
+    # Insert any remaining records and save the final offset
+    total_inserted += insert_batch(conn, batch, (source, offset, fingerprint))
+    return total_processed, total_inserted, error_count
+
+def _complete_lines_end(file, size: int) -> int:
+    """
+    Find the byte offset right after the last newline of the file.
+    
+    Args:
+        file: Log file opened in binary mode
+        size (int): Size of the file in bytes
+        
+    Returns:
+        int: Offset after the last complete line (0 if there is none)
+    """
+    position = size
+    while position > 0:
+        step = min(65536, position)
+        file.seek(position - step)
+        newline = file.read(step).rfind(b'\n')
+        if newline >= 0:
+            return position - step + newline + 1
+        position -= step
+    return 0
+
+def split_into_chunks(log_file_path: str, offset: int = 0,
+                      chunk_bytes: int = CHUNK_BYTES) -> List[Tuple[int, int]]:
+    """
+    Split the log file into byte ranges aligned to line boundaries.
+    
+    Every range starts at the beginning of a line and ends right after a
+    newline, so chunks can be parsed independently. A trailing line without
+    a newline is left out, as in the serial mode.
+    
+    Args:
+        log_file_path (str): Path to the log file
+        offset (int): Byte offset of the first line to include
+        chunk_bytes (int): Approximate size of a chunk in bytes
+        
+    Returns:
+        List[Tuple[int, int]]: (start, end) byte ranges covering the file
+    """
+    chunks = []
+    with open(log_file_path, 'rb') as file:
+        size = _complete_lines_end(file, os.path.getsize(log_file_path))
+        start = offset
+        while start < size:
+            end = start + chunk_bytes
+            if end < size:
+                # Move the boundary to the start of the next line
+                file.seek(end)
+                file.readline()
+                end = file.tell()
+            end = min(end, size)
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+def parse_chunk(task: Tuple[str, int, int]) -> Tuple[int, int, List[Tuple], int, int]:
+    """
+    Parse one byte range of the log file (runs in a worker process).
+    
+    Args:
+        task: (log file path, start offset, end offset)
+        
+    Returns:
+        Tuple: (start, end, parsed records, error count, line count)
+    """
+    log_file_path, start, end = task
+    with open(log_file_path, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+    
+    records = []
+    error_count = 0
+    lines = data.decode('utf-8').split('\n')[:-1]
+    for line in lines:
+        result = parse_log_line(line)
+        if result:
+            records.append(result)
+        else:
+            error_count += 1
+    return start, end, records, error_count, len(lines)
+
+def parallel_transfer(conn: psycopg2.extensions.connection, log_file_path: str,
+                      offset: int, fingerprint: str, workers: int, writers: int = 1,
+                      batch_size: int = 1000) -> Tuple[int, int, int]:
+    """
+    Parse the log file in a process pool and insert it through writer connections.
+    
+    The file is split into line-aligned byte ranges that are parsed in
+    parallel while writer threads, each with its own connection, insert
+    already parsed chunks. At most a few chunks per worker are in flight,
+    so memory stays bounded on multi-GB logs. Writers commit their batches
+    independently; the checkpoint is saved by this thread on conn and only
+    advances past chunks whose predecessors are all committed. Rows written
+    beyond it are skipped by content hash when the transfer is resumed.
+    
+    Args:
+        conn: PostgreSQL database connection used for checkpoints
+        log_file_path (str): Path to the log file
+        offset (int): Byte offset to start reading from
+        fingerprint (str): Fingerprint of the log file saved with checkpoints
+        workers (int): Number of parser processes
+        writers (int): Number of writer connections
+        batch_size (int): Number of records inserted per transaction
+        
+    Returns:
+        Tuple[int, int, int]: (records processed, records inserted, errors)
+    """
+    source = os.path.abspath(log_file_path)
+    chunks = split_into_chunks(log_file_path, offset)
+    logging.info(f"Parsing {len(chunks)} chunks with {workers} workers and {writers} writers")
+    
+    lock = threading.Lock()
+    local = threading.local()
+    connections = []
+    # Committed chunks (start -> end) and the offset all rows before which are stored
+    progress = {'done': {}, 'position': offset}
+    
+    def write_chunk(start: int, end: int, records: List[Tuple]) -> int:
+        if not hasattr(local, 'conn'):
+            local.conn = connect()
+            with lock:
+                connections.append(local.conn)
+        inserted = 0
+        for i in range(0, len(records), batch_size):
+            inserted += insert_batch(local.conn, records[i:i + batch_size])
+        # Only the bookkeeping is serialized; commits run outside the lock
+        with lock:
+            progress['done'][start] = end
+            while progress['position'] in progress['done']:
+                progress['position'] = progress['done'].pop(progress['position'])
+        return inserted
+    
+    saved = {'position': offset}
+    
+    def save_progress() -> None:
+        # A single committer keeps the saved offset monotonic
+        with lock:
+            position = progress['position']
+        if position != saved['position']:
+            insert_batch(conn, [], (source, position, fingerprint))
+            saved['position'] = position
+    
+    total_processed = 0
+    total_inserted = 0
+    error_count = 0
+    total_lines = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as parsers, \
+                ThreadPoolExecutor(max_workers=writers) as writer_pool:
+            parsing = deque()
+            writing = deque()
+            
+            def collect(future):
+                nonlocal total_processed, error_count, total_lines
+                start, end, records, errors, lines = future.result()
+                total_processed += len(records)
+                error_count += errors
+                total_lines += lines
+                logging.info(f"Processed {total_lines} lines...")
+                writing.append(writer_pool.submit(write_chunk, start, end, records))
+            
+            for start, end in chunks:
+                parsing.append(parsers.submit(parse_chunk, (log_file_path, start, end)))
+                while len(parsing) >= 2 * workers:
+                    collect(parsing.popleft())
+                while len(writing) > 2 * writers:
+                    total_inserted += writing.popleft().result()
+                    save_progress()
+            while parsing:
+                collect(parsing.popleft())
+            while writing:
+                total_inserted += writing.popleft().result()
+                save_progress()
+        save_progress()
+    finally:
+        for worker_conn in connections:
+            worker_conn.close()
+    
+    return total_processed, total_inserted, error_count
+
+def transfer_data(log_file_path: str, incremental: bool = True,
+                  workers: int = 1, writers: int = 1, batch_size: int = 1000) -> None:
     """
     Transfer data from the log file to PostgreSQL database.
     
+    In incremental mode reading resumes from the byte offset saved after the
+    last committed batch, as long as the file was only appended to since.
+    Rows that are already in the table are skipped by content hash.
+    
     Args:
         log_file_path (str): Path to the log file
+        incremental (bool): If False, the table is truncated and the whole
+            file is loaded again
+        workers (int): Number of parser processes; 1 parses in this process
+        writers (int): Number of writer connections used in parallel mode
+        batch_size (int): Number of records inserted per transaction
     """
     conn = None
     try:
         # Connect to PostgreSQL
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = connect()
         logging.info("Connected to PostgreSQL database")
         
         # Create table if not exists
         create_table(conn)
         
-        # Read and process log file
-        batch_size = 1000
-        batch = []
-        total_processed = 0
-        error_count = 0
-        
-        with open(log_file_path, 'r', encoding='utf-8') as file:
-            for line_num, line in enumerate(file, 1):
-                result = parse_log_line(line)
-                if result:
-                    batch.append(result)
-                    total_processed += 1
-                else:
-                    error_count += 1
-                
-                if len(batch) >= batch_size:
-                    insert_batch(conn, batch)
-                    batch = []
-                
-                if line_num % 10000 == 0:
-                    logging.info(f"Processed {line_num} lines...")
-        
-        # Insert any remaining records
-        if batch:
-            insert_batch(conn, batch)
+        source = os.path.abspath(log_file_path)
+        fingerprint = file_fingerprint(log_file_path)
+        offset = 0
+        with conn.cursor() as cur:
+            if not incremental:
+                lift_statement_timeout(cur)
+                cur.execute(f"TRUNCATE TABLE chatbot_logs, {ROLLUP_TABLE}")
+            else:
+                checkpoint = get_checkpoint(cur, source)
+                if checkpoint and is_same_file(log_file_path, checkpoint['fingerprint']):
+                    offset = checkpoint['position']
+        conn.commit()
+        if offset:
+            logging.info(f"Resuming from byte offset {offset}")
+        
+        if workers > 1:
+            total_processed, total_inserted, error_count = parallel_transfer(
+                conn, log_file_path, offset, fingerprint, workers=workers, writers=writers,
+                batch_size=batch_size
+            )
+        else:
+            total_processed, total_inserted, error_count = serial_transfer(
+                conn, log_file_path, offset, fingerprint, batch_size=batch_size
+            )
         
         logging.info(f"Data transfer completed successfully")
         logging.info(f"Total records processed: {total_processed}")
+        logging.info(f"Total records inserted: {total_inserted}")
         logging.info(f"Total errors: {error_count}")
         
     except Exception as e:
@@ -145,12 +457,25 @@ def transfer_data(log_file_path: str) -> None:
     finally:
         if conn:
             conn.close()
-            logging.info("Database connection closed")
+            logging.info("Database connection returned to the pool")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transfer chatbot.log into PostgreSQL")
+    parser.add_argument("log_file_path", nargs="?", default="chatbot.log")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of parser processes (default: 1, serial mode)")
+    parser.add_argument("--writers", type=int, default=1,
+                        help="number of writer connections in parallel mode")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="number of records inserted per transaction")
+    parser.add_argument("--full", action="store_true",
+                        help="truncate the table and load the whole file again")
+    args = parser.parse_args()
+    # One pooled connection for the main loop and one per writer
+    configure_pool(size=args.writers + 1)
     try:
-        log_file_path = "chatbot.log"
-        transfer_data(log_file_path)
+        transfer_data(args.log_file_path, incremental=not args.full,
+                      workers=args.workers, writers=args.writers, batch_size=args.batch_size)
     except Exception as e:
         logging.error(f"Script failed: {str(e)}")
         sys.exit(1)
@@ -0,0 +1,228 @@
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Dict
+import psycopg2
+from src.database.pool import connect
+from db_transfer import parse_log_line, create_table, insert_batch
+from src.ingest import get_checkpoint, handle_fingerprint, is_same_file
+
+# Maximum number of bytes read from the log in one call
+READ_BYTES = 1024 * 1024
+
+_stop_requested = threading.Event()
+
+def _open_log(conn: psycopg2.extensions.connection, state: Dict, resume: bool) -> bool:
+    """
+    Open the followed log file and choose the offset to start from.
+
+    Args:
+        conn: PostgreSQL database connection
+        state (Dict): Follower state
+        resume (bool): Start from the saved checkpoint if it matches the file
+
+    Returns:
+        bool: False if the file does not exist yet
+    """
+    try:
+        file = open(state['path'], 'rb')
+    except FileNotFoundError:
+        return False
+    stat = os.fstat(file.fileno())
+    offset = 0
+
+    if resume:
+        with conn.cursor() as cur:
+            checkpoint = get_checkpoint(cur, state['source'])
+        conn.commit()
+        if checkpoint and checkpoint['inode'] == stat.st_ino and checkpoint['position'] <= stat.st_size:
+            offset = checkpoint['position']
+        elif checkpoint and checkpoint['inode'] is None and is_same_file(state['path'], checkpoint['fingerprint']):
+            # Checkpoint written by a one-shot transfer of the same file
+            offset = checkpoint['position']
+        elif not checkpoint and state['from_end']:
+            offset = stat.st_size
+
+    file.seek(offset)
+    state.update(file=file, inode=stat.st_ino, offset=offset, saved_offset=None, pending=b'')
+    logging.info(f"Following {state['path']} (inode {stat.st_ino}) from byte offset {offset}")
+    return True
+
+def _consume(state: Dict, data: bytes, final: bool = False) -> None:
+    """
+    Parse the complete lines read so far and add them to the current batch.
+
+    Args:
+        state (Dict): Follower state
+        data (bytes): Bytes read after the pending partial line
+        final (bool): Treat a trailing line without a newline as complete
+    """
+    data = state['pending'] + data
+    end = len(data) if final else data.rfind(b'\n') + 1
+    state['pending'] = data[end:]
+    if not end:
+        return
+    # Split on '\n' only, as db_transfer does: splitlines() would also break
+    # on '\r', '\x85', U+2028 and the like inside a line
+    lines = data[:end].decode('utf-8').split('\n')
+    if not lines[-1]:
+        lines.pop()
+    for line in lines:
+        result = parse_log_line(line)
+        if result:
+            if not state['batch']:
+                state['batch_started'] = time.monotonic()
+            state['batch'].append(result)
+        else:
+            state['error_count'] += 1
+    state['offset'] += end
+
+def _flush(conn: psycopg2.extensions.connection, state: Dict) -> None:
+    """
+    Insert the current batch and save the offset and inode in the same transaction.
+
+    Args:
+        conn: PostgreSQL database connection
+        state (Dict): Follower state
+    """
+    if not state['batch'] and state['offset'] == state['saved_offset']:
+        return
+    checkpoint = (state['source'], state['offset'],
+                  handle_fingerprint(state['file'], state['offset']), False, state['inode'])
+    state['total_inserted'] += insert_batch(conn, state['batch'], checkpoint)
+    state.update(saved_offset=state['offset'], batch=[], batch_started=None)
+
+def _flush_due(state: Dict, batch_rows: int, flush_ms: int) -> bool:
+    """Check whether the batch is full or old enough, or only the offset moved."""
+    if len(state['batch']) >= batch_rows:
+        return True
+    if state['batch_started'] is not None:
+        return (time.monotonic() - state['batch_started']) * 1000 >= flush_ms
+    return state['offset'] != state['saved_offset']
+
+def _check_file(conn: psycopg2.extensions.connection, state: Dict, poll_interval: float) -> None:
+    """
+    Handle truncation and rotation once the open file has been read to the end.
+
+    Args:
+        conn: PostgreSQL database connection
+        state (Dict): Follower state
+        poll_interval (float): Seconds to wait for the new file after rotation
+    """
+    size = os.fstat(state['file'].fileno()).st_size
+    if size < state['offset'] + len(state['pending']):
+        logging.info(f"{state['path']} was truncated, reading it from the start")
+        _flush(conn, state)
+        state['file'].seek(0)
+        state.update(offset=0, saved_offset=None, pending=b'')
+        return
+
+    try:
+        inode = os.stat(state['path']).st_ino
+    except FileNotFoundError:
+        # Rotated away and not recreated yet, keep reading the old file
+        return
+    if inode != state['inode']:
+        logging.info(f"{state['path']} was rotated, switching to the new file")
+        _consume(state, b'', final=True)
+        _flush(conn, state)
+        state['file'].close()
+        while not _open_log(conn, state, resume=False) and not _stop_requested.wait(poll_interval):
+            pass
+
+def stop(*args) -> None:
+    """Ask the follow loop to flush the current batch and exit."""
+    _stop_requested.set()
+
+def follow(log_file_path: str, batch_rows: int = 500, flush_ms: int = 1000,
+           poll_interval: float = 0.2, from_end: bool = False) -> None:
+    """
+    Follow a growing log file like `tail -F` and load new lines into chatbot_logs.
+
+    New lines are parsed with db_transfer.parse_log_line and inserted in
+    micro-batches: a batch is flushed once it holds batch_rows records or
+    flush_ms milliseconds after its first record, whichever comes first.
+    The byte offset and inode of the file are saved in the same transaction
+    as each batch, so a restarted follower continues where it stopped
+    without re-reading history. Rotation (the path now points to another
+    file) and truncation (the file became shorter than the offset) are
+    detected while polling.
+
+    Only the log file schema created by db_transfer is supported: on a
+    dashboard database (init.sql) the follower refuses to start, because
+    log lines do not carry the campus, category and answer time columns.
+
+    Args:
+        log_file_path (str): Path to the log file to follow
+        batch_rows (int): Flush a batch once it holds this many records
+        flush_ms (int): Flush a non-empty batch at most this many ms after its first record
+        poll_interval (float): Seconds to sleep when there is no new data
+        from_end (bool): Without a saved checkpoint, skip the current content of the file
+
+    Raises:
+        RuntimeError: chatbot_logs uses the dashboard schema
+    """
+    state = {
+        'path': log_file_path,
+        'source': os.path.abspath(log_file_path),
+        'from_end': from_end,
+        'file': None,
+        'inode': None,
+        # Offset right after the last complete line that was read
+        'offset': 0,
+        'saved_offset': None,
+        'pending': b'',
+        'batch': [],
+        'batch_started': None,
+        'total_inserted': 0,
+        'error_count': 0
+    }
+    conn = connect()
+    logging.info("Connected to PostgreSQL database")
+    try:
+        create_table(conn)
+        while not _stop_requested.is_set() and not _open_log(conn, state, resume=True):
+            time.sleep(poll_interval)
+
+        while not _stop_requested.is_set():
+            data = state['file'].read(READ_BYTES)
+            if data:
+                _consume(state, data)
+            else:
+                _check_file(conn, state, poll_interval)
+            if _flush_due(state, batch_rows, flush_ms):
+                _flush(conn, state)
+            if not data:
+                _stop_requested.wait(poll_interval)
+        if state['file']:
+            _flush(conn, state)
+    finally:
+        if state['file']:
+            state['file'].close()
+        conn.close()
+        logging.info(f"Stopped following {log_file_path}: {state['total_inserted']} records inserted, "
+                     f"{state['error_count']} errors")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Follow chatbot.log and load new lines into PostgreSQL")
+    parser.add_argument("log_file_path", nargs="?", default="chatbot.log")
+    parser.add_argument("--batch-rows", type=int, default=500,
+                        help="flush a batch once it holds this many records")
+    parser.add_argument("--flush-ms", type=int, default=1000,
+                        help="flush a non-empty batch at most this many ms after its first record")
+    parser.add_argument("--from-end", action="store_true",
+                        help="without a saved checkpoint, skip the current content of the file")
+    args = parser.parse_args()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        follow(args.log_file_path, batch_rows=args.batch_rows,
+               flush_ms=args.flush_ms, from_end=args.from_end)
+    except Exception as e:
+        logging.error(f"Follower failed: {str(e)}")
+        sys.exit(1)
@@ -2,8 +2,11 @@
 
 DROP TABLE IF EXISTS chatbot_logs;
 
+-- Таблица секционирована по месяцам (RANGE по date): запросы с диапазоном
+-- дат читают только нужные секции, старые месяцы отсоединяются без
+-- удаления строк. Секции месяцев создаются при загрузке данных.
 CREATE TABLE chatbot_logs (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     date DATE NOT NULL,
     question_time TIME NOT NULL,
     answer_time TIME NOT NULL,
@@ -14,5 +17,31 @@ CREATE TABLE chatbot_logs (
     subcategory VARCHAR(50),
     query TEXT NOT NULL,
     response TEXT NOT NULL,
-    satisfaction INTEGER CHECK (satisfaction IN (0, 1))
+    satisfaction INTEGER CHECK (satisfaction IN (0, 1)),
+    -- Тип ошибки неудовлетворительного ответа (вычисляется при загрузке)
+    error_type VARCHAR(50),
+    content_hash CHAR(32),
+    PRIMARY KEY (id, date)
+) PARTITION BY RANGE (date);
+
+-- Хэш содержимого строки: повторная загрузка тех же записей не создает дубликатов
+CREATE UNIQUE INDEX chatbot_logs_content_hash_key ON chatbot_logs (content_hash, date);
+
+-- Индексы для фильтров дашборда (диапазон дат, категория, кампус, уровень образования)
+CREATE INDEX chatbot_logs_date_idx ON chatbot_logs (date, question_time)
+    INCLUDE (answer_time, satisfaction);
+CREATE INDEX chatbot_logs_category_idx ON chatbot_logs (category, subcategory, date)
+    INCLUDE (question_time, answer_time, satisfaction);
+CREATE INDEX chatbot_logs_campus_idx ON chatbot_logs (campus, date)
+    INCLUDE (category, question_time, answer_time, satisfaction);
+CREATE INDEX chatbot_logs_education_level_idx ON chatbot_logs (education_level, date)
+    INCLUDE (category, question_time, answer_time, satisfaction);
+-- Версия данных: увеличивается при изменении уже загруженных строк
+-- (см. src/ingest/versions.py), дашборд по ней сбрасывает кэш. Таблица
+-- логов пересоздана, поэтому версия увеличивается и здесь
+CREATE TABLE IF NOT EXISTS chatbot_data_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL DEFAULT 0
 );
+INSERT INTO chatbot_data_version AS v (id, version) VALUES (TRUE, 1)
+    ON CONFLICT (id) DO UPDATE SET version = v.version + 1;
@@ -1,9 +1,37 @@
+import io
+import os
 import re
+import time
 from datetime import datetime
 import pandas as pd
-import psycopg2
-from psycopg2.extras import execute_batch
-from config import DB_CONFIG
+from psycopg2.extras import execute_batch, execute_values
+from src.database.pool import connect, lift_statement_timeout
+from src.ingest import (
+    ensure_checkpoint_table,
+    get_checkpoint,
+    save_checkpoint,
+    file_fingerprint,
+    is_same_file,
+    iter_lines_from,
+    LOG_CONTENT_HASH_SQL,
+    LOG_CONTENT_KEY,
+    LOG_INSERT_SQL,
+    LOG_ROW_TEMPLATE,
+    STAGING_TABLE,
+    ensure_content_hash,
+    create_staging_table,
+    insert_new_from_staging,
+    ROLLUP_TABLE,
+    LOG_SOURCE,
+    ensure_rollup_table,
+    ensure_partitions_for,
+    migrate_to_partitioned,
+    classify_errors,
+    ensure_error_type
+)
+
+# Число строк CSV, которые читаются, записываются и фиксируются за один раз
+CHUNK_SIZE = 50000
 
 def parse_log_line(line):
     # Парсим строку лога с помощью регулярного выражения
@@ -22,89 +50,245 @@ def parse_log_line(line):
         }
     return None
 
-def load_logs_to_db():
+def load_logs_to_db(log_path='chatbot.log', incremental=True):
+    """
+    Загрузка лог-файла в базу данных.
+
+    В инкрементальном режиме читаются только строки после сохраненной
+    позиции в файле, а уже загруженные записи пропускаются по хэшу
+    содержимого. Иначе таблица очищается и файл загружается целиком.
+    Почасовые агрегаты обновляются вместе со вставкой строк.
+    """
     # Подключаемся к базе данных
-    conn = psycopg2.connect(**DB_CONFIG)
+    conn = connect()
     cur = conn.cursor()
+    # Весь файл загружается одной транзакцией, без statement_timeout дашборда
+    lift_statement_timeout(cur)
+    ensure_checkpoint_table(cur)
+    ensure_content_hash(cur, LOG_CONTENT_HASH_SQL, LOG_CONTENT_KEY)
+    ensure_rollup_table(cur, LOG_SOURCE)
     
-    # Очищаем таблицу
-    cur.execute('TRUNCATE TABLE chatbot_logs')
+    source = os.path.abspath(log_path)
+    fingerprint = file_fingerprint(log_path)
+    checkpoint = get_checkpoint(cur, source)
+    if not incremental:
+        # Очищаем таблицу
+        cur.execute(f'TRUNCATE TABLE chatbot_logs, {ROLLUP_TABLE}')
+        offset = 0
+    elif checkpoint and is_same_file(log_path, checkpoint['fingerprint']):
+        offset = checkpoint['position']
+    else:
+        offset = 0
     
-    # Читаем лог-файл
-    with open('chatbot.log', 'r', encoding='utf-8') as f:
-        for line in f:
-            if line.strip() and not line.startswith('//'):  # Пропускаем пустые строки и комментарии
-                data = parse_log_line(line)
-                if data:
-                    cur.execute('''
-                        INSERT INTO chatbot_logs 
-                        (timestamp, query, response, satisfaction, error_category)
-                        VALUES (%s, %s, %s, %s, %s)
-                    ''', (
-                        data['timestamp'],
-                        data['query'],
-                        data['response'],
-                        data['satisfaction'],
-                        data['error_category']
-                    ))
+    # Читаем лог-файл с сохраненной позиции; недописанная последняя строка
+    # остается до следующего запуска
+    for line, offset in iter_lines_from(log_path, offset, include_partial=False):
+        if line.strip() and not line.startswith('//'):  # Пропускаем пустые строки и комментарии
+            data = parse_log_line(line)
+            if data:
+                execute_values(cur, LOG_INSERT_SQL, [(
+                    data['timestamp'],
+                    data['query'],
+                    data['response'],
+                    data['satisfaction'],
+                    data['error_category']
+                )], template=LOG_ROW_TEMPLATE)
     
-    # Сохраняем изменения и закрываем соединение
+    # Сохраняем изменения вместе с позицией и закрываем соединение
+    save_checkpoint(cur, source, offset, fingerprint, completed=True)
     conn.commit()
     cur.close()
     conn.close()
 
-def load_csv_to_db():
-    """Загрузка данных из CSV в базу данных"""
+# Соответствие колонок выгрузки CSV колонкам таблицы chatbot_logs
+CSV_COLUMNS = {
+    'Дата': 'date',
+    'Время вопроса': 'question_time',
+    'Время ответа': 'answer_time',
+    'Имя': 'name',
+    'Кампус': 'campus',
+    'Уровень образования': 'education_level',
+    'Категория': 'category',
+    'Подкатегория': 'subcategory',
+    'Запрос': 'query',
+    'Ответ': 'response',
+    'Доволен': 'satisfaction'
+}
+
+# Текстовые колонки chatbot_logs с ограничением NOT NULL: пустое поле CSV
+# при записи стало бы NULL и прервало бы загрузку всей пачки
+REQUIRED_TEXT_COLUMNS = ['name', 'campus', 'education_level', 'category', 'query', 'response']
+
+def _parse_datetimes(values, format=None):
+    """Векторный разбор дат и времени; строки в другом формате разбираются отдельно"""
+    parsed = pd.to_datetime(values, errors='coerce', format=format)
+    retry = parsed.isna() & values.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(values[retry], errors='coerce', format='mixed')
+    return parsed
+
+def prepare_csv_frame(df):
+    """
+    Преобразование выгрузки CSV к колонкам таблицы chatbot_logs.
+
+    Все преобразования выполняются над колонками целиком, включая
+    классификацию неудовлетворительных ответов по типу ошибки. Строки, в
+    которых не удалось разобрать дату или время или пусто одно из полей
+    REQUIRED_TEXT_COLUMNS (например, запрос или ответ), отбрасываются.
+
+    Returns:
+        Tuple[DataFrame, int, int]: подготовленные строки, число строк с
+        некорректной датой или временем и число строк с пустыми полями
+    """
+    rows = df[list(CSV_COLUMNS)].rename(columns=CSV_COLUMNS)
+
+    date = _parse_datetimes(rows['date'])
+    question_time = _parse_datetimes(rows['question_time'], format='%H:%M:%S')
+    answer_time = _parse_datetimes(rows['answer_time'], format='%H:%M:%S')
+    valid_times = date.notna() & question_time.notna() & answer_time.notna()
+    complete = rows[REQUIRED_TEXT_COLUMNS].notna().all(axis=1)
+    valid = valid_times & complete
+
+    # Дата и время остаются datetime64: PostgreSQL при разборе TIME
+    # игнорирует часть с датой, а DATE — часть со временем
+    rows = rows[valid].assign(
+        date=date[valid].dt.normalize(),
+        question_time=question_time[valid],
+        answer_time=answer_time[valid],
+        satisfaction=pd.to_numeric(rows['satisfaction'][valid]).astype('Int64')
+    )
+    rows['error_type'] = classify_errors(rows['response'], rows['satisfaction'])
+    return rows, int((~valid_times).sum()), int((valid_times & ~complete).sum())
+
+def copy_rows(cur, rows, table='chatbot_logs'):
+    """Потоковая запись подготовленных строк в таблицу через COPY FROM STDIN"""
+    buffer = io.StringIO()
+    rows.to_csv(buffer, header=False, index=False)
+    buffer.seek(0)
+    cur.copy_expert(
+        f"COPY {table} ({', '.join(rows.columns)}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+
+def _write_rows(cur, rows, method, table='chatbot_logs'):
+    """Запись подготовленных строк выбранным способом"""
+    if method == 'copy':
+        copy_rows(cur, rows, table)
+        return
+    
+    # Вставляем данные пакетами
+    rows = rows.assign(
+        date=rows['date'].dt.date,
+        question_time=rows['question_time'].dt.time,
+        answer_time=rows['answer_time'].dt.time
+    )
+    execute_batch(cur, f'''
+        INSERT INTO {table} ({', '.join(rows.columns)})
+        VALUES ({', '.join(['%s'] * len(rows.columns))})
+    ''', rows.astype(object).where(rows.notna(), None).itertuples(index=False, name=None))
+
+def load_csv_to_db(csv_path='chatbotlog.csv', method='copy', chunk_size=CHUNK_SIZE, incremental=True):
+    """
+    Потоковая загрузка данных из CSV в базу данных.
+
+    Файл читается пачками по chunk_size строк, каждая пачка записывается и
+    фиксируется вместе с контрольной точкой, поэтому память не зависит от
+    размера выгрузки.
+
+    В инкрементальном режиме таблица не очищается: чтение продолжается с
+    сохраненной позиции, если файл тот же (или только дописан), а строки,
+    которые уже есть в таблице, пропускаются по хэшу содержимого. Поэтому
+    прерванная загрузка продолжается с последней зафиксированной пачки, а
+    ежедневный импорт стоит O(новых строк). Почасовые агрегаты обновляются
+    в той же транзакции, что и каждая пачка.
+
+    Несекционированная таблица chatbot_logs переводится на секционирование
+    по месяцам при первом запуске; секции новых месяцев создаются перед
+    вставкой пачки.
+
+    Args:
+        csv_path: путь к выгрузке CSV
+        method: 'copy' — запись через COPY FROM STDIN,
+                'batch' — через execute_batch (INSERT пачками)
+        chunk_size: число строк CSV в одной пачке
+        incremental: False — очистить таблицу и загрузить файл заново
+    """
+    conn = None
+    cur = None
     try:
+        started = time.perf_counter()
+        source = os.path.abspath(csv_path)
+        fingerprint = file_fingerprint(csv_path)
+        
         # Подключаемся к базе данных
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = connect()
         cur = conn.cursor()
+        # Загрузка больших файлов не ограничивается statement_timeout
+        # дашборда; SET LOCAL повторяется в каждой транзакции пачки
+        lift_statement_timeout(cur)
+        ensure_checkpoint_table(cur)
+        if migrate_to_partitioned(cur):
+            print("Таблица chatbot_logs переведена на секционирование по месяцам")
+        ensure_content_hash(cur)
+        ensure_error_type(cur)
+        ensure_rollup_table(cur)
+        create_staging_table(cur)
         
-        # Очищаем таблицу
-        cur.execute('TRUNCATE TABLE chatbot_logs')
-        
-        # Читаем CSV файл, пропуская первую строку как заголовок
-        df = pd.read_csv('chatbotlog.csv', header=0)
+        checkpoint = get_checkpoint(cur, source)
+        if not incremental:
+            # Очищаем таблицу
+            cur.execute(f'TRUNCATE TABLE chatbot_logs, {ROLLUP_TABLE}')
+            position = 0
+        elif checkpoint and is_same_file(csv_path, checkpoint['fingerprint']):
+            position = checkpoint['position']
+            if position:
+                print(f"Продолжаем загрузку с строки {position}")
+        else:
+            position = 0
+        save_checkpoint(cur, source, position, fingerprint)
+        conn.commit()
         
-        # Подготавливаем данные для вставки
-        data = []
-        for _, row in df.iterrows():
-            try:
-                # Преобразуем строки в объекты datetime и извлекаем нужные компоненты
-                date = pd.to_datetime(row['Дата']).strftime('%Y-%m-%d')
-                question_time = pd.to_datetime(row['Время вопроса']).strftime('%H:%M:%S')
-                answer_time = pd.to_datetime(row['Время ответа']).strftime('%H:%M:%S')
-                
-                data.append((
-                    date,
-                    question_time,
-                    answer_time,
-                    row['Имя'],
-                    row['Кампус'],
-                    row['Уровень образования'],
-                    row['Категория'],
-                    row['Подкатегория'] if pd.notna(row['Подкатегория']) else None,
-                    row['Запрос'],
-                    row['Ответ'],
-                    row['Доволен']
-                ))
-            except Exception as e:
-                print(f"Ошибка при обработке строки: {row}")
-                print(f"Ошибка: {str(e)}")
+        # Читаем CSV файл пачками, пропуская уже загруженные строки
+        to_skip = position
+        loaded = 0
+        duplicates = 0
+        skipped = 0
+        incomplete = 0
+        for chunk in pd.read_csv(csv_path, header=0, chunksize=chunk_size):
+            if to_skip >= len(chunk):
+                to_skip -= len(chunk)
                 continue
+            chunk = chunk.iloc[to_skip:]
+            to_skip = 0
+            
+            rows, chunk_skipped, chunk_incomplete = prepare_csv_frame(chunk)
+            lift_statement_timeout(cur)
+            _write_rows(cur, rows, method, STAGING_TABLE)
+            ensure_partitions_for(cur, STAGING_TABLE)
+            inserted = insert_new_from_staging(cur)
+            position += len(chunk)
+            save_checkpoint(cur, source, position, fingerprint)
+            conn.commit()
+            
+            loaded += inserted
+            duplicates += len(rows) - inserted
+            skipped += chunk_skipped
+            incomplete += chunk_incomplete
+            elapsed = time.perf_counter() - started
+            print(f"Загружено {loaded} записей ({loaded / elapsed:.0f} строк/с)")
         
-        # Вставляем данные пакетами
-        execute_batch(cur, '''
-            INSERT INTO chatbot_logs 
-            (date, question_time, answer_time, name, campus, 
-             education_level, category, subcategory, query, 
-             response, satisfaction)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ''', data)
-        
-        # Сохраняем изменения и закрываем соединение
+        save_checkpoint(cur, source, position, fingerprint, completed=True)
         conn.commit()
-        print(f"Успешно загружено {len(data)} записей")
+        
+        if duplicates:
+            print(f"Пропущено уже загруженных записей: {duplicates}")
+        if skipped:
+            print(f"Пропущено строк с некорректной датой или временем: {skipped}")
+        if incomplete:
+            print(f"Пропущено строк с пустыми обязательными полями: {incomplete}")
+        elapsed = time.perf_counter() - started
+        print(f"Успешно загружено {loaded} записей за {elapsed:.1f} с "
+              f"({loaded / elapsed:.0f} строк/с)")
         
     except Exception as e:
         print(f"Ошибка при загрузке данных: {str(e)}")
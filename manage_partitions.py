@@ -0,0 +1,44 @@
+import argparse
+from datetime import datetime
+from src.database.pool import connect
+from src.ingest import list_partitions, migrate_to_partitioned, detach_partitions_before
+
+def main():
+    parser = argparse.ArgumentParser(description='Управление месячными секциями chatbot_logs')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('migrate', help='перевести chatbot_logs на секционирование по месяцам')
+    commands.add_parser('list', help='показать секции')
+    detach = commands.add_parser('detach', help='отсоединить секции месяцев раньше заданного')
+    detach.add_argument('before', help='месяц в формате ГГГГ-ММ')
+    detach.add_argument('--drop', action='store_true', help='удалить отсоединенные секции')
+    detach.add_argument('--keep-rollups', action='store_true',
+                        help='не удалять почасовые агрегаты отсоединенных месяцев')
+    args = parser.parse_args()
+
+    conn = None
+    try:
+        conn = connect()
+        with conn.cursor() as cur:
+            if args.command == 'migrate':
+                if migrate_to_partitioned(cur):
+                    print("Таблица chatbot_logs переведена на секционирование по месяцам")
+                else:
+                    print("Таблица chatbot_logs уже секционирована")
+            elif args.command == 'list':
+                for name, bounds in list_partitions(cur):
+                    print(f"{name}: {bounds}")
+            else:
+                month = datetime.strptime(args.before, '%Y-%m').date()
+                detached = detach_partitions_before(cur, month, drop=args.drop, keep_rollups=args.keep_rollups)
+                print(f"Отсоединено секций: {len(detached)} {', '.join(detached)}")
+        conn.commit()
+    except Exception as e:
+        print(f"Ошибка: {str(e)}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,27 @@
-from .connection import load_data_from_db
+from .connection import (
+    load_data_from_db,
+    load_filter_options,
+    load_data_version,
+    attach_text_columns,
+    empty_dataset
+)
+from .pool import get_engine, get_connection, configure_pool, get_pool_stats
+from .cache import get_cache_stats, get_dataset_version, invalidate_cache
+from .schema import memory_report, format_display_columns
 
-__all__ = ['load_data_from_db']
+__all__ = [
+    'load_data_from_db',
+    'load_filter_options',
+    'load_data_version',
+    'get_engine',
+    'get_connection',
+    'configure_pool',
+    'get_pool_stats',
+    'attach_text_columns',
+    'empty_dataset',
+    'get_cache_stats',
+    'get_dataset_version',
+    'invalidate_cache',
+    'memory_report',
+    'format_display_columns'
+]
@@ -0,0 +1,235 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from config import AGGREGATION_MODE, DB_POOL_CONFIG
+from .connection import RESPONSE_TIME_SQL, ERROR_TYPE_SQL, load_has_rows
+from .pool import read_sql
+from .filters import build_where_clause
+from src.ingest.rollups import ROLLUP_TABLE, RT_BUCKETS
+
+# Измерения группировки: выражение SQL и функция для DataFrame
+DIMENSIONS = {
+    'category': ("COALESCE(category, 'Другое')", lambda df: df['category']),
+    'subcategory': ("COALESCE(subcategory, 'Не указано')", lambda df: df['subcategory']),
+    'campus': ("COALESCE(campus, 'Не указан')", lambda df: df['campus']),
+    'education_level': ("COALESCE(education_level, 'Не указан')", lambda df: df['education_level']),
+    'hour': ("EXTRACT(HOUR FROM question_time)::int", lambda df: df['timestamp'].dt.hour),
+    'date': ("date", lambda df: df['timestamp'].dt.date),
+    'week': ("EXTRACT(WEEK FROM date)::int", lambda df: df['timestamp'].dt.isocalendar().week),
+    'month': ("to_char(date, 'YYYY-MM')", lambda df: df['timestamp'].dt.strftime('%Y-%m')),
+    'error_type': (ERROR_TYPE_SQL, lambda df: df['error_type'])
+}
+
+# Метрики: выражение SQL, функция для DataFrame и агрегат pandas
+METRICS = {
+    'count': ("COUNT(*)", lambda df: df['satisfaction'], 'size'),
+    'success_rate': (
+        "AVG((satisfaction = 1)::int)::float * 100",
+        lambda df: (df['satisfaction'] == 1) * 100.0,
+        'mean'
+    ),
+    'error_count': ("SUM((satisfaction = 0)::int)", lambda df: (df['satisfaction'] == 0).astype(int), 'sum'),
+    'satisfied_count': ("SUM((satisfaction = 1)::int)", lambda df: (df['satisfaction'] == 1).astype(int), 'sum'),
+    'avg_response_time': (f"AVG({RESPONSE_TIME_SQL})", lambda df: df['response_time'], 'mean'),
+    'median_response_time': (
+        f"percentile_cont(0.5) WITHIN GROUP (ORDER BY {RESPONSE_TIME_SQL})",
+        lambda df: df['response_time'],
+        'median'
+    ),
+    'min_response_time': (f"MIN({RESPONSE_TIME_SQL})", lambda df: df['response_time'], 'min'),
+    'max_response_time': (f"MAX({RESPONSE_TIME_SQL})", lambda df: df['response_time'], 'max')
+}
+
+# Измерения по таблице почасовых агрегатов (значения по умолчанию уже
+# подставлены при загрузке); по остальным измерениям запрос идет к chatbot_logs
+ROLLUP_DIMENSIONS = {
+    'category': "category",
+    'subcategory': "subcategory",
+    'campus': "campus",
+    'education_level': "education_level",
+    'hour': "EXTRACT(HOUR FROM hour)::int",
+    'date': "hour::date",
+    'week': "EXTRACT(WEEK FROM hour)::int",
+    'month': "to_char(hour, 'YYYY-MM')"
+}
+
+# Метрики по таблице почасовых агрегатов; медиана оценивается по гистограмме
+ROLLUP_METRICS = {
+    'count': "SUM(request_count)::bigint",
+    'success_rate': "SUM(satisfied_count)::float / NULLIF(SUM(request_count), 0) * 100",
+    'error_count': "SUM(unsatisfied_count)::bigint",
+    'satisfied_count': "SUM(satisfied_count)::bigint",
+    'avg_response_time': "SUM(rt_sum) / NULLIF(SUM(rt_count), 0)",
+    'median_response_time': None,
+    'min_response_time': "MIN(rt_min)",
+    'max_response_time': "MAX(rt_max)"
+}
+
+# Потоки для одновременных запросов панелей страницы; общие для всех
+# сеансов и не больше постоянных соединений пула
+_executor = ThreadPoolExecutor(max_workers=DB_POOL_CONFIG['size'], thread_name_prefix='panel')
+
+def get_aggregation_mode():
+    """Режим агрегации: 'pandas', 'pushdown' или 'rollup'"""
+    return AGGREGATION_MODE
+
+def _with_script_run_ctx(task, ctx):
+    """
+    Задача, выполняемая с контекстом сеанса Streamlit, из которого ее запустили.
+
+    Потоки _executor общие для всех сеансов, поэтому контекст
+    присоединяется к потоку перед каждой задачей: без него не работают
+    вызовы Streamlit внутри задачи (st.error в загрузчиках данных и т.п.).
+    """
+    def run():
+        if ctx is not None:
+            add_script_run_ctx(ctx=ctx)
+        return task()
+    return run
+
+def fetch_concurrently(tasks, mode=None):
+    """
+    Выполняет независимые запросы панелей страницы одновременно.
+
+    Каждый запрос идет в своем потоке на отдельном соединении пула, поэтому
+    страница ждет самый медленный запрос, а не их сумму. В режиме 'pandas'
+    данные уже в памяти, и запросы выполняются по очереди. Ошибка одного
+    запроса не прерывает остальные: вместо результата возвращается
+    исключение, и его показывает только панель, для которой шел запрос.
+
+    Args:
+        tasks: словарь {имя панели: функция без аргументов}
+        mode: режим агрегации (по умолчанию AGGREGATION_MODE)
+
+    Yields:
+        Tuple[str, Any]: имя панели и результат (или исключение) по мере готовности
+    """
+    if (mode or get_aggregation_mode()) == 'pandas':
+        for name, task in tasks.items():
+            try:
+                result = task()
+            except Exception as e:
+                result = e
+            yield name, result
+        return
+    ctx = get_script_run_ctx(suppress_warning=True)
+    futures = {_executor.submit(_with_script_run_ctx(task, ctx)): name for name, task in tasks.items()}
+    for future in as_completed(futures):
+        try:
+            result = future.result()
+        except Exception as e:
+            result = e
+        yield futures[future], result
+
+def aggregate(df, dimensions, metrics, filters=None, conditions=None, mode=None):
+    """
+    Группировка логов по измерениям с расчетом метрик.
+
+    В режиме 'pandas' считается по переданному (уже отфильтрованному) DataFrame,
+    в режиме 'pushdown' — запросом GROUP BY к chatbot_logs с фильтрами в WHERE,
+    в режиме 'rollup' — по таблице почасовых агрегатов, поэтому время запроса
+    зависит от числа часов в периоде, а не от числа логов. Медиана в этом
+    режиме оценивается по гистограмме времени ответа, а запросы с
+    измерениями или условиями, которых нет в агрегатах (тип ошибки,
+    успешность), выполняются как в режиме 'pushdown'.
+
+    Args:
+        df: отфильтрованные данные (в режимах 'pushdown' и 'rollup' не используются)
+        dimensions: список измерений из DIMENSIONS
+        metrics: список метрик из METRICS
+        filters: состояние фильтров из select_filters
+        conditions: дополнительные условия равенства {колонка: значение}
+        mode: режим агрегации (по умолчанию AGGREGATION_MODE)
+
+    Returns:
+        DataFrame с колонками измерений и метрик, отсортированный по измерениям
+    """
+    mode = mode or get_aggregation_mode()
+    if mode == 'rollup' and not set(dimensions).union(conditions or {}) <= ROLLUP_DIMENSIONS.keys():
+        mode = 'pushdown'
+    if mode == 'pushdown':
+        return _aggregate_sql(dimensions, metrics, filters, conditions)
+    if mode == 'rollup':
+        return _aggregate_rollup(dimensions, metrics, filters, conditions)
+    return _aggregate_frame(df, dimensions, metrics, conditions)
+
+def has_rows(df, filters=None, mode=None):
+    """
+    Есть ли строки, удовлетворяющие фильтрам.
+
+    В режиме 'pandas' проверяется переданный DataFrame, в режимах
+    'pushdown' и 'rollup' — запросом EXISTS к chatbot_logs.
+    """
+    mode = mode or get_aggregation_mode()
+    if mode == 'pandas':
+        return len(df) > 0
+    return load_has_rows(filters)
+
+def _aggregate_sql(dimensions, metrics, filters, conditions):
+    """Агрегация на стороне PostgreSQL"""
+    where, params = build_where_clause(filters, conditions)
+    columns = [f"{DIMENSIONS[name][0]} AS {name}" for name in dimensions]
+    columns += [f"{METRICS[name][0]} AS {name}" for name in metrics]
+    query = f"SELECT {', '.join(columns)} FROM chatbot_logs WHERE {where}"
+    if dimensions:
+        positions = ', '.join(str(i) for i in range(1, len(dimensions) + 1))
+        query += f" GROUP BY {positions} ORDER BY {positions}"
+    return read_sql(query, params)
+
+def _aggregate_rollup(dimensions, metrics, filters, conditions):
+    """Агрегация по таблице почасовых агрегатов"""
+    where, params = build_where_clause(filters, conditions, mode='rollup')
+    columns = [f"{ROLLUP_DIMENSIONS[name]} AS {name}" for name in dimensions]
+    columns += [f"{ROLLUP_METRICS[name]} AS {name}" for name in metrics if ROLLUP_METRICS[name]]
+    buckets = [f'bucket_{i}' for i in range(len(RT_BUCKETS) + 1)]
+    if 'median_response_time' in metrics:
+        columns += [f"SUM(rt_histogram[{i + 1}])::bigint AS {bucket}" for i, bucket in enumerate(buckets)]
+        columns += ["MIN(rt_min) AS rt_low", "MAX(rt_max) AS rt_high"]
+    query = f"SELECT {', '.join(columns)} FROM {ROLLUP_TABLE} WHERE {where}"
+    if dimensions:
+        positions = ', '.join(str(i) for i in range(1, len(dimensions) + 1))
+        query += f" GROUP BY {positions} ORDER BY {positions}"
+    result = read_sql(query, params)
+
+    if 'median_response_time' in metrics:
+        result['median_response_time'] = [
+            histogram_median(counts, low, high)
+            for counts, low, high in zip(
+                result[buckets].fillna(0).to_numpy(), result['rt_low'], result['rt_high']
+            )
+        ]
+    return result[dimensions + metrics]
+
+def histogram_median(counts, low, high):
+    """
+    Оценка медианы по гистограмме времени ответа.
+
+    Внутри корзины, в которую попадает медиана, значения считаются
+    распределенными равномерно; границы корзин сужаются до известных
+    минимума и максимума.
+    """
+    total = counts.sum()
+    if not total:
+        return np.nan
+    target = total / 2
+    cumulative = np.cumsum(counts)
+    bucket = int(np.searchsorted(cumulative, target))
+    lower = max(RT_BUCKETS[bucket - 1] if bucket else 0, low)
+    upper = min(RT_BUCKETS[bucket] if bucket < len(RT_BUCKETS) else high, high)
+    before = cumulative[bucket] - counts[bucket]
+    return lower + (target - before) / counts[bucket] * (upper - lower)
+
+def _aggregate_frame(df, dimensions, metrics, conditions):
+    """Агрегация по DataFrame в памяти"""
+    for column, value in (conditions or {}).items():
+        df = df[df[column] == value]
+
+    values = pd.DataFrame({name: METRICS[name][1](df) for name in metrics}, index=df.index)
+    functions = {name: METRICS[name][2] for name in metrics}
+
+    if not dimensions:
+        return pd.DataFrame({name: [values[name].agg(function)] for name, function in functions.items()})
+
+    keys = [DIMENSIONS[name][1](df).rename(name) for name in dimensions]
+    return values.groupby(keys, observed=True).agg(functions).reset_index()
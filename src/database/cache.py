@@ -0,0 +1,297 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+import pandas as pd
+from config import DATA_CACHE_TTL, SELECTION_CACHE_MAX_BYTES
+from .schema import concat_compact
+from .snapshot import load_snapshot, save_snapshot, remove_snapshots
+
+# Общий для всех сессий Streamlit кэш данных (один на процесс)
+_lock = threading.Lock()
+_state = {
+    'df': None,
+    'last_id': 0,
+    'loaded_at': 0.0,
+    'version': 0,
+    # Версия данных таблицы, из которой загружен датасет (см. fetch_table_state)
+    'data_version': None,
+    # Число строк в последнем записанном снимке на диске и идет ли запись
+    'snapshot_rows': 0,
+    'snapshot_writing': False,
+    # Выполняющееся обновление датасета: остальные сессии ждут его результат
+    'pending': None
+}
+# Снимок переписывается, когда после него добавилось столько строк (доля датасета)
+SNAPSHOT_REWRITE_FRACTION = 0.1
+# Выборки по фильтрам и другие результаты запросов (LRU, ключ -> значение,
+# время загрузки и размер в байтах), не больше SELECTION_CACHE_MAX_BYTES
+_selections = OrderedDict()
+# Выполняющиеся загрузки выборок: остальные сессии ждут тот же результат
+_pending = {}
+_selection_state = {'bytes': 0, 'generation': 0}
+_stats = {
+    'hits': 0,
+    'misses': 0,
+    'selection_hits': 0,
+    'selection_misses': 0,
+    'selection_evictions': 0,
+    'refreshes': 0,
+    'rows_appended': 0,
+    'snapshot_loads': 0,
+    'snapshot_writes': 0,
+    'snapshot_load_duration': 0.0,
+    'full_load_duration': 0.0,
+    'last_refresh_duration': 0.0,
+    'total_refresh_duration': 0.0
+}
+
+def get_cached_dataset(fetch_rows, fetch_table_state, prepare, ttl=None, force_refresh=False,
+                       snapshot_key=None):
+    """
+    Возвращает закэшированный датасет, при необходимости дозагружая новые строки.
+
+    Запросы к базе выполняются без общей блокировки кэша, поэтому долгое
+    обновление не задерживает выборки и статистику других сессий; сессии,
+    которым нужен датасет во время обновления, ждут его результат, а не
+    запускают свое.
+
+    Args:
+        fetch_rows: функция (last_id) -> DataFrame со строками, у которых id > last_id
+        fetch_table_state: функция (last_id) -> (число строк с id <= last_id,
+            max(id), версия данных). Версия меняется при изменении уже
+            загруженных строк (например, пересчете типов ошибок), и тогда
+            таблица загружается заново.
+        prepare: функция подготовки загруженных строк
+        ttl: время жизни кэша в секундах (по умолчанию DATA_CACHE_TTL)
+        force_refresh: принудительно проверить наличие новых строк
+        snapshot_key: ключ снимка датасета на диске (None — без снимка).
+            Первый запрос процесса начинается со снимка, если версия данных и
+            число строк с id не больше сохраненного совпадают с таблицей, и
+            догружает только новые строки.
+
+    Returns:
+        DataFrame, общий для всех сессий. Его нельзя изменять на месте.
+    """
+    ttl = DATA_CACHE_TTL if ttl is None else ttl
+    with _lock:
+        df = _state['df']
+        if df is not None and not force_refresh and time.monotonic() - _state['loaded_at'] < ttl:
+            _stats['hits'] += 1
+            return df
+        pending = _state['pending']
+        if pending is None:
+            future = _state['pending'] = Future()
+            current = {key: _state[key] for key in ('df', 'last_id', 'data_version', 'snapshot_rows')}
+            generation = _selection_state['generation']
+    if pending is not None:
+        return pending.result()
+
+    try:
+        loaded = _load_dataset(current, fetch_rows, fetch_table_state, prepare, snapshot_key)
+    except Exception as e:
+        with _lock:
+            _state['pending'] = None
+        future.set_exception(e)
+        raise
+
+    snapshot = None
+    with _lock:
+        _state['pending'] = None
+        _record_load(loaded)
+        # Датасет, загруженный до invalidate_cache, не сохраняется
+        if generation == _selection_state['generation']:
+            if loaded['df'] is not current['df']:
+                _state['version'] += 1
+            for key in ('df', 'last_id', 'data_version', 'snapshot_rows'):
+                _state[key] = loaded[key]
+            _state['loaded_at'] = time.monotonic()
+            snapshot = _snapshot_to_write(snapshot_key)
+    _write_snapshot(snapshot_key, snapshot)
+    future.set_result(loaded['df'])
+    return loaded['df']
+
+def _load_dataset(current, fetch_rows, fetch_table_state, prepare, snapshot_key):
+    """
+    Обновление датасета без блокировки кэша.
+
+    Args:
+        current: df, last_id, data_version и snapshot_rows закэшированного датасета
+
+    Returns:
+        dict: новые значения тех же ключей и сведения о загрузке для _record_load
+    """
+    started = time.perf_counter()
+    loaded = dict(current, kind='refresh', appended=0, snapshot_load_duration=None)
+    if loaded['df'] is None and snapshot_key is not None:
+        snapshot = load_snapshot(snapshot_key)
+        if snapshot is not None:
+            loaded['df'], loaded['last_id'], loaded['snapshot_rows'], loaded['data_version'] = snapshot
+            loaded['snapshot_load_duration'] = time.perf_counter() - started
+
+    # Если строки были удалены (например, после TRUNCATE) или изменены,
+    # догрузка невозможна
+    known_rows, max_id, data_version = fetch_table_state(loaded['last_id'])
+    df = loaded['df']
+    if df is not None and known_rows == len(df) and data_version == loaded['data_version']:
+        if max_id is not None and max_id > loaded['last_id']:
+            new_rows = prepare(fetch_rows(loaded['last_id']))
+            if not new_rows.empty:
+                loaded['df'] = _appended(df, new_rows)
+                loaded['last_id'] = max(loaded['last_id'], int(new_rows['id'].max()))
+                loaded['appended'] = len(new_rows)
+    else:
+        # Полная загрузка таблицы
+        df = prepare(fetch_rows(0))
+        loaded.update(
+            df=df,
+            last_id=int(df['id'].max()) if not df.empty else 0,
+            data_version=data_version,
+            snapshot_rows=0,
+            kind='full'
+        )
+    loaded['duration'] = time.perf_counter() - started
+    return loaded
+
+def _record_load(loaded):
+    """Учитывает загрузку датасета в счетчиках (вызывается под _lock)"""
+    if loaded['snapshot_load_duration'] is not None:
+        _stats['snapshot_loads'] += 1
+        _stats['snapshot_load_duration'] = loaded['snapshot_load_duration']
+    _stats['rows_appended'] += loaded['appended']
+    if loaded['kind'] == 'full':
+        _stats['misses'] += 1
+        _stats['full_load_duration'] = loaded['duration']
+    else:
+        _stats['refreshes'] += 1
+        _stats['last_refresh_duration'] = loaded['duration']
+        _stats['total_refresh_duration'] += loaded['duration']
+
+def _snapshot_to_write(snapshot_key):
+    """
+    Данные для снимка, если его еще нет или после него добавилось много строк.
+
+    Вызывается под _lock. Returns: (датасет, максимальный id, версия
+    данных, поколение кэша) или None, если записывать не нужно.
+    """
+    df = _state['df']
+    if snapshot_key is None or df is None or _state['snapshot_writing']:
+        return None
+    added = len(df) - _state['snapshot_rows']
+    if _state['snapshot_rows'] and added < max(len(df) * SNAPSHOT_REWRITE_FRACTION, 1):
+        return None
+    _state['snapshot_writing'] = True
+    return df, _state['last_id'], _state['data_version'], _selection_state['generation']
+
+def _write_snapshot(snapshot_key, snapshot):
+    """
+    Записывает снимок после освобождения _lock: запись большого датасета
+    на диск не задерживает запросы других сессий к кэшу.
+    """
+    if snapshot is None:
+        return
+    df, last_id, data_version, generation = snapshot
+    saved = save_snapshot(snapshot_key, df, last_id, data_version)
+    with _lock:
+        _state['snapshot_writing'] = False
+        if generation != _selection_state['generation']:
+            # Кэш сбросили во время записи — снимок уже устарел
+            if saved:
+                remove_snapshots()
+        elif saved:
+            _state['snapshot_rows'] = len(df)
+            _stats['snapshot_writes'] += 1
+
+def _appended(df, new_rows):
+    """Закэшированный датасет с новыми строками (исходный не изменяется)"""
+    needs_sort = not df.empty and new_rows['timestamp'].min() < df['timestamp'].max()
+    df = concat_compact(df, new_rows)
+    if needs_sort:
+        # Строки пришли "из прошлого" — восстанавливаем порядок по времени
+        df = df.sort_values(['date', 'question_time'], kind='mergesort', ignore_index=True)
+    return df
+
+def _value_size(value):
+    """Примерный размер результата в байтах"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    return sys.getsizeof(value)
+
+def get_cached_selection(key, fetch, ttl=None):
+    """
+    Возвращает закэшированный результат fetch() для ключа key.
+
+    Результат живет ttl секунд (по умолчанию DATA_CACHE_TTL); при превышении
+    SELECTION_CACHE_MAX_BYTES вытесняются давно не использованные. Запрос
+    выполняется без общей блокировки кэша, поэтому медленная выборка не
+    задерживает другие сессии; одновременные запросы того же ключа ждут
+    одну загрузку.
+    """
+    ttl = DATA_CACHE_TTL if ttl is None else ttl
+    with _lock:
+        cached = _selections.get(key)
+        if cached is not None and time.monotonic() - cached[1] < ttl:
+            _selections.move_to_end(key)
+            _stats['selection_hits'] += 1
+            return cached[0]
+        pending = _pending.get(key)
+        if pending is None:
+            _stats['selection_misses'] += 1
+            future = _pending[key] = Future()
+            generation = _selection_state['generation']
+    if pending is not None:
+        return pending.result()
+
+    try:
+        value = fetch()
+    except Exception as e:
+        with _lock:
+            _pending.pop(key, None)
+        future.set_exception(e)
+        raise
+
+    size = _value_size(value)
+    with _lock:
+        _pending.pop(key, None)
+        # Результат, загруженный до invalidate_cache, не сохраняется
+        if generation == _selection_state['generation'] and size <= SELECTION_CACHE_MAX_BYTES:
+            if key in _selections:
+                _selection_state['bytes'] -= _selections.pop(key)[2]
+            _selections[key] = (value, time.monotonic(), size)
+            _selection_state['bytes'] += size
+            while _selection_state['bytes'] > SELECTION_CACHE_MAX_BYTES:
+                _, (_, _, evicted) = _selections.popitem(last=False)
+                _selection_state['bytes'] -= evicted
+                _stats['selection_evictions'] += 1
+    future.set_result(value)
+    return value
+
+def get_dataset_version():
+    """Номер версии датасета, увеличивается при каждом изменении данных"""
+    return _state['version']
+
+def get_cache_stats():
+    """Счетчики попаданий, промахов и времени обновления кэша"""
+    with _lock:
+        stats = dict(_stats)
+        stats['rows'] = 0 if _state['df'] is None else len(_state['df'])
+        stats['last_id'] = _state['last_id']
+        stats['version'] = _state['version']
+        stats['data_version'] = _state['data_version']
+        stats['selections'] = len(_selections)
+        stats['selection_bytes'] = _selection_state['bytes']
+    return stats
+
+def invalidate_cache():
+    """Сбрасывает кэш и снимок на диске, следующий запрос загрузит таблицу целиком"""
+    with _lock:
+        remove_snapshots()
+        _state['df'] = None
+        _state['last_id'] = 0
+        _state['data_version'] = None
+        _state['loaded_at'] = 0.0
+        _state['snapshot_rows'] = 0
+        _selections.clear()
+        _selection_state['bytes'] = 0
+        _selection_state['generation'] += 1
@@ -1,61 +1,236 @@
+import hashlib
 from config import DB_CONFIG
 import pandas as pd
 import streamlit as st
 from datetime import datetime
-from sqlalchemy import create_engine
+from .cache import get_cached_dataset, get_cached_selection
+from .pool import read_sql, read_prepared
+from .filters import build_where_clause, filters_key
+from .schema import compact_frame, FILL_VALUES
 
-def load_data_from_db():
-    """Загрузка данных из базы данных"""
+# Время ответа в секундах; ответ "раньше" вопроса означает переход через полночь
+RESPONSE_TIME_SQL = """(
+    EXTRACT(EPOCH FROM (answer_time - question_time))
+    + CASE WHEN answer_time < question_time THEN 86400 ELSE 0 END
+)::float"""
+
+# Тип ошибки неудовлетворительного ответа (см. src/ingest/classifier.py);
+# еще не классифицированные строки относятся к типу по умолчанию
+ERROR_TYPE_SQL = "CASE WHEN satisfaction = 0 THEN COALESCE(error_type, 'Другие ошибки') END"
+
+# Колонки датасета (без текстов запросов и ответов)
+ROW_COLUMNS_SQL = f"""
+    id,
+    date,
+    EXTRACT(EPOCH FROM question_time)::int AS question_time,
+    EXTRACT(EPOCH FROM answer_time)::int AS answer_time,
+    name,
+    campus,
+    education_level,
+    category,
+    subcategory,
+    satisfaction,
+    {RESPONSE_TIME_SQL} AS response_time,
+    {ERROR_TYPE_SQL} AS error_type
+"""
+
+def _fetch_rows(last_id):
+    """
+    Чтение строк с id больше last_id.
+
+    При last_id=0 читается вся таблица, что на большой таблице дольше
+    statement_timeout запросов дашборда, поэтому ограничение снимается.
+    """
+    # Дозагрузка новых строк повторяется при каждом обновлении кэша
+    return read_prepared('dashboard_new_rows', f"""
+        SELECT {ROW_COLUMNS_SQL}
+        FROM chatbot_logs
+        WHERE id > $1
+        ORDER BY date, question_time
+    """, (last_id,), lift_timeout=True)
+
+# Колонки датасета в порядке ROW_COLUMNS_SQL
+ROW_COLUMNS = [
+    'id', 'date', 'question_time', 'answer_time', 'name', 'campus', 'education_level',
+    'category', 'subcategory', 'satisfaction', 'response_time', 'error_type'
+]
+
+def empty_dataset():
+    """
+    Пустой датасет в компактной схеме.
+
+    В режимах pushdown и rollup строки в память не загружаются, и
+    представления получают его вместо данных: агрегаты и страницы они
+    читают из базы, а наличие строк проверяет has_rows.
+    """
+    return compact_frame(pd.DataFrame({column: [] for column in ROW_COLUMNS}))
+
+def _fetch_has_rows(filters):
+    """Есть ли в chatbot_logs строки, удовлетворяющие фильтрам"""
+    where, params = build_where_clause(filters)
+    rows = read_sql(f"SELECT EXISTS (SELECT 1 FROM chatbot_logs WHERE {where}) AS has_rows", params)
+    return bool(rows['has_rows'].iloc[0])
+
+def load_has_rows(filters, ttl=None):
+    """
+    Проверка наличия строк по фильтрам без их загрузки (кэшируется на ttl секунд).
+
+    Returns:
+        bool: False также при ошибке запроса
+    """
     try:
-        # Создаем URL подключения для SQLAlchemy
-        db_url = f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}"
-        
-        # Создаем движок SQLAlchemy
-        engine = create_engine(db_url)
-        
-        # Выполняем запрос через SQLAlchemy
-        query = """
-            SELECT 
-                date,
-                question_time,
-                answer_time,
-                name,
-                campus,
-                education_level,
-                category,
-                subcategory,
-                query,
-                response,
-                satisfaction,
-                date || ' ' || question_time as timestamp
-            FROM chatbot_logs
-            ORDER BY date, question_time
-        """
-        
-        # Читаем данные с помощью pandas
-        df = pd.read_sql(query, engine)
-        
-        # Convert timestamp to datetime
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        
-        # Преобразуем колонки в нужный формат
-        df['question_time'] = pd.to_datetime(df['question_time'], format='%H:%M:%S').dt.time
-        df['answer_time'] = pd.to_datetime(df['answer_time'], format='%H:%M:%S').dt.time
-        
-        # Добавляем категорию ошибки на основе satisfaction
-        df['error_category'] = df['satisfaction'].map(
-            lambda x: 'success' if x == 1 else 'incorrect_answer'
-        )
-        
-        # Заменяем None на NaN для корректной работы с pandas
-        df = df.fillna({
-            'subcategory': 'Не указано',
-            'category': 'Другое',
-            'campus': 'Не указан',
-            'education_level': 'Не указан'
-        })
-        
+        return get_cached_selection(('has_rows', filters_key(filters)), lambda: _fetch_has_rows(filters), ttl=ttl)
+    except Exception as e:
+        st.error(f"Ошибка при проверке наличия данных: {str(e)}")
+        return False
+
+def load_text_columns(ids):
+    """Загрузка текстов запросов и ответов для указанных id"""
+    query = """
+        SELECT id, query, response
+        FROM chatbot_logs
+        WHERE id = ANY($1::int[])
+    """
+    ids = [int(row_id) for row_id in ids]
+    return read_prepared('dashboard_text_columns', query, (ids,)).set_index('id')
+
+def attach_text_columns(df):
+    """
+    Добавляет к строкам DataFrame колонки query и response.
+
+    Основной датасет хранится без текстовых колонок, поэтому тексты
+    подгружаются только для тех строк, которые действительно показываются.
+    """
+    if {'query', 'response'}.issubset(df.columns):
         return df
+    if df.empty:
+        return df.assign(query=pd.Series(dtype=object), response=pd.Series(dtype=object))
+    try:
+        return df.join(load_text_columns(df['id']), on='id')
+    except Exception as e:
+        st.error(f"Ошибка при загрузке текстов запросов: {str(e)}")
+        return df.assign(query=None, response=None)
+
+# Счетчик изменений уже загруженных строк (см. src/ingest/versions.py)
+DATA_VERSION_TABLE = 'chatbot_data_version'
+
+def _fetch_table_state(last_id):
+    """
+    Количество уже загруженных строк в таблице, максимальный id и версия данных.
+
+    Версия — счетчик из DATA_VERSION_TABLE (0, если таблицы еще нет). Она
+    читается до загрузки строк, поэтому изменение, зафиксированное позже,
+    сменит версию при следующей проверке.
+    """
+    query = f"""
+        SELECT COUNT(*) FILTER (WHERE id <= $1) AS known_rows, MAX(id) AS max_id,
+            to_regclass('{DATA_VERSION_TABLE}') IS NOT NULL AS versioned
+        FROM chatbot_logs
+    """
+    # COUNT(*) просматривает всю таблицу и тоже выполняется без statement_timeout
+    state = read_prepared('dashboard_table_state', query, (last_id,), lift_timeout=True).iloc[0]
+    max_id = None if pd.isna(state['max_id']) else int(state['max_id'])
+    data_version = 0
+    if state['versioned']:
+        version = read_prepared(
+            'dashboard_data_version',
+            f"SELECT COALESCE(MAX(version), 0) AS version FROM {DATA_VERSION_TABLE}"
+        )
+        data_version = int(version['version'].iloc[0])
+    return int(state['known_rows']), max_id, data_version
+
+def _snapshot_key():
+    """Ключ снимка датасета: база данных и набор колонок (смена схемы — новый снимок)"""
+    source = f"{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}\n{ROW_COLUMNS_SQL}"
+    return hashlib.md5(source.encode('utf-8')).hexdigest()[:16]
+
+def load_data_from_db(ttl=None, force_refresh=False):
+    """
+    Загрузка данных из базы данных.
+
+    Тексты запросов и ответов в датасет не входят, их подгружает
+    attach_text_columns, а остальные колонки хранятся в компактной схеме
+    (см. compact_frame). Данные кэшируются на уровне процесса: в течение
+    ttl секунд повторные вызовы возвращают готовый DataFrame, а после
+    истечения ttl из базы дочитываются только строки с id больше
+    последнего загруженного. Датасет также сохраняется на диск (см.
+    snapshot.py), поэтому новый процесс читает из базы только строки,
+    добавленные после снимка.
+
+    Используется в режиме 'pandas': фильтры применяются к датасету в
+    памяти (см. filter_frame). Фильтры в WHERE передаются только в
+    режимах 'pushdown' и 'rollup', где строки в память не загружаются.
+    """
+    try:
+        return get_cached_dataset(
+            _fetch_rows,
+            _fetch_table_state,
+            compact_frame,
+            ttl=ttl,
+            force_refresh=force_refresh,
+            snapshot_key=_snapshot_key()
+        )
     except Exception as e:
         st.error(f"Ошибка при загрузке данных из базы: {str(e)}")
         return pd.DataFrame()
+
+def _fetch_filter_options():
+    """Границы дат и значения фильтров одним запросом по всей таблице"""
+    query = """
+        SELECT
+            GROUPING(category, campus, education_level) AS grouping,
+            category,
+            campus,
+            education_level,
+            MIN(date) AS min_date,
+            MAX(date) AS max_date,
+            MIN(date + question_time) AS first_seen
+        FROM chatbot_logs
+        GROUP BY GROUPING SETS ((category), (campus), (education_level), ())
+        ORDER BY first_seen
+    """
+    rows = read_sql(query)
+    # Номер набора группировки: 0b011 — категория, 0b101 — кампус, 0b110 — уровень
+    sets = {3: 'category', 5: 'campus', 6: 'education_level'}
+    totals = rows[rows['grouping'] == 7]
+    empty = totals.empty or pd.isna(totals['min_date'].iloc[0])
+    return {
+        'min_date': None if empty else totals['min_date'].iloc[0],
+        'max_date': None if empty else totals['max_date'].iloc[0],
+        # Значения в порядке первого появления, как в индексе фильтров
+        'distinct': {
+            column: list(dict.fromkeys(rows.loc[rows['grouping'] == code, column].fillna(FILL_VALUES[column])))
+            for code, column in sets.items()
+        }
+    }
+
+def load_data_version(ttl=None):
+    """
+    Версия данных в таблице без загрузки строк: число строк, максимальный id
+    и счетчик изменений уже загруженных строк.
+
+    Используется в режимах pushdown и rollup, где датасет в память не
+    загружается; значение кэшируется на ttl секунд.
+
+    Returns:
+        Tuple[int, int, int] или None при ошибке
+    """
+    try:
+        # Все id не больше максимального значения INTEGER, поэтому known_rows — число строк
+        return get_cached_selection('data_version', lambda: _fetch_table_state(2 ** 31 - 1), ttl=ttl)
+    except Exception as e:
+        st.error(f"Ошибка при проверке версии данных: {str(e)}")
+        return None
+
+def load_filter_options(ttl=None):
+    """
+    Значения для фильтров без загрузки строк.
+
+    Returns:
+        dict: min_date, max_date и distinct (как у индекса фильтров) или None при ошибке
+    """
+    try:
+        return get_cached_selection('filter_options', _fetch_filter_options, ttl=ttl)
+    except Exception as e:
+        st.error(f"Ошибка при загрузке значений фильтров: {str(e)}")
+        return None
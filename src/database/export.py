@@ -0,0 +1,183 @@
+import atexit
+import codecs
+import os
+import tempfile
+import threading
+import time
+from config import EXPORT_MAX_DOWNLOAD_BYTES
+from .pool import get_connection, lift_statement_timeout
+from .filters import build_where_clause
+
+# Размер блока при копировании выгрузки из PostgreSQL
+EXPORT_CHUNK_BYTES = 1024 * 1024
+
+# Колонки выгрузки: выражение и заголовок
+EXPORT_COLUMNS = [
+    ('date', 'Дата'),
+    ('question_time', 'Время вопроса'),
+    ('answer_time', 'Время ответа'),
+    ('name', 'Имя'),
+    ('campus', 'Кампус'),
+    ('education_level', 'Уровень образования'),
+    ('category', 'Категория'),
+    ('subcategory', 'Подкатегория'),
+    ('query', 'Запрос'),
+    ('response', 'Ответ'),
+    ("CASE satisfaction WHEN 1 THEN 'Удовлетворительно' ELSE 'Неудовлетворительно' END", 'Статус')
+]
+
+# Файлы выгрузок во временном каталоге: префикс имени и возраст (в секундах),
+# после которого нескачанная выгрузка удаляется (например, если сессия
+# закрылась без скачивания)
+EXPORT_PREFIX = 'chatbot_export_'
+EXPORT_MAX_AGE = 6 * 3600
+
+# Выгрузки, созданные этим процессом (удаляются при его завершении)
+_lock = threading.Lock()
+_created = set()
+
+# Форматы выгрузки: MIME-тип и расширение файла
+EXPORT_FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet')
+}
+
+def export_query(filters=None, conditions=None):
+    """Запрос выгрузки строк по фильтрам в порядке убывания времени вопроса"""
+    where, params = build_where_clause(filters, conditions)
+    columns = ', '.join(f'{expression} AS "{title}"' for expression, title in EXPORT_COLUMNS)
+    query = f"""
+        SELECT {columns}
+        FROM chatbot_logs
+        WHERE {where}
+        ORDER BY date DESC, question_time DESC, id DESC
+    """
+    return query, params
+
+def copy_to_file(file, filters=None, conditions=None):
+    """
+    Копирует строки выгрузки в CSV-файл через COPY ... TO STDOUT.
+
+    Данные пишутся в file блоками по мере получения от сервера, поэтому
+    размер выгрузки не ограничен памятью процесса.
+    """
+    query, params = export_query(filters, conditions)
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            sql = cur.mogrify(query, params).decode('utf-8')
+            # Выгрузка может идти дольше обычного запроса дашборда
+            lift_statement_timeout(cur)
+            cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER)", file, size=EXPORT_CHUNK_BYTES)
+        conn.commit()
+
+def _csv_to_parquet(csv_path, parquet_path):
+    """Перекладывает CSV выгрузки в Parquet (zstd) пакетами, не читая файл целиком"""
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    import pyarrow.parquet as pq
+
+    column_types = {title: pa.string() for _, title in EXPORT_COLUMNS}
+    column_types.update({'Дата': pa.date32(), 'Время вопроса': pa.time32('s'), 'Время ответа': pa.time32('s')})
+    reader = pa_csv.open_csv(
+        csv_path,
+        read_options=pa_csv.ReadOptions(block_size=EXPORT_CHUNK_BYTES),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types, strings_can_be_null=True)
+    )
+    with pq.ParquetWriter(parquet_path, reader.schema, compression='zstd') as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+
+def export_to_file(filters=None, conditions=None, fmt='csv'):
+    """
+    Формирует файл выгрузки во временном каталоге.
+
+    CSV пишется с BOM, чтобы Excel открывал его в UTF-8 (как раньше
+    to_csv(...).encode('utf-8-sig')). Parquet собирается из потока COPY
+    пакетами и сжимается zstd.
+
+    Returns:
+        str: путь к файлу (удаляется вызывающей стороной)
+    """
+    fd, csv_path = tempfile.mkstemp(prefix=EXPORT_PREFIX, suffix='.csv')
+    _track(csv_path)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            if fmt == 'csv':
+                file.write(codecs.BOM_UTF8)
+            copy_to_file(file, filters, conditions)
+        if fmt == 'csv':
+            return csv_path
+
+        fd, parquet_path = tempfile.mkstemp(prefix=EXPORT_PREFIX, suffix=EXPORT_FORMATS[fmt][1])
+        os.close(fd)
+        _track(parquet_path)
+        try:
+            _csv_to_parquet(csv_path, parquet_path)
+        except Exception:
+            remove_export(parquet_path)
+            raise
+        remove_export(csv_path)
+        return parquet_path
+    except Exception:
+        remove_export(csv_path)
+        raise
+
+def _track(path):
+    """Запоминает файл выгрузки, чтобы удалить его при завершении процесса"""
+    with _lock:
+        _created.add(path)
+
+def remove_export(path):
+    """Удаляет файл выгрузки (если он еще есть)"""
+    with _lock:
+        _created.discard(path)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def export_too_large(path, limit=EXPORT_MAX_DOWNLOAD_BYTES):
+    """Больше ли файл выгрузки предела для скачивания"""
+    return os.path.getsize(path) > limit
+
+def read_export(path):
+    """
+    Читает файл выгрузки для скачивания и удаляет его.
+
+    Вызывается один раз, когда пользователь нажимает "Скачать", а не при
+    каждой перерисовке страницы. Streamlit передает скачиваемые данные
+    только из памяти (файловый объект он тоже читает целиком), поэтому
+    файлы больше EXPORT_MAX_DOWNLOAD_BYTES не читаются.
+
+    Raises:
+        ValueError: файл больше предела
+    """
+    try:
+        if export_too_large(path):
+            raise ValueError("выгрузка больше предела для скачивания")
+        with open(path, 'rb') as file:
+            return file.read()
+    finally:
+        remove_export(path)
+
+def cleanup_exports(max_age=EXPORT_MAX_AGE):
+    """Удаляет выгрузки старше max_age секунд во временном каталоге (в том числе других процессов)"""
+    directory = tempfile.gettempdir()
+    deadline = time.time() - max_age
+    for name in os.listdir(directory):
+        if not name.startswith(EXPORT_PREFIX):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < deadline:
+                remove_export(path)
+        except OSError:
+            continue
+
+@atexit.register
+def _remove_created():
+    """Удаляет оставшиеся выгрузки этого процесса при его завершении"""
+    with _lock:
+        paths = list(_created)
+    for path in paths:
+        remove_export(path)
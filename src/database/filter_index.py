@@ -0,0 +1,108 @@
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+
+# Колонки, для значений которых строятся битовые карты строк
+INDEXED_COLUMNS = ['category', 'subcategory', 'campus', 'education_level']
+
+_lock = threading.Lock()
+_cached = {'frame': None, 'index': None}
+
+def build_filter_index(df):
+    """
+    Строит индекс для быстрой фильтрации DataFrame.
+
+    Индекс содержит отсортированный массив меток времени (диапазон дат
+    ищется бинарным поиском), упакованные битовые карты строк для каждого
+    значения индексируемых колонок и списки различных значений для фильтров.
+    """
+    timestamps = df['timestamp'].to_numpy()
+    if len(timestamps) and not df['timestamp'].is_monotonic_increasing:
+        order = np.argsort(timestamps, kind='stable')
+        timestamps = timestamps[order]
+    else:
+        order = None
+
+    bitmaps = {}
+    distinct = {}
+    for column in INDEXED_COLUMNS:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            codes = df[column].cat.codes.to_numpy()
+            values = df[column].cat.categories
+        else:
+            codes, values = pd.factorize(df[column])
+        bitmaps[column] = {
+            value: np.packbits(codes == code)
+            for code, value in enumerate(values)
+        }
+        # Значения в порядке первого появления, как у Series.unique()
+        distinct[column] = [values[code] for code in pd.unique(codes) if code >= 0]
+
+    return {
+        'rows': len(df),
+        'timestamps': timestamps,
+        'order': order,
+        'bitmaps': bitmaps,
+        'distinct': distinct,
+        'min_date': pd.Timestamp(timestamps[0]).date() if len(timestamps) else None,
+        'max_date': pd.Timestamp(timestamps[-1]).date() if len(timestamps) else None
+    }
+
+def get_filter_index(df):
+    """Возвращает индекс для DataFrame, строя его один раз на версию данных"""
+    with _lock:
+        frame = _cached['frame']() if _cached['frame'] is not None else None
+        if frame is not df:
+            _cached['index'] = build_filter_index(df)
+            _cached['frame'] = weakref.ref(df)
+        return _cached['index']
+
+def select_rows(index, filters):
+    """
+    Номера строк, удовлетворяющих фильтрам.
+
+    Диапазон дат задает непрерывный отрезок отсортированных строк, а
+    фильтры по значениям — пересечение битовых карт внутри этого отрезка.
+    """
+    start = np.datetime64(filters['start_date'], 'ns')
+    end = np.datetime64(filters['end_date'], 'ns') + np.timedelta64(1, 'D')
+    lo = int(np.searchsorted(index['timestamps'], start, side='left'))
+    hi = int(np.searchsorted(index['timestamps'], end, side='left'))
+
+    selected = [
+        index['bitmaps'][column].get(filters[column])
+        for column in INDEXED_COLUMNS
+        if filters.get(column) is not None
+    ]
+
+    positions = np.arange(lo, hi) if index['order'] is None else np.sort(index['order'][lo:hi])
+    if not selected:
+        return positions
+    if any(bitmap is None for bitmap in selected) or lo >= hi:
+        return positions[:0]
+
+    combined = selected[0]
+    for bitmap in selected[1:]:
+        combined = combined & bitmap
+
+    if index['order'] is None:
+        # Распаковываем только байты, покрывающие отрезок [lo, hi)
+        bits = np.unpackbits(combined[lo // 8:(hi + 7) // 8])
+        bits = bits[lo % 8:lo % 8 + (hi - lo)]
+        return lo + np.flatnonzero(bits)
+
+    bits = np.unpackbits(combined, count=index['rows']).astype(bool)
+    return positions[bits[positions]]
+
+def filter_frame(df, filters):
+    """
+    Применяет фильтры к DataFrame с помощью индекса.
+
+    Если выбраны все строки (фильтры по умолчанию), возвращается сам df без
+    копирования: это общий датасет, и изменять результат на месте нельзя.
+    """
+    positions = select_rows(get_filter_index(df), filters)
+    if len(positions) == len(df):
+        return df
+    return df.iloc[positions]
@@ -0,0 +1,61 @@
+from .schema import FILL_VALUES
+
+# Колонки, по которым фильтры и условия сравниваются на равенство
+FILTER_COLUMNS = ['category', 'subcategory', 'campus', 'education_level']
+
+# Условия диапазона дат по сырым логам и по почасовым агрегатам
+DATE_RANGE = {
+    'pushdown': ("date >= %(start_date)s", "date <= %(end_date)s"),
+    'rollup': ("hour >= %(start_date)s", "hour < %(end_date)s::date + 1")
+}
+
+def _equality(column, param, value, mode):
+    """
+    Условие равенства колонки параметру.
+
+    В сырых логах пустое значение показывается как значение по умолчанию
+    (см. FILL_VALUES), поэтому для него добавляется IS NULL. Колонка остается
+    без обертки, чтобы условие могло использовать индекс.
+    """
+    if mode == 'pushdown' and FILL_VALUES.get(column) == value:
+        return f"({column} = %({param})s OR {column} IS NULL)"
+    return f"{column} = %({param})s"
+
+def build_where_clause(filters=None, conditions=None, mode='pushdown'):
+    """
+    Строит параметризованное условие WHERE по состоянию фильтров.
+
+    Args:
+        filters: словарь фильтров из select_filters (None означает "Все")
+        conditions: дополнительные условия равенства {колонка: значение}
+        mode: 'pushdown' — условие для chatbot_logs,
+              'rollup' — для таблицы почасовых агрегатов
+
+    Returns:
+        Tuple[str, dict]: текст условия и параметры запроса
+    """
+    clauses = []
+    params = {}
+    filters = filters or {}
+    start_clause, end_clause = DATE_RANGE[mode]
+
+    if filters.get('start_date') is not None:
+        clauses.append(start_clause)
+        params['start_date'] = filters['start_date']
+    if filters.get('end_date') is not None:
+        clauses.append(end_clause)
+        params['end_date'] = filters['end_date']
+
+    equalities = [('filter', column, filters.get(column)) for column in FILTER_COLUMNS]
+    equalities += [('condition', column, value) for column, value in (conditions or {}).items()]
+    for prefix, column, value in equalities:
+        if value is None:
+            continue
+        clauses.append(_equality(column, f'{prefix}_{column}', value, mode))
+        params[f'{prefix}_{column}'] = value
+
+    return (' AND '.join(clauses) or 'TRUE'), params
+
+def filters_key(filters):
+    """Хэшируемый ключ состояния фильтров (для кэширования выборок)"""
+    return tuple(sorted((name, value) for name, value in (filters or {}).items() if value is not None))
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+from .aggregation import get_aggregation_mode
+from .connection import ROW_COLUMNS_SQL, attach_text_columns
+from .pool import read_sql
+from .filters import build_where_clause
+from .schema import compact_frame
+
+# Число строк на странице детальной таблицы
+PAGE_SIZE = 100
+
+def page_cursor(page):
+    """
+    Ключ последней строки страницы для запроса следующей.
+
+    Строки упорядочены по убыванию (date, question_time, id), ключ —
+    метка времени вопроса и id. None, если страница пустая.
+    """
+    if page.empty:
+        return None
+    last = page.iloc[-1]
+    return last['timestamp'], int(last['id'])
+
+def fetch_page(df, filters=None, conditions=None, after=None, limit=PAGE_SIZE, mode=None):
+    """
+    Страница последних запросов с текстами, начиная после ключа after.
+
+    Используется пагинация по ключу (date, question_time, id): вместо
+    сортировки всех строк и пропуска предыдущих страниц читаются только
+    limit строк, следующих за ключом. В режимах 'pushdown' и 'rollup' страница
+    читается из chatbot_logs по индексу (date, question_time), в режиме
+    'pandas' выбирается из переданного DataFrame без полной сортировки.
+
+    Args:
+        df: отфильтрованные данные (в режимах 'pushdown' и 'rollup' не используются)
+        filters: состояние фильтров из select_filters
+        conditions: дополнительные условия равенства {колонка: значение}
+        after: ключ из page_cursor предыдущей страницы (None — первая страница)
+        limit: число строк на странице
+        mode: режим агрегации (по умолчанию AGGREGATION_MODE)
+
+    Returns:
+        DataFrame со строками страницы в порядке убывания времени вопроса
+    """
+    mode = mode or get_aggregation_mode()
+    if mode == 'pandas':
+        for column, value in (conditions or {}).items():
+            df = df[df[column] == value]
+        return attach_text_columns(_frame_page(df, after, limit))
+    return _fetch_page_sql(filters, conditions, after, limit)
+
+def _fetch_page_sql(filters, conditions, after, limit):
+    """Страница строк из chatbot_logs"""
+    where, params = build_where_clause(filters, conditions)
+    if after is not None:
+        timestamp, row_id = after
+        where += " AND (date, question_time, id) < (%(after_date)s, %(after_time)s, %(after_id)s)"
+        params.update(after_date=timestamp.date(), after_time=timestamp.time(), after_id=row_id)
+    query = f"""
+        SELECT {ROW_COLUMNS_SQL}, query, response
+        FROM chatbot_logs
+        WHERE {where}
+        ORDER BY date DESC, question_time DESC, id DESC
+        LIMIT %(limit)s
+    """
+    page = read_sql(query, {**params, 'limit': limit})
+    return compact_frame(page)
+
+def _frame_page(df, after, limit):
+    """
+    Страница строк DataFrame по убыванию (timestamp, id).
+
+    Для данных, отсортированных по времени (так их возвращает база), границы
+    страницы находятся бинарным поиском, и сортируются только строки
+    страницы вместе с равными по времени соседями. В остальных случаях
+    используется nlargest, который не сортирует весь DataFrame.
+    """
+    if not df['timestamp'].is_monotonic_increasing:
+        if after is not None:
+            timestamps = df['timestamp'].to_numpy()
+            after_ts = np.datetime64(after[0], 'ns')
+            df = df[(timestamps < after_ts) | ((timestamps == after_ts) & (df['id'].to_numpy() < after[1]))]
+        return df.nlargest(limit, ['timestamp', 'id'])
+
+    timestamps = df['timestamp'].to_numpy()
+    if after is None:
+        lo = hi = len(df)
+        ties = df.iloc[0:0]
+    else:
+        after_ts = np.datetime64(after[0], 'ns')
+        lo = int(np.searchsorted(timestamps, after_ts, side='left'))
+        hi = int(np.searchsorted(timestamps, after_ts, side='right'))
+        ties = df.iloc[lo:hi]
+        ties = ties[ties['id'] < after[1]]
+    # Строки раньше ключа: последние limit штук и все равные по времени первой из них
+    start = max(lo - limit, 0)
+    if start > 0:
+        start = int(np.searchsorted(timestamps, timestamps[start], side='left'))
+    candidates = pd.concat([df.iloc[start:lo], ties]) if len(ties) else df.iloc[start:lo]
+    return candidates.sort_values(['timestamp', 'id'], ascending=False).head(limit)
@@ -0,0 +1,195 @@
+import threading
+import time
+from contextlib import contextmanager
+import pandas as pd
+import psycopg2
+from sqlalchemy import create_engine, event
+from config import DB_CONFIG, DB_POOL_CONFIG
+
+# Общий пул соединений процесса. Через него ходят и запросы дашборда, и
+# скрипты загрузки: соединение открывается один раз и переиспользуется,
+# перед выдачей проверяется (pre-ping), а число соединений ограничено
+# размером пула. На каждом соединении задается statement_timeout.
+
+_lock = threading.Lock()
+_pool = {
+    'engine': None,
+    'settings': dict(DB_POOL_CONFIG)
+}
+_stats = {
+    'checkouts': 0,
+    'wait_total': 0.0,
+    'wait_max': 0.0,
+    'queries': 0,
+    'query_total': 0.0,
+    'query_max': 0.0,
+    'prepares': 0,
+    'prepared_executions': 0
+}
+
+def configure_pool(**overrides):
+    """
+    Меняет параметры пула (size, max_overflow, timeout, statement_timeout_ms).
+
+    Скрипты загрузки вызывают ее до первого запроса, например чтобы снять
+    ограничение времени запроса или выделить соединение каждому писателю.
+    Уже созданный пул закрывается.
+    """
+    with _lock:
+        _pool['settings'].update(overrides)
+        if _pool['engine'] is not None:
+            _pool['engine'].dispose()
+            _pool['engine'] = None
+
+def _connect_args(settings):
+    """Параметры сеанса для новых соединений"""
+    return {
+        'application_name': settings['application_name'],
+        'options': f"-c statement_timeout={int(settings['statement_timeout_ms'])}"
+    }
+
+def get_engine():
+    """Возвращает общий движок SQLAlchemy с пулом соединений (создается один раз на процесс)"""
+    with _lock:
+        if _pool['engine'] is None:
+            settings = _pool['settings']
+            # Создаем URL подключения для SQLAlchemy
+            db_url = f"postgresql+psycopg2://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}"
+            engine = create_engine(
+                db_url,
+                pool_size=settings['size'],
+                max_overflow=settings['max_overflow'],
+                pool_timeout=settings['timeout'],
+                pool_pre_ping=True,
+                connect_args=_connect_args(settings)
+            )
+            event.listen(engine, 'before_cursor_execute', _before_execute)
+            event.listen(engine, 'after_cursor_execute', _after_execute)
+            _pool['engine'] = engine
+        return _pool['engine']
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_started'] = time.perf_counter()
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    _record('query', time.perf_counter() - conn.info.pop('query_started', time.perf_counter()))
+
+def _record(kind, duration):
+    """Учитывает время ожидания соединения ('wait') или выполнения запроса ('query')"""
+    with _lock:
+        if kind == 'wait':
+            _stats['checkouts'] += 1
+        else:
+            _stats['queries'] += 1
+        _stats[f'{kind}_total'] += duration
+        _stats[f'{kind}_max'] = max(_stats[f'{kind}_max'], duration)
+
+def connect():
+    """
+    Берет соединение psycopg2 из пула.
+
+    Объект ведет себя как обычное соединение (cursor, commit, rollback),
+    а close() возвращает его в пул. Если свободных соединений нет, вызов
+    ждет не дольше timeout секунд.
+    """
+    started = time.perf_counter()
+    conn = get_engine().raw_connection()
+    _record('wait', time.perf_counter() - started)
+    return conn
+
+@contextmanager
+def get_connection():
+    """Соединение из пула на время блока with; при ошибке транзакция откатывается"""
+    conn = connect()
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def connect_direct(**overrides):
+    """
+    Отдельное соединение вне пула с теми же параметрами сеанса.
+
+    Нужно для служебных операций, например подключения к базе postgres
+    при создании chatbot_metrics.
+    """
+    return psycopg2.connect(**{**DB_CONFIG, **overrides}, **_connect_args(_pool['settings']))
+
+def lift_statement_timeout(cur):
+    """
+    Снимает statement_timeout до конца текущей транзакции.
+
+    Загрузка и пересчеты таблицы могут идти дольше запросов дашборда и
+    вызываются не только из скриптов, которые настраивают пул через
+    configure_pool (например, load_csv_to_db в docker-compose.yml). SET
+    LOCAL действует до фиксации, поэтому соединение возвращается в пул с
+    обычным ограничением.
+    """
+    cur.execute("SET LOCAL statement_timeout = 0")
+
+def read_sql(query, params=None):
+    """Выполняет запрос на соединении из пула и возвращает DataFrame"""
+    started = time.perf_counter()
+    with get_engine().connect() as conn:
+        _record('wait', time.perf_counter() - started)
+        return pd.read_sql(query, conn, params=params)
+
+def read_prepared(name, query, params=(), lift_timeout=False):
+    """
+    Выполняет часто повторяющийся запрос как подготовленный оператор.
+
+    При первом использовании на соединении запрос подготавливается
+    (PREPARE name AS query, параметры — $1, $2, ...), дальше выполняется
+    только EXECUTE, и сервер не разбирает и не планирует его заново.
+    Имена подготовленных операторов хранятся в info соединения и
+    сбрасываются вместе с ним, если пул заменил соединение.
+
+    С lift_timeout=True запрос выполняется без statement_timeout (см.
+    lift_statement_timeout), например чтение всей таблицы.
+
+    Returns:
+        DataFrame с результатом запроса
+    """
+    with get_connection() as conn:
+        prepared = conn.info.setdefault('prepared', set())
+        started = time.perf_counter()
+        with conn.cursor() as cur:
+            if name not in prepared:
+                cur.execute(f"PREPARE {name} AS {query}")
+                prepared.add(name)
+                with _lock:
+                    _stats['prepares'] += 1
+            if lift_timeout:
+                lift_statement_timeout(cur)
+            placeholders = ', '.join(['%s'] * len(params))
+            cur.execute(f"EXECUTE {name}" + (f" ({placeholders})" if params else ""), params)
+            columns = [column.name for column in cur.description]
+            rows = cur.fetchall()
+        conn.commit()
+        _record('query', time.perf_counter() - started)
+        with _lock:
+            _stats['prepared_executions'] += 1
+    return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+def get_pool_stats():
+    """
+    Состояние пула и время ожидания соединений и выполнения запросов.
+
+    Returns:
+        dict: счетчики, суммарное, среднее и максимальное время (в секундах)
+        и текущее число соединений пула
+    """
+    with _lock:
+        stats = dict(_stats)
+        engine = _pool['engine']
+        stats['settings'] = dict(_pool['settings'])
+    stats['wait_avg'] = stats['wait_total'] / stats['checkouts'] if stats['checkouts'] else 0.0
+    stats['query_avg'] = stats['query_total'] / stats['queries'] if stats['queries'] else 0.0
+    if engine is not None:
+        stats['pool_size'] = engine.pool.size()
+        stats['checked_out'] = engine.pool.checkedout()
+        stats['overflow'] = engine.pool.overflow()
+    return stats
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+# Измерения с небольшим числом различных значений храним как категории
+CATEGORY_COLUMNS = [
+    'name', 'campus', 'education_level', 'category', 'subcategory', 'error_category', 'error_type'
+]
+
+# Значения по умолчанию для незаполненных измерений
+FILL_VALUES = {
+    'subcategory': 'Не указано',
+    'category': 'Другое',
+    'campus': 'Не указан',
+    'education_level': 'Не указан'
+}
+
+# Время вопроса и ответа хранится в секундах от начала суток
+TIME_COLUMNS = ['question_time', 'answer_time']
+
+def compact_frame(df):
+    """
+    Приводит загруженные строки к компактной схеме.
+
+    Измерения становятся категориями, satisfaction — int8, id — int32,
+    время вопроса и ответа — число секунд от начала суток (int32).
+    """
+    df = df.fillna(FILL_VALUES)
+
+    df['id'] = df['id'].astype('int32')
+    df['satisfaction'] = df['satisfaction'].astype('int8')
+    for column in TIME_COLUMNS:
+        df[column] = df[column].astype('int32')
+    df['response_time'] = df['response_time'].astype('float32')
+
+    df['date'] = pd.to_datetime(df['date'])
+    df['timestamp'] = df['date'] + pd.to_timedelta(df['question_time'], unit='s')
+
+    # Добавляем категорию ошибки на основе satisfaction
+    df['error_category'] = np.where(df['satisfaction'] == 1, 'success', 'incorrect_answer')
+
+    for column in CATEGORY_COLUMNS:
+        df[column] = df[column].astype('category')
+
+    return df
+
+def concat_compact(df, new_rows):
+    """Объединяет два компактных DataFrame, сохраняя категориальные колонки"""
+    aligned = []
+    for part in (df, new_rows):
+        categories = {}
+        for column in CATEGORY_COLUMNS:
+            union = df[column].cat.categories.union(new_rows[column].cat.categories)
+            categories[column] = part[column].cat.set_categories(union)
+        aligned.append(part.assign(**categories))
+    return pd.concat(aligned, ignore_index=True)
+
+def format_time_offsets(seconds):
+    """Переводит секунды от начала суток в строки ЧЧ:ММ:СС"""
+    seconds = seconds.astype('int64')
+    return (
+        (seconds // 3600).astype(str).str.zfill(2) + ':'
+        + (seconds % 3600 // 60).astype(str).str.zfill(2) + ':'
+        + (seconds % 60).astype(str).str.zfill(2)
+    )
+
+def format_display_columns(df):
+    """Возвращает копию строк с датой и временем в читаемом виде для таблиц"""
+    df = df.copy()
+    if pd.api.types.is_datetime64_any_dtype(df['date']):
+        df['date'] = df['date'].dt.date
+    for column in TIME_COLUMNS:
+        if pd.api.types.is_integer_dtype(df[column]):
+            df[column] = format_time_offsets(df[column])
+    return df
+
+def memory_report(df):
+    """
+    Отчет о занимаемой памяти по колонкам.
+
+    Returns:
+        DataFrame с типом, числом байт и долей каждой колонки,
+        отсортированный по убыванию размера
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'column': usage.index,
+        'dtype': [str(df[column].dtype) for column in usage.index],
+        'bytes': usage.values
+    })
+    total = report['bytes'].sum()
+    report['share'] = (report['bytes'] / total * 100).round(1) if total else 0.0
+    return report.sort_values('bytes', ascending=False, ignore_index=True)
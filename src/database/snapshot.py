@@ -0,0 +1,87 @@
+import glob
+import os
+import tempfile
+from config import DATA_SNAPSHOT_DIR
+
+# Снимок подготовленного датасета на локальном диске (формат Arrow IPC).
+# Новый процесс отображает снимок в память и догружает из PostgreSQL только
+# строки, добавленные после него, вместо чтения всей таблицы.
+
+SNAPSHOT_PREFIX = 'dataset_'
+
+def _snapshot_path(key):
+    """Путь к снимку для ключа (адрес базы и схема колонок)"""
+    return os.path.join(DATA_SNAPSHOT_DIR, f'{SNAPSHOT_PREFIX}{key}.arrow')
+
+def load_snapshot(key):
+    """
+    Читает снимок датасета, отображая файл в память.
+
+    Returns:
+        Tuple[DataFrame, int, int, Optional[int]] или None: датасет,
+        максимальный id, число строк и версия данных на момент записи (None
+        у снимков без версии); None, если снимка нет или он не читается
+    """
+    if not DATA_SNAPSHOT_DIR:
+        return None
+    path = _snapshot_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        import pyarrow as pa
+
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+        metadata = table.schema.metadata or {}
+        last_id = int(metadata[b'last_id'])
+        rows = int(metadata[b'rows'])
+        data_version = int(metadata[b'data_version']) if b'data_version' in metadata else None
+        df = table.to_pandas()
+    except Exception:
+        return None
+    if len(df) != rows:
+        return None
+    return df, last_id, rows, data_version
+
+def save_snapshot(key, df, last_id, data_version=0):
+    """
+    Записывает снимок датасета с максимальным id, числом строк и версией
+    данных в метаданных.
+
+    Файл сначала пишется во временный и затем атомарно заменяет старый,
+    поэтому другие процессы никогда не читают недописанный снимок.
+    Ошибки записи не мешают работе дашборда.
+    """
+    if not DATA_SNAPSHOT_DIR:
+        return False
+    try:
+        import pyarrow as pa
+
+        os.makedirs(DATA_SNAPSHOT_DIR, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata.update({
+            b'last_id': str(last_id).encode(),
+            b'rows': str(len(df)).encode(),
+            b'data_version': str(data_version).encode()
+        })
+        table = table.replace_schema_metadata(metadata)
+
+        fd, tmp_path = tempfile.mkstemp(prefix=SNAPSHOT_PREFIX, suffix='.tmp', dir=DATA_SNAPSHOT_DIR)
+        try:
+            with os.fdopen(fd, 'wb') as file, pa.ipc.new_file(file, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp_path, _snapshot_path(key))
+        except Exception:
+            os.remove(tmp_path)
+            raise
+    except Exception:
+        return False
+    return True
+
+def remove_snapshots():
+    """Удаляет все снимки датасета"""
+    if not DATA_SNAPSHOT_DIR:
+        return
+    for path in glob.glob(os.path.join(DATA_SNAPSHOT_DIR, f'{SNAPSHOT_PREFIX}*')):
+        os.remove(path)
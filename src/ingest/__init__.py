@@ -0,0 +1,89 @@
+from .checkpoints import (
+    ensure_checkpoint_table,
+    get_checkpoint,
+    save_checkpoint,
+    file_fingerprint,
+    handle_fingerprint,
+    is_same_file,
+    iter_lines_from
+)
+from .dedup import (
+    CONTENT_HASH_SQL,
+    CONTENT_KEY,
+    LOG_CONTENT_HASH_SQL,
+    LOG_CONTENT_KEY,
+    LOG_INSERT_SQL,
+    LOG_ROW_TEMPLATE,
+    STAGING_TABLE,
+    ensure_content_hash,
+    create_staging_table,
+    insert_new_from_staging
+)
+from .versions import (
+    ensure_data_version_table,
+    bump_data_version
+)
+from .rollups import (
+    ROLLUP_TABLE,
+    RT_BUCKETS,
+    DASHBOARD_SOURCE,
+    LOG_SOURCE,
+    ensure_rollup_table,
+    rebuild_rollups
+)
+from .classifier import (
+    ERROR_TYPE_RULES,
+    ERROR_TYPE_DEFAULT,
+    compile_rules,
+    classify_errors,
+    ensure_error_type,
+    backfill_error_types
+)
+from .partitions import (
+    is_partitioned,
+    list_partitions,
+    ensure_partitions,
+    ensure_partitions_for,
+    migrate_to_partitioned,
+    detach_partitions_before
+)
+
+__all__ = [
+    'ensure_checkpoint_table',
+    'get_checkpoint',
+    'save_checkpoint',
+    'file_fingerprint',
+    'handle_fingerprint',
+    'is_same_file',
+    'iter_lines_from',
+    'CONTENT_HASH_SQL',
+    'CONTENT_KEY',
+    'LOG_CONTENT_HASH_SQL',
+    'LOG_CONTENT_KEY',
+    'LOG_INSERT_SQL',
+    'LOG_ROW_TEMPLATE',
+    'STAGING_TABLE',
+    'ensure_content_hash',
+    'create_staging_table',
+    'insert_new_from_staging',
+    'ensure_data_version_table',
+    'bump_data_version',
+    'ROLLUP_TABLE',
+    'RT_BUCKETS',
+    'DASHBOARD_SOURCE',
+    'LOG_SOURCE',
+    'ensure_rollup_table',
+    'rebuild_rollups',
+    'ERROR_TYPE_RULES',
+    'ERROR_TYPE_DEFAULT',
+    'compile_rules',
+    'classify_errors',
+    'ensure_error_type',
+    'backfill_error_types',
+    'is_partitioned',
+    'list_partitions',
+    'ensure_partitions',
+    'ensure_partitions_for',
+    'migrate_to_partitioned',
+    'detach_partitions_before'
+]
@@ -0,0 +1,102 @@
+import hashlib
+import os
+
+# Контрольные точки загрузки: позиция в источнике сохраняется в той же
+# транзакции, что и загруженные строки, поэтому после сбоя загрузку можно
+# продолжить ровно с последней зафиксированной позиции.
+
+# Сколько байт начала файла участвует в отпечатке
+HEAD_BYTES = 65536
+
+def ensure_checkpoint_table(cur):
+    """Создает таблицу контрольных точек, если ее еще нет"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+            source TEXT PRIMARY KEY,
+            position BIGINT NOT NULL DEFAULT 0,
+            fingerprint TEXT,
+            completed BOOLEAN NOT NULL DEFAULT FALSE,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # inode файла нужен, чтобы отличать ротацию лога от дописывания
+    cur.execute("ALTER TABLE ingest_checkpoints ADD COLUMN IF NOT EXISTS inode BIGINT")
+
+def get_checkpoint(cur, source):
+    """
+    Возвращает контрольную точку источника.
+
+    Returns:
+        Optional[dict]: position, fingerprint, completed и inode или None
+    """
+    cur.execute(
+        "SELECT position, fingerprint, completed, inode FROM ingest_checkpoints WHERE source = %s",
+        (source,)
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return {'position': row[0], 'fingerprint': row[1], 'completed': row[2], 'inode': row[3]}
+
+def save_checkpoint(cur, source, position, fingerprint=None, completed=False, inode=None):
+    """Сохраняет позицию источника (фиксация — вместе с транзакцией загрузки)"""
+    cur.execute("""
+        INSERT INTO ingest_checkpoints (source, position, fingerprint, completed, inode, updated_at)
+        VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (source) DO UPDATE SET
+            position = EXCLUDED.position,
+            fingerprint = EXCLUDED.fingerprint,
+            completed = EXCLUDED.completed,
+            inode = EXCLUDED.inode,
+            updated_at = EXCLUDED.updated_at
+    """, (source, position, fingerprint, completed, inode))
+
+def _head_md5(path, length):
+    """Хэш первых length байт файла"""
+    with open(path, 'rb') as f:
+        return hashlib.md5(f.read(length)).hexdigest()
+
+def file_fingerprint(path):
+    """Отпечаток файла: размер и хэш его начала"""
+    size = os.path.getsize(path)
+    return f"{size}:{_head_md5(path, min(size, HEAD_BYTES))}"
+
+def handle_fingerprint(file, size):
+    """
+    Отпечаток первых size байт уже открытого файла.
+
+    Читает через pread, не сдвигая позицию чтения, и не зависит от того,
+    на какой файл сейчас указывает путь (важно при ротации лога).
+    """
+    head = os.pread(file.fileno(), min(size, HEAD_BYTES), 0)
+    return f"{size}:{hashlib.md5(head).hexdigest()}"
+
+def is_same_file(path, fingerprint):
+    """
+    Проверяет, что файл — тот же, для которого сохранен отпечаток.
+
+    Файл считается тем же, если он не стал короче и его начало не
+    изменилось, т.е. в него только дописывали строки. Тогда сохраненная
+    позиция остается верной.
+    """
+    if not fingerprint:
+        return False
+    size, head = fingerprint.split(':', 1)
+    size = int(size)
+    return os.path.getsize(path) >= size and _head_md5(path, min(size, HEAD_BYTES)) == head
+
+def iter_lines_from(path, offset=0, include_partial=True):
+    """
+    Читает строки файла, начиная с байтовой позиции offset.
+
+    Возвращает пары (строка, позиция после нее). Если include_partial=False,
+    последняя строка без перевода строки считается недописанной и
+    пропускается, чтобы позиция указывала на начало следующей целой строки.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for raw in f:
+            if not include_partial and not raw.endswith(b'\n'):
+                break
+            offset += len(raw)
+            yield raw.decode('utf-8'), offset
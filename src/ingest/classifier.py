@@ -0,0 +1,138 @@
+import re
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+from src.database.pool import lift_statement_timeout
+from .versions import bump_data_version
+
+# Классификация неудовлетворительных ответов по типу ошибки. Тип
+# вычисляется один раз при загрузке и хранится в chatbot_logs.error_type,
+# поэтому страница анализа ошибок строится обычным GROUP BY.
+
+# Правила в порядке приоритета: тип ошибки и фразы ответа (без учета
+# регистра); если совпало несколько правил, выбирается первое
+ERROR_TYPE_RULES = [
+    ('Система не отвечает', ['система не отвечает']),
+    ('Вопрос не относится к ВШЭ', ['не относится к вшэ']),
+    ('Неуместный вопрос', ['неуместно'])
+]
+
+# Тип ответа, который не подошел ни под одно правило
+ERROR_TYPE_DEFAULT = 'Другие ошибки'
+
+# Число строк, которые классифицируются и обновляются за раз при пересчете
+BACKFILL_BATCH_SIZE = 10000
+
+def compile_rules(rules=ERROR_TYPE_RULES):
+    """
+    Регулярные выражения правил в порядке приоритета.
+
+    Фразы каждого правила объединяются в одно выражение. Правила
+    проверяются по отдельности: в общей альтернативе совпадение фразы
+    менее приоритетного правила могло бы поглотить пересекающуюся с ней
+    фразу более приоритетного.
+    """
+    return [
+        re.compile('|'.join(re.escape(phrase) for phrase in phrases), re.IGNORECASE)
+        for _, phrases in rules
+    ]
+
+_PATTERNS = compile_rules()
+
+def _classify_text(text, patterns):
+    """Номер первого по приоритету правила, найденного в тексте, или None"""
+    for number, pattern in enumerate(patterns):
+        if pattern.search(text):
+            return number
+    return None
+
+def classify_errors(responses, satisfaction, rules=ERROR_TYPE_RULES, patterns=None):
+    """
+    Типы ошибок для колонки ответов.
+
+    Ответы бота в основном повторяются, поэтому правила проверяются один
+    раз для каждого различного текста, а результат раскладывается по строкам через
+    коды pd.factorize. Правила проверяются по очереди до первого совпадения,
+    так что время растет с числом различных текстов и с числом правил.
+
+    Args:
+        responses: Series с текстами ответов
+        satisfaction: Series с оценками (тип считается только для 0)
+        rules: правила классификации
+        patterns: скомпилированные правила (по умолчанию для ERROR_TYPE_RULES)
+
+    Returns:
+        Series с типом ошибки (None для удовлетворительных ответов)
+    """
+    patterns = patterns or (_PATTERNS if rules is ERROR_TYPE_RULES else compile_rules(rules))
+    failed = (satisfaction == 0).fillna(False).to_numpy(dtype=bool)
+
+    codes, texts = pd.factorize(responses[failed])
+    numbers = [_classify_text(str(text), patterns) for text in texts]
+    # Последний элемент — для пустых ответов (код -1)
+    labels = np.array(
+        [ERROR_TYPE_DEFAULT if number is None else rules[number][0] for number in numbers] + [ERROR_TYPE_DEFAULT],
+        dtype=object
+    )
+    result = np.full(len(responses), None, dtype=object)
+    result[failed] = labels[codes]
+    return pd.Series(result, index=responses.index)
+
+def ensure_error_type(cur):
+    """
+    Добавляет в chatbot_logs колонку error_type.
+
+    Для новой колонки типы уже загруженных строк вычисляются один раз.
+
+    Returns:
+        int: число классифицированных строк (0, если колонка уже была)
+    """
+    cur.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_name = 'chatbot_logs' AND column_name = 'error_type'
+    """)
+    if cur.fetchone()[0]:
+        return 0
+    lift_statement_timeout(cur)
+    cur.execute("ALTER TABLE chatbot_logs ADD COLUMN error_type VARCHAR(50)")
+    return backfill_error_types(cur)
+
+def backfill_error_types(cur, reclassify=False, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Вычисляет error_type для неудовлетворительных ответов, у которых он не задан.
+
+    Строки читаются пачками по возрастанию id. С reclassify=True типы
+    пересчитываются для всех неудовлетворительных ответов (например, после
+    изменения правил). Если строки обновлены, увеличивается версия данных,
+    и дашборд загружает таблицу заново.
+
+    Returns:
+        int: число обновленных строк
+    """
+    lift_statement_timeout(cur)
+    updated = 0
+    last_id = 0
+    pending = "" if reclassify else "AND error_type IS NULL"
+    while True:
+        cur.execute(f"""
+            SELECT id, date, response
+            FROM chatbot_logs
+            WHERE satisfaction = 0 AND id > %s {pending}
+            ORDER BY id
+            LIMIT %s
+        """, (last_id, batch_size))
+        rows = cur.fetchall()
+        if not rows:
+            if updated:
+                bump_data_version(cur)
+            return updated
+        batch = pd.DataFrame(rows, columns=['id', 'date', 'response'])
+        batch['error_type'] = classify_errors(batch['response'], pd.Series(0, index=batch.index))
+        execute_values(cur, """
+            UPDATE chatbot_logs AS c SET error_type = v.error_type
+            FROM (VALUES %s) AS v(id, date, error_type)
+            WHERE c.id = v.id AND c.date = v.date
+        """, batch[['id', 'date', 'error_type']].itertuples(index=False, name=None),
+            template='(%s::int, %s::date, %s::varchar)', page_size=batch_size)
+        updated += len(rows)
+        last_id = rows[-1][0]
@@ -0,0 +1,89 @@
+from src.database.pool import lift_statement_timeout
+from .rollups import with_rollup, LOG_SOURCE
+
+# Дедупликация строк chatbot_logs по хэшу содержимого: повторная загрузка
+# тех же записей не создает дубликатов (INSERT ... ON CONFLICT DO NOTHING).
+
+# Хэш строки в схеме дашборда (init.sql)
+CONTENT_HASH_SQL = """md5(concat_ws(chr(31),
+    to_char(date, 'YYYY-MM-DD'), question_time::text, answer_time::text,
+    name, campus, education_level, category, COALESCE(subcategory, ''),
+    query, response, satisfaction::text
+))"""
+
+# Ключ уникальности в схеме дашборда: дата входит в хэш, но нужна и в индексе,
+# потому что уникальный индекс секционированной таблицы должен содержать
+# ключ секционирования
+CONTENT_KEY = 'content_hash, date'
+
+# Хэш строки в схеме лог-файла (db_transfer.py)
+LOG_CONTENT_HASH_SQL = """md5(concat_ws(chr(31),
+    to_char(timestamp, 'YYYY-MM-DD HH24:MI:SS'), query, response,
+    satisfaction::text, COALESCE(error_category, '')
+))"""
+LOG_CONTENT_KEY = 'content_hash'
+
+# Вставка строк лог-файла с пропуском уже загруженных и обновлением почасовых
+# агрегатов (для execute_values с шаблоном LOG_ROW_TEMPLATE); запрос
+# возвращает id добавленных строк
+LOG_INSERT_SQL = with_rollup(f"""
+    INSERT INTO chatbot_logs (timestamp, query, response, satisfaction, error_category, content_hash)
+    SELECT v.*, {LOG_CONTENT_HASH_SQL}
+    FROM (VALUES %s) AS v(timestamp, query, response, satisfaction, error_category)
+    ON CONFLICT ({LOG_CONTENT_KEY}) DO NOTHING
+""", LOG_SOURCE)
+LOG_ROW_TEMPLATE = '(%s::timestamp, %s::text, %s::text, %s::boolean, %s::varchar)'
+
+# Колонки схемы дашборда, которые заполняются при загрузке
+LOG_COLUMNS = [
+    'date', 'question_time', 'answer_time', 'name', 'campus', 'education_level',
+    'category', 'subcategory', 'query', 'response', 'satisfaction', 'error_type'
+]
+
+STAGING_TABLE = 'chatbot_logs_staging'
+
+def ensure_content_hash(cur, hash_sql=CONTENT_HASH_SQL, key=CONTENT_KEY):
+    """
+    Добавляет в chatbot_logs колонку content_hash с уникальным индексом по key.
+
+    Для уже загруженных строк хэш вычисляется один раз; точные дубликаты,
+    если они были, удаляются (остается строка с меньшим id).
+    """
+    cur.execute("SELECT to_regclass('chatbot_logs_content_hash_key') IS NOT NULL")
+    if cur.fetchone()[0]:
+        return
+    lift_statement_timeout(cur)
+    cur.execute("ALTER TABLE chatbot_logs ADD COLUMN IF NOT EXISTS content_hash CHAR(32)")
+    cur.execute(f"UPDATE chatbot_logs SET content_hash = {hash_sql} WHERE content_hash IS NULL")
+    cur.execute("""
+        DELETE FROM chatbot_logs a
+        USING chatbot_logs b
+        WHERE a.content_hash = b.content_hash AND a.id > b.id
+    """)
+    cur.execute(f"CREATE UNIQUE INDEX chatbot_logs_content_hash_key ON chatbot_logs ({key})")
+
+def create_staging_table(cur, columns=LOG_COLUMNS):
+    """Временная таблица для пачки загружаемых строк с теми же типами колонок"""
+    cur.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} AS
+        SELECT {', '.join(columns)} FROM chatbot_logs WITH NO DATA
+    """)
+
+def insert_new_from_staging(cur, columns=LOG_COLUMNS):
+    """
+    Переносит строки из временной таблицы в chatbot_logs, пропуская уже
+    загруженные, и добавляет их к почасовым агрегатам.
+
+    Returns:
+        int: число действительно добавленных строк
+    """
+    column_list = ', '.join(columns)
+    cur.execute(with_rollup(f"""
+        INSERT INTO chatbot_logs ({column_list}, content_hash)
+        SELECT {column_list}, {CONTENT_HASH_SQL}
+        FROM {STAGING_TABLE}
+        ON CONFLICT ({CONTENT_KEY}) DO NOTHING
+    """))
+    inserted = cur.rowcount
+    cur.execute(f"TRUNCATE {STAGING_TABLE}")
+    return inserted
@@ -0,0 +1,191 @@
+import datetime
+from src.database.pool import lift_statement_timeout
+from .dedup import ensure_content_hash
+from .classifier import ensure_error_type
+from .rollups import ROLLUP_TABLE
+from .versions import bump_data_version
+
+# Секционирование chatbot_logs по месяцам (RANGE по date): запросы с
+# диапазоном дат читают только нужные секции, а старые месяцы можно
+# отсоединить от таблицы без удаления строк по одной.
+
+PARTITION_PREFIX = 'chatbot_logs_'
+
+# Колонки схемы дашборда в порядке таблицы
+TABLE_COLUMNS = [
+    'id', 'date', 'question_time', 'answer_time', 'name', 'campus', 'education_level',
+    'category', 'subcategory', 'query', 'response', 'satisfaction', 'error_type', 'content_hash'
+]
+
+# Колонки, которые добавляются к старым таблицам при загрузке
+ADDED_COLUMNS = ['error_type', 'content_hash']
+
+PARTITIONED_TABLE_SQL = """
+    CREATE TABLE chatbot_logs (
+        id INTEGER NOT NULL DEFAULT nextval('chatbot_logs_id_seq'),
+        date DATE NOT NULL,
+        question_time TIME NOT NULL,
+        answer_time TIME NOT NULL,
+        name VARCHAR(100) NOT NULL,
+        campus VARCHAR(50) NOT NULL,
+        education_level VARCHAR(50) NOT NULL,
+        category VARCHAR(50) NOT NULL,
+        subcategory VARCHAR(50),
+        query TEXT NOT NULL,
+        response TEXT NOT NULL,
+        satisfaction INTEGER CHECK (satisfaction IN (0, 1)),
+        error_type VARCHAR(50),
+        content_hash CHAR(32),
+        PRIMARY KEY (id, date)
+    ) PARTITION BY RANGE (date)
+"""
+
+# Индексы для фильтров дашборда: диапазон дат и равенство по категории,
+# кампусу и уровню образования. Включенные колонки позволяют считать
+# агрегаты только по индексу.
+INDEXES_SQL = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS chatbot_logs_content_hash_key ON chatbot_logs (content_hash, date)",
+    """CREATE INDEX IF NOT EXISTS chatbot_logs_date_idx ON chatbot_logs (date, question_time)
+        INCLUDE (answer_time, satisfaction)""",
+    """CREATE INDEX IF NOT EXISTS chatbot_logs_category_idx ON chatbot_logs (category, subcategory, date)
+        INCLUDE (question_time, answer_time, satisfaction)""",
+    """CREATE INDEX IF NOT EXISTS chatbot_logs_campus_idx ON chatbot_logs (campus, date)
+        INCLUDE (category, question_time, answer_time, satisfaction)""",
+    """CREATE INDEX IF NOT EXISTS chatbot_logs_education_level_idx ON chatbot_logs (education_level, date)
+        INCLUDE (category, question_time, answer_time, satisfaction)"""
+]
+
+def _month_start(value):
+    """Первое число месяца для даты"""
+    return datetime.date(value.year, value.month, 1)
+
+def _next_month(month):
+    """Первое число следующего месяца"""
+    return datetime.date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+def partition_name(month):
+    """Имя секции месяца, например chatbot_logs_2025_06"""
+    return f"{PARTITION_PREFIX}{month.year:04d}_{month.month:02d}"
+
+def is_partitioned(cur):
+    """Проверяет, что chatbot_logs — секционированная таблица"""
+    cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('chatbot_logs')")
+    row = cur.fetchone()
+    return bool(row and row[0])
+
+def list_partitions(cur):
+    """
+    Секции chatbot_logs в порядке месяцев.
+
+    Returns:
+        List[Tuple[str, str]]: имя секции и ее границы
+    """
+    cur.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'chatbot_logs'::regclass
+        ORDER BY c.relname
+    """)
+    return cur.fetchall()
+
+def ensure_partitions(cur, start, end):
+    """
+    Создает недостающие месячные секции для дат от start до end включительно.
+
+    Уже существующие секции не трогаются, поэтому блокировка таблицы
+    берется только при появлении нового месяца.
+    """
+    existing = {name for name, _ in list_partitions(cur)}
+    month = _month_start(start)
+    while month <= end:
+        name = partition_name(month)
+        if name not in existing:
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS {name} PARTITION OF chatbot_logs
+                FOR VALUES FROM ('{month}') TO ('{_next_month(month)}')
+            """)
+        month = _next_month(month)
+
+def ensure_partitions_for(cur, relation):
+    """Создает секции для всех дат строк relation (если таблица секционирована)"""
+    if not is_partitioned(cur):
+        return
+    cur.execute(f"SELECT MIN(date), MAX(date) FROM {relation}")
+    start, end = cur.fetchone()
+    if start is not None:
+        ensure_partitions(cur, start, end)
+
+def migrate_to_partitioned(cur):
+    """
+    Переводит обычную таблицу chatbot_logs на секционирование по месяцам.
+
+    Строки переносятся с сохранением id, последовательность id переходит к
+    новой таблице, индексы строятся после переноса. Все выполняется в
+    текущей транзакции.
+
+    Returns:
+        bool: True, если таблица была перенесена
+    """
+    if is_partitioned(cur) or not _has_dashboard_schema(cur):
+        return False
+    lift_statement_timeout(cur)
+    ensure_content_hash(cur)
+    ensure_error_type(cur)
+
+    # Освобождаем имена индексов для новой таблицы
+    cur.execute("ALTER TABLE chatbot_logs RENAME TO chatbot_logs_unpartitioned")
+    cur.execute("ALTER INDEX IF EXISTS chatbot_logs_content_hash_key RENAME TO chatbot_logs_unpartitioned_content_hash_key")
+    cur.execute("ALTER INDEX IF EXISTS chatbot_logs_pkey RENAME TO chatbot_logs_unpartitioned_pkey")
+    cur.execute(PARTITIONED_TABLE_SQL)
+    cur.execute("ALTER SEQUENCE chatbot_logs_id_seq OWNED BY chatbot_logs.id")
+
+    ensure_partitions_for(cur, 'chatbot_logs_unpartitioned')
+    column_list = ', '.join(TABLE_COLUMNS)
+    cur.execute(f"""
+        INSERT INTO chatbot_logs ({column_list})
+        SELECT {column_list} FROM chatbot_logs_unpartitioned
+    """)
+    for sql in INDEXES_SQL:
+        cur.execute(sql)
+    cur.execute("DROP TABLE chatbot_logs_unpartitioned")
+    bump_data_version(cur)
+    return True
+
+def _has_dashboard_schema(cur):
+    """Проверяет, что chatbot_logs существует и имеет колонки схемы дашборда"""
+    base_columns = [column for column in TABLE_COLUMNS if column not in ADDED_COLUMNS]
+    cur.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_name = 'chatbot_logs' AND column_name = ANY(%s)
+    """, (base_columns,))
+    return cur.fetchone()[0] == len(base_columns)
+
+def detach_partitions_before(cur, month, drop=False, keep_rollups=False):
+    """
+    Отсоединяет от chatbot_logs секции месяцев раньше month.
+
+    Отсоединение меняет только метаданные и не переписывает строки.
+    Отсоединенная секция остается отдельной таблицей (ее можно заархивировать),
+    если не указано drop=True. Почасовые агрегаты этих месяцев удаляются в
+    той же транзакции, чтобы режим 'rollup' показывал те же числа, что и
+    остальные режимы; keep_rollups=True оставляет их.
+
+    Returns:
+        List[str]: имена отсоединенных секций
+    """
+    lift_statement_timeout(cur)
+    month = _month_start(month)
+    boundary = partition_name(month)
+    detached = []
+    for name, _ in list_partitions(cur):
+        if name.startswith(PARTITION_PREFIX) and name < boundary:
+            cur.execute(f"ALTER TABLE chatbot_logs DETACH PARTITION {name}")
+            if drop:
+                cur.execute(f"DROP TABLE {name}")
+            detached.append(name)
+    if detached and not keep_rollups:
+        cur.execute(f"SELECT to_regclass('{ROLLUP_TABLE}') IS NOT NULL")
+        if cur.fetchone()[0]:
+            cur.execute(f"DELETE FROM {ROLLUP_TABLE} WHERE hour < %s", (month,))
+    return detached
@@ -0,0 +1,153 @@
+from src.database.connection import RESPONSE_TIME_SQL
+from src.database.pool import lift_statement_timeout
+from .versions import bump_data_version
+
+# Почасовые агрегаты chatbot_logs: обновляются в той же транзакции, что и
+# вставка строк, поэтому графики можно строить по числу часов в периоде,
+# а не по числу логов.
+
+ROLLUP_TABLE = 'chatbot_logs_hourly'
+
+# Ключ агрегата
+ROLLUP_KEYS = ['hour', 'campus', 'category', 'subcategory', 'education_level']
+
+# Верхние границы корзин гистограммы времени ответа (в секундах);
+# последняя корзина — все, что больше последней границы
+RT_BUCKETS = [1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 30, 45, 60, 120, 300, 600, 1800, 3600]
+
+# Выражения ключа и метрик для строк схемы дашборда (init.sql)
+DASHBOARD_SOURCE = {
+    'hour': "date + make_time(EXTRACT(HOUR FROM question_time)::int, 0, 0)",
+    'campus': "COALESCE(campus, 'Не указан')",
+    'category': "COALESCE(category, 'Другое')",
+    'subcategory': "COALESCE(subcategory, 'Не указано')",
+    'education_level': "COALESCE(education_level, 'Не указан')",
+    'satisfaction': "satisfaction",
+    'response_time': RESPONSE_TIME_SQL
+}
+
+# Выражения для строк схемы лог-файла (db_transfer.py): в ней нет кампуса,
+# категорий и времени ответа, поэтому агрегат ведется только по часам
+LOG_SOURCE = {
+    'hour': "date_trunc('hour', timestamp)",
+    'campus': "'Не указан'",
+    'category': "'Другое'",
+    'subcategory': "'Не указано'",
+    'education_level': "'Не указан'",
+    'satisfaction': "satisfaction::int",
+    'response_time': "NULL::float"
+}
+
+_METRIC_COLUMNS = [
+    'request_count', 'satisfied_count', 'unsatisfied_count',
+    'rt_count', 'rt_sum', 'rt_sumsq', 'rt_min', 'rt_max', 'rt_histogram'
+]
+
+def ensure_rollup_table(cur, source=DASHBOARD_SOURCE):
+    """
+    Создает таблицу почасовых агрегатов, если ее еще нет.
+
+    Для новой таблицы агрегаты один раз считаются по уже загруженным строкам.
+    """
+    cur.execute(f"SELECT to_regclass('{ROLLUP_TABLE}') IS NOT NULL")
+    if cur.fetchone()[0]:
+        return
+    cur.execute(f"""
+        CREATE TABLE {ROLLUP_TABLE} (
+            hour TIMESTAMP NOT NULL,
+            campus TEXT NOT NULL,
+            category TEXT NOT NULL,
+            subcategory TEXT NOT NULL,
+            education_level TEXT NOT NULL,
+            request_count BIGINT NOT NULL,
+            satisfied_count BIGINT NOT NULL,
+            unsatisfied_count BIGINT NOT NULL,
+            rt_count BIGINT NOT NULL,
+            rt_sum DOUBLE PRECISION NOT NULL,
+            rt_sumsq DOUBLE PRECISION NOT NULL,
+            rt_min DOUBLE PRECISION,
+            rt_max DOUBLE PRECISION,
+            rt_histogram BIGINT[] NOT NULL,
+            PRIMARY KEY ({', '.join(ROLLUP_KEYS)})
+        )
+    """)
+    rebuild_rollups(cur, source)
+
+def rollup_select_sql(relation, source=DASHBOARD_SOURCE):
+    """Запрос, считающий почасовые агрегаты по строкам relation"""
+    buckets = ', '.join(str(bound) for bound in RT_BUCKETS)
+    histogram = ', '.join(
+        f"COUNT(*) FILTER (WHERE bucket = {i})" for i in range(len(RT_BUCKETS) + 1)
+    )
+    keys = ', '.join(f"{source[key]} AS {key}" for key in ROLLUP_KEYS)
+    return f"""
+        SELECT {', '.join(ROLLUP_KEYS)},
+            COUNT(*),
+            COUNT(*) FILTER (WHERE satisfaction = 1),
+            COUNT(*) FILTER (WHERE satisfaction = 0),
+            COUNT(rt),
+            COALESCE(SUM(rt), 0),
+            COALESCE(SUM(rt * rt), 0),
+            MIN(rt),
+            MAX(rt),
+            ARRAY[{histogram}]
+        FROM (
+            SELECT {keys},
+                {source['satisfaction']} AS satisfaction,
+                rt,
+                width_bucket(rt, ARRAY[{buckets}]::float[]) AS bucket
+            FROM (SELECT *, {source['response_time']} AS rt FROM {relation}) AS r
+        ) AS t
+        GROUP BY {', '.join(ROLLUP_KEYS)}
+        ORDER BY {', '.join(ROLLUP_KEYS)}
+    """
+
+def rollup_upsert_sql(relation, source=DASHBOARD_SOURCE):
+    """Добавление агрегатов строк relation к уже накопленным"""
+    return f"""
+        INSERT INTO {ROLLUP_TABLE} AS h ({', '.join(ROLLUP_KEYS + _METRIC_COLUMNS)})
+        {rollup_select_sql(relation, source)}
+        ON CONFLICT ({', '.join(ROLLUP_KEYS)}) DO UPDATE SET
+            request_count = h.request_count + EXCLUDED.request_count,
+            satisfied_count = h.satisfied_count + EXCLUDED.satisfied_count,
+            unsatisfied_count = h.unsatisfied_count + EXCLUDED.unsatisfied_count,
+            rt_count = h.rt_count + EXCLUDED.rt_count,
+            rt_sum = h.rt_sum + EXCLUDED.rt_sum,
+            rt_sumsq = h.rt_sumsq + EXCLUDED.rt_sumsq,
+            rt_min = LEAST(h.rt_min, EXCLUDED.rt_min),
+            rt_max = GREATEST(h.rt_max, EXCLUDED.rt_max),
+            rt_histogram = ARRAY(
+                SELECT a + b
+                FROM unnest(h.rt_histogram, EXCLUDED.rt_histogram) WITH ORDINALITY AS u(a, b, i)
+                ORDER BY i
+            )
+    """
+
+def with_rollup(insert_sql, source=DASHBOARD_SOURCE):
+    """
+    Дополняет вставку в chatbot_logs обновлением почасовых агрегатов.
+
+    Агрегаты считаются только по действительно вставленным строкам (после
+    ON CONFLICT DO NOTHING) в том же запросе. Запрос возвращает id
+    вставленных строк.
+    """
+    return f"""
+        WITH inserted AS ({insert_sql} RETURNING *),
+        rolled AS ({rollup_upsert_sql('inserted', source)})
+        SELECT id FROM inserted
+    """
+
+def rebuild_rollups(cur, source=DASHBOARD_SOURCE):
+    """
+    Пересчитывает почасовые агрегаты по всей таблице chatbot_logs.
+
+    Версия данных увеличивается, чтобы дашборд не показывал графики,
+    построенные по прежним агрегатам.
+    """
+    lift_statement_timeout(cur)
+    cur.execute(f"TRUNCATE {ROLLUP_TABLE}")
+    cur.execute(f"""
+        INSERT INTO {ROLLUP_TABLE} ({', '.join(ROLLUP_KEYS + _METRIC_COLUMNS)})
+        {rollup_select_sql('chatbot_logs', source)}
+    """)
+    bump_data_version(cur)
@@ -0,0 +1,30 @@
+from src.database.connection import DATA_VERSION_TABLE
+
+# Версия данных chatbot_logs: счетчик, который увеличивается при изменении
+# уже загруженных строк (пересчет типов ошибок и агрегатов, перенос
+# таблицы). Дашборд сравнивает его с версией закэшированного датасета и
+# снимка на диске; добавленные строки он находит по id и без счетчика.
+
+def ensure_data_version_table(cur):
+    """Создает таблицу версии данных, если ее еще нет"""
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DATA_VERSION_TABLE} (
+            id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+            version BIGINT NOT NULL DEFAULT 0
+        )
+    """)
+
+def bump_data_version(cur):
+    """
+    Увеличивает версию данных (фиксация — вместе с транзакцией изменения).
+
+    Returns:
+        int: новая версия
+    """
+    ensure_data_version_table(cur)
+    cur.execute(f"""
+        INSERT INTO {DATA_VERSION_TABLE} AS v (id, version) VALUES (TRUE, 1)
+        ON CONFLICT (id) DO UPDATE SET version = v.version + 1
+        RETURNING version
+    """)
+    return cur.fetchone()[0]
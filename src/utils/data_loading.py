@@ -1,32 +1,121 @@
+import mmap
+import os
+import numpy as np
 import pandas as pd
-from datetime import datetime
 import streamlit as st
 
+# Размер куска буфера (в байтах), который декодируется и разбирается за раз
+PARSE_CHUNK_BYTES = 4 * 1024 * 1024
+
+def _open_buffer(file):
+    """
+    Буфер с содержимым лог-файла без копирования.
+
+    Для загруженного файла (UploadedFile/BytesIO) используется его внутренний
+    буфер, для пути к файлу — отображение файла в память.
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b'')
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return file.getbuffer()
+
+def iter_text_chunks(buffer, chunk_bytes=PARSE_CHUNK_BYTES):
+    """
+    Декодирует буфер кусками, выровненными по границам строк.
+
+    Каждый кусок заканчивается переводом строки, поэтому многобайтные символы
+    UTF-8 не разрываются и кусок можно декодировать отдельно.
+    """
+    start = 0
+    size = len(buffer)
+    while start < size:
+        end = start + chunk_bytes
+        while True:
+            chunk = bytes(buffer[start:end])
+            if end >= size:
+                break
+            newline = chunk.rfind(b'\n')
+            if newline >= 0:
+                chunk = chunk[:newline + 1]
+                break
+            # Строка длиннее куска — расширяем кусок до ее конца
+            end += chunk_bytes
+        start += len(chunk)
+        yield chunk.decode('utf-8')
+
+def _parse_lines(lines):
+    """Разбор строк лога в колонки одного пакета"""
+    timestamps = []
+    queries = []
+    responses = []
+    satisfaction = []
+    error_categories = []
+    for line in lines:
+        parts = line.strip().split(' | ')
+        if len(parts) >= 4:  # Minimum required parts
+            timestamps.append(parts[0])
+            queries.append(parts[1].split(': ')[1])
+            responses.append(parts[2].split(': ')[1])
+            value = int(parts[3].split(': ')[1])
+            satisfaction.append(value)
+            error_categories.append('success' if value == 1 else parts[4] if len(parts) > 4 else 'other_error')
+
+    # Время разбирается сразу для всего пакета
+    return {
+        'timestamp': pd.to_datetime(pd.Series(timestamps, dtype=object), format='%Y-%m-%d %H:%M:%S'),
+        'query': pd.Series(queries, dtype=object),
+        'response': pd.Series(responses, dtype=object),
+        'satisfaction': pd.Series(np.array(satisfaction, dtype=np.int8)),
+        'error_category': pd.Series(error_categories, dtype=object)
+    }
+
+def iter_log_batches(file, chunk_bytes=PARSE_CHUNK_BYTES):
+    """
+    Потоковый разбор лог-файла пакетами колонок.
+
+    Args:
+        file: загруженный файл (UploadedFile/BytesIO) или путь к файлу
+        chunk_bytes: размер куска буфера, разбираемого за раз
+
+    Yields:
+        Dict[str, Series]: колонки timestamp, query, response, satisfaction
+        и error_category для строк очередного куска
+    """
+    buffer = _open_buffer(file)
+    try:
+        for text in iter_text_chunks(buffer, chunk_bytes):
+            batch = _parse_lines(text.splitlines())
+            if len(batch['timestamp']):
+                yield batch
+    finally:
+        if isinstance(buffer, memoryview):
+            buffer.release()
+        else:
+            buffer.close()
+
 def parse_log_file(file) -> pd.DataFrame:
-    """Парсинг лог файла и преобразование в DataFrame"""
+    """
+    Парсинг лог файла и преобразование в DataFrame.
+
+    Файл разбирается потоково, без копирования всего содержимого в строки:
+    в памяти одновременно находятся только итоговые колонки и один кусок
+    файла. Категории ошибок хранятся как category.
+    """
     try:
-        # Read all lines from the file
-        content = file.getvalue().decode('utf-8').splitlines()
-        
-        # Parse each line into components
-        data = []
-        for line in content:
-            parts = line.strip().split(' | ')
-            if len(parts) >= 4:  # Minimum required parts
-                timestamp = datetime.strptime(parts[0], '%Y-%m-%d %H:%M:%S')
-                query = parts[1].split(': ')[1]
-                response = parts[2].split(': ')[1]
-                satisfaction = int(parts[3].split(': ')[1])
-                error_category = 'success' if satisfaction == 1 else parts[4] if len(parts) > 4 else 'other_error'
-                
-                data.append({
-                    'timestamp': timestamp,
-                    'query': query,
-                    'response': response,
-                    'satisfaction': satisfaction,
-                    'error_category': error_category
-                })
-        
+        columns = {}
+        for batch in iter_log_batches(file):
+            for name, values in batch.items():
+                columns.setdefault(name, []).append(values)
+        if not columns:
+            return pd.DataFrame()
+
+        data = {}
+        for name in list(columns):
+            # Пакеты колонки освобождаются сразу после объединения
+            values = pd.concat(columns.pop(name), ignore_index=True)
+            data[name] = values.astype('category') if name == 'error_category' else values
         return pd.DataFrame(data)
     except Exception as e:
         st.error(f"Ошибка при парсинге лог файла: {str(e)}")
@@ -2,9 +2,15 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 from src.utils import COLORS
+from src.database import format_display_columns
+from src.database.aggregation import aggregate
+from src.database.filters import filters_key
+from src.database.pagination import fetch_page, page_cursor, PAGE_SIZE
+from src.views.export import show_export
+from src.views.figure_cache import cached_figure
 import pandas as pd
 
-def show_developer_view(df):
+def show_developer_view(df, filters=None):
     """Отображение детального анализа категорий"""
     # Кнопка возврата на главную
     col_back, col_title = st.columns([1, 4])
@@ -19,23 +25,39 @@ def show_developer_view(df):
      tab1, tab2, tab3 = st.tabs(["📊 Анализ категорий", "📈 Временной анализ", "📝 Детальные данные"])
     
     with tab1:
-        show_category_analysis(df)
+        show_category_analysis(df, filters)
     
     with tab2:
-        show_time_analysis(df)
+        show_time_analysis(df, filters)
     
     with tab3:
-        show_detailed_data(df)
+        show_detailed_data(df, filters)
 
-def show_category_analysis(df):
+def show_category_analysis(df, filters=None):
     """Анализ категорий и подкатегорий"""
     # График по основным категориям
-    category_stats = df.groupby('category', as_index=False).agg({
-        'satisfaction': ['count', lambda x: (x == 1).mean() * 100]
-    })
-    category_stats.columns = ['category', 'count', 'success_rate']
+    fig_categories = cached_figure(
+        'developer.categories', filters,
+        lambda: categories_figure(aggregate(df, ['category'], ['count', 'success_rate'], filters))
+    )
+    st.plotly_chart(fig_categories, width='stretch')
     
-    fig_categories = px.bar(
+    # Анализ подкатегорий учебных запросов
+    fig_subcategories = cached_figure(
+        'developer.subcategories', filters,
+        lambda: subcategories_figure(aggregate(
+            df, ['subcategory'], ['count', 'success_rate'], filters,
+            conditions={'category': 'Учеба'}
+        ))
+    )
+    if fig_subcategories is not None:
+        # Добавляем якорь для прокрутки
+        st.markdown("<div id='subcategories'></div>", unsafe_allow_html=True)
+        st.plotly_chart(fig_subcategories, width='stretch')
+
+def categories_figure(category_stats):
+    """График количества запросов и успешности по категориям"""
+    return px.bar(
         category_stats,
         x='category',
         y='count',
@@ -48,47 +70,48 @@ def show_category_analysis(df):
         },
         color_continuous_scale=['red', 'yellow', 'green']
     )
-    st.plotly_chart(fig_categories, use_container_width=True)
-    
-    # Анализ подкатегорий учебных запросов
-    study_df = df[df['category'] == 'Учеба']
-    if not study_df.empty:
-        # Добавляем якорь для прокрутки
-        st.markdown("<div id='subcategories'></div>", unsafe_allow_html=True)
-        
-        subcategory_stats = study_df.groupby('subcategory', as_index=False).agg({
-            'satisfaction': ['count', lambda x: (x == 1).mean() * 100]
-        })
-        subcategory_stats.columns = ['subcategory', 'count', 'success_rate']
-        
-       
-        
-        fig_subcategories = px.bar(
-            subcategory_stats,
-            x='subcategory',
-            y='count',
-            color='success_rate',
-            title='Детальный анализ подкатегорий учебных запросов',
-            labels={
-                'subcategory': 'Подкатегория',
-                'count': 'Количество запросов',
-                'success_rate': 'Успешность (%)'
-            },
-            color_continuous_scale=['red', 'yellow', 'green']
-        )
-        fig_subcategories.update_layout(
-            xaxis_tickangle=-45,
-            height=600
-        )
-        st.plotly_chart(fig_subcategories, use_container_width=True)
 
-def show_time_analysis(df):
+def subcategories_figure(subcategory_stats):
+    """График подкатегорий учебных запросов (None, если их нет)"""
+    if subcategory_stats.empty:
+        return None
+    fig_subcategories = px.bar(
+        subcategory_stats,
+        x='subcategory',
+        y='count',
+        color='success_rate',
+        title='Детальный анализ подкатегорий учебных запросов',
+        labels={
+            'subcategory': 'Подкатегория',
+            'count': 'Количество запросов',
+            'success_rate': 'Успешность (%)'
+        },
+        color_continuous_scale=['red', 'yellow', 'green']
+    )
+    fig_subcategories.update_layout(
+        xaxis_tickangle=-45,
+        height=600
+    )
+    return fig_subcategories
+
+def show_time_analysis(df, filters=None):
     """Временной анализ"""
     # График активности по часам с успешностью
-    df['hour'] = df['timestamp'].dt.hour
-    hourly_stats = df.groupby('hour', as_index=False).agg({
-        'satisfaction': ['count', lambda x: (x == 1).mean() * 100]
-    })
+    fig_hourly = cached_figure(
+        'developer.hourly', filters,
+        lambda: hourly_figure(aggregate(df, ['hour'], ['count', 'success_rate'], filters))
+    )
+    st.plotly_chart(fig_hourly, width='stretch')
+    
+    # Тепловая карта активности
+    fig_heatmap = cached_figure(
+        'developer.heatmap', filters,
+        lambda: heatmap_figure(aggregate(df, ['date', 'hour'], ['count'], filters))
+    )
+    st.plotly_chart(fig_heatmap, width='stretch')
+
+def hourly_figure(hourly_stats):
+    """Распределение запросов и успешности по часам"""
     hourly_stats.columns = ['hour', 'total_requests', 'success_rate']
     
     fig_hourly = go.Figure()
@@ -118,12 +141,11 @@ def show_time_analysis(df):
         ),
         hovermode='x unified'
     )
-    st.plotly_chart(fig_hourly, use_container_width=True)
-    
-    # Тепловая карта активности
-    df['date'] = df['timestamp'].dt.date
-    daily_hourly = df.groupby(['date', 'hour']).size().reset_index(name='count')
-    fig_heatmap = px.density_heatmap(
+    return fig_hourly
+
+def heatmap_figure(daily_hourly):
+    """Тепловая карта активности по дням и часам"""
+    return px.density_heatmap(
         daily_hourly,
         x='hour',
         y='date',
@@ -131,10 +153,16 @@ def show_time_analysis(df):
         title='Тепловая карта активности',
         labels={'hour': 'Час', 'date': 'Дата', 'count': 'Количество запросов'}
     )
-    st.plotly_chart(fig_heatmap, use_container_width=True)
 
-def show_detailed_data(df):
-    """Отображение детальных данных"""
+# Условия фильтра по успешности
+SATISFACTION_CONDITIONS = {
+    'Все': None,
+    'Удовлетворительно': {'satisfaction': 1},
+    'Неудовлетворительно': {'satisfaction': 0}
+}
+
+def show_detailed_data(df, filters=None):
+    """Отображение детальных данных постранично"""
     st.write("### 📋 Детальные данные")
     
     # Фильтры для детальных данных
@@ -158,17 +186,16 @@ def show_detailed_data(df):
         'satisfaction': 'Статус'
     }
     
-    # Применяем фильтр
-    if satisfaction_filter == 'Удовлетворительно':
-        filtered_df = df[df['satisfaction'] == 1]
-    elif satisfaction_filter == 'Неудовлетворительно':
-        filtered_df = df[df['satisfaction'] == 0]
-    else:
-        filtered_df = df
-    
-    # Подготавливаем данные
-    display_df = (filtered_df[columns_to_show.keys()]
-                 .sort_values(['date', 'question_time'], ascending=[False, False])
+    # Ключи начала просмотренных страниц; при смене фильтров начинаем с первой
+    pages_key = (filters_key(filters), satisfaction_filter)
+    if st.session_state.get('detail_pages_key') != pages_key:
+        st.session_state.detail_pages_key = pages_key
+        st.session_state.detail_cursors = [None]
+    cursors = st.session_state.detail_cursors
+    
+    # Читаем только текущую страницу (вместе с текстами запросов)
+    page = fetch_page(df, filters, SATISFACTION_CONDITIONS[satisfaction_filter], after=cursors[-1])
+    display_df = (format_display_columns(page)[columns_to_show.keys()]
                  .rename(columns=columns_to_show)
                  .copy())
     
@@ -184,12 +211,19 @@ def show_detailed_data(df):
         hide_index=True
     )
     
-    # Экспорт данных
-    st.download_button(
-        "📥 Скачать данные (CSV)",
-        display_df.to_csv(index=False).encode('utf-8-sig'),
-        "chat_analysis.csv",
-        "text/csv",
-        key='download-csv'
-    )
+    # Переключение страниц
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("← Назад", disabled=len(cursors) == 1, key='detail-prev'):
+            cursors.pop()
+            st.rerun()
+    with col_page:
+        st.caption(f"Страница {len(cursors)}")
+    with col_next:
+        if st.button("Далее →", disabled=len(page) < PAGE_SIZE, key='detail-next'):
+            cursors.append(page_cursor(page))
+            st.rerun()
+    
+    # Выгрузка всех строк по текущим фильтрам
+    show_export(filters, SATISFACTION_CONDITIONS[satisfaction_filter], 'chat_analysis', key='download-csv')
 
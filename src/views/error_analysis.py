@@ -3,12 +3,18 @@ import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 from src.utils import COLORS
+from src.database import format_display_columns
+from src.database.aggregation import aggregate
+from src.database.filters import filters_key
+from src.database.pagination import fetch_page, page_cursor, PAGE_SIZE
+from src.views.export import show_export
+from src.views.figure_cache import cached_figure
 
-def show_error_analysis(df):
+# Условие отбора ошибочных запросов
+ERROR_CONDITIONS = {'satisfaction': 0}
+
+def show_error_analysis(df, filters=None):
     """Отображение анализа ошибочных запросов"""
-    # Фильтруем только ошибочные запросы сразу в начале
-    error_df = df[df['satisfaction'] == 0]
-    
     col_back, col_title = st.columns([1, 4])
     with col_back:
         if st.button("← На главную"):
@@ -19,8 +25,9 @@ def show_error_analysis(df):
         st.title("❌ Анализ ошибочных выходов")
     
     # Показываем общую статистику
-    total_errors = len(error_df)
-    total_requests = len(df)
+    totals = aggregate(df, [], ['count', 'error_count'], filters).fillna(0).iloc[0]
+    total_errors = int(totals['error_count'])
+    total_requests = int(totals['count'])
     error_rate = (total_errors / total_requests * 100) if total_requests > 0 else 0
     
     st.markdown(f"""
@@ -38,75 +45,31 @@ def show_error_analysis(df):
     
     with tab1:
         # Анализ ошибок по категориям
-        category_errors = error_df.groupby('category').agg({
-            'satisfaction': 'count',
-        }).reset_index()
-        category_errors.columns = ['category', 'error_count']
-        category_errors['error_rate'] = category_errors['error_count'] / category_errors['error_count'].sum() * 100
-        
-        fig_category_errors = px.bar(
-            category_errors.sort_values('error_count', ascending=True),
-            y='category',
-            x='error_count',
-            orientation='h',
-            title='Распределение ошибочных выходов по категориям',
-            labels={
-                'category': 'Категория',
-                'error_count': 'Количество ошибочных выходов',
-            },
-            text=category_errors['error_rate'].round(1).astype(str) + '%'
-        )
-        fig_category_errors.update_traces(
-            textposition='auto',
-            marker_color=COLORS['incorrect_answer']
+        fig_category_errors = cached_figure(
+            'errors.categories', filters,
+            lambda: category_errors_figure(
+                aggregate(df, ['category'], ['count'], filters, conditions=ERROR_CONDITIONS)
+            )
         )
-        st.plotly_chart(fig_category_errors, use_container_width=True)
+        st.plotly_chart(fig_category_errors, width='stretch')
         
         # Если есть подкатегории в учебных запросах
-        study_errors = error_df[error_df['category'] == 'Учеба']
-        if not study_errors.empty:
-            subcategory_errors = study_errors.groupby('subcategory').agg({
-                'satisfaction': 'count'
-            }).reset_index()
-            subcategory_errors.columns = ['subcategory', 'error_count']
-            subcategory_errors['error_rate'] = subcategory_errors['error_count'] / subcategory_errors['error_count'].sum() * 100
-            
-            fig_subcategory_errors = px.bar(
-                subcategory_errors.sort_values('error_count', ascending=True),
-                y='subcategory',
-                x='error_count',
-                orientation='h',
-                title='Распределение ошибочных выходов по подкатегориям учебных запросов',
-                labels={
-                    'subcategory': 'Подкатегория',
-                    'error_count': 'Количество выходов'
-                },
-                text=subcategory_errors['error_rate'].round(1).astype(str) + '%'
-            )
-            fig_subcategory_errors.update_traces(
-                textposition='auto',
-                marker_color=COLORS['incorrect_answer']
-            )
-            st.plotly_chart(fig_subcategory_errors, use_container_width=True)
+        fig_subcategory_errors = cached_figure(
+            'errors.subcategories', filters,
+            lambda: subcategory_errors_figure(aggregate(
+                df, ['subcategory'], ['count'], filters,
+                conditions={**ERROR_CONDITIONS, 'category': 'Учеба'}
+            ))
+        )
+        if fig_subcategory_errors is not None:
+            st.plotly_chart(fig_subcategory_errors, width='stretch')
     
     with tab2:
         
         
-        # Анализируем ответы на наличие ключевых фраз
-        def categorize_error(response):
-            response = response.lower()
-            if 'система не отвечает' in response:
-                return 'Система не отвечает'
-            elif 'не относится к вшэ' in response:
-                return 'Вопрос не относится к ВШЭ'
-            elif 'неуместно' in response:
-                return 'Неуместный вопрос'
-            else:
-                return 'Другие ошибки'
-        
-        error_df['error_type'] = error_df['response'].apply(categorize_error)
-        error_types = error_df.groupby('error_type').size().reset_index(name='count')
-        error_types['percentage'] = (error_types['count'] / len(error_df) * 100).round(1)
+        # Тип ошибки вычисляется при загрузке, здесь только группировка
+        error_types = aggregate(df, ['error_type'], ['count'], filters, conditions=ERROR_CONDITIONS)
+        error_types['percentage'] = (error_types['count'] / error_types['count'].sum() * 100).round(1)
         
         # Сортируем типы ошибок в нужном порядке
         error_type_order = [
@@ -122,39 +85,11 @@ def show_error_analysis(df):
         )
         error_types = error_types.sort_values('error_type')
         
-        fig_error_types = px.pie(
-            error_types,
-            values='count',
-            names='error_type',
-            title='Распределние по типам ошибочных выходов',
-            color_discrete_sequence=[
-                '#FF6B6B',  # Красный для вопросов не по теме
-                '#FFB366',  # Оранжевый для неуместных вопросов
-                '#FF99CC',  # Розовый для системных ошибок
-                '#B8B8B8'   # Серый для других ошибок
-            ],
-            hover_data=['percentage']
-        )
-        
-        fig_error_types.update_traces(
-            textinfo='percent',
-            textposition='inside'
-        )
-        
-        # Увеличиваем размер диаграммы
-        fig_error_types.update_layout(
-            height=600,
-            showlegend=True,
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1
-            )
+        fig_error_types = cached_figure(
+            'errors.types', filters,
+            lambda: error_types_figure(error_types)
         )
-        
-        st.plotly_chart(fig_error_types, use_container_width=True)
+        st.plotly_chart(fig_error_types, width='stretch')
         
         # Таблица с детализацией типов ошибок
         st.write("### Детализация типов ошибочных выходов")
@@ -194,12 +129,16 @@ def show_error_analysis(df):
             'satisfaction': 'Статус'
         }
         
-        # Фильтруем только ошибочные запросы
-        error_df = df[df['satisfaction'] == 0]
+        # Ключи начала просмотренных страниц; при смене фильтров начинаем с первой
+        pages_key = filters_key(filters)
+        if st.session_state.get('error_pages_key') != pages_key:
+            st.session_state.error_pages_key = pages_key
+            st.session_state.error_cursors = [None]
+        cursors = st.session_state.error_cursors
         
-        # Подготавливаем данные
-        display_df = (error_df[columns_to_show.keys()]
-                     .sort_values(['date', 'question_time'], ascending=[False, False])
+        # Читаем только текущую страницу ошибочных запросов (вместе с текстами)
+        page = fetch_page(df, filters, ERROR_CONDITIONS, after=cursors[-1])
+        display_df = (format_display_columns(page)[columns_to_show.keys()]
                      .rename(columns=columns_to_show)
                      .copy())
         
@@ -215,11 +154,102 @@ def show_error_analysis(df):
             hide_index=True
         )
         
-        # Экспорт данных
-        st.download_button(
-            "📥 Скачать данные (CSV)",
-            display_df.to_csv(index=False).encode('utf-8-sig'),
-            "error_analysis.csv",
-            "text/csv",
-            key='download-csv'
-        )
\ No newline at end of file
+        # Переключение страниц
+        col_prev, col_page, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            if st.button("← Назад", disabled=len(cursors) == 1, key='errors-prev'):
+                cursors.pop()
+                st.rerun()
+        with col_page:
+            st.caption(f"Страница {len(cursors)}")
+        with col_next:
+            if st.button("Далее →", disabled=len(page) < PAGE_SIZE, key='errors-next'):
+                cursors.append(page_cursor(page))
+                st.rerun()
+        
+        # Выгрузка всех ошибочных запросов по текущим фильтрам
+        show_export(filters, ERROR_CONDITIONS, 'error_analysis', key='download-csv')
+
+def category_errors_figure(category_errors):
+    """Распределение ошибочных выходов по категориям"""
+    category_errors = category_errors.rename(columns={'count': 'error_count'})
+    category_errors['error_rate'] = category_errors['error_count'] / category_errors['error_count'].sum() * 100
+    
+    fig_category_errors = px.bar(
+        category_errors.sort_values('error_count', ascending=True),
+        y='category',
+        x='error_count',
+        orientation='h',
+        title='Распределение ошибочных выходов по категориям',
+        labels={
+            'category': 'Категория',
+            'error_count': 'Количество ошибочных выходов',
+        },
+        text=category_errors['error_rate'].round(1).astype(str) + '%'
+    )
+    fig_category_errors.update_traces(
+        textposition='auto',
+        marker_color=COLORS['incorrect_answer']
+    )
+    return fig_category_errors
+
+def subcategory_errors_figure(subcategory_errors):
+    """Распределение ошибочных выходов по подкатегориям учебных запросов (None, если их нет)"""
+    if subcategory_errors.empty:
+        return None
+    subcategory_errors = subcategory_errors.rename(columns={'count': 'error_count'})
+    subcategory_errors['error_rate'] = subcategory_errors['error_count'] / subcategory_errors['error_count'].sum() * 100
+    
+    fig_subcategory_errors = px.bar(
+        subcategory_errors.sort_values('error_count', ascending=True),
+        y='subcategory',
+        x='error_count',
+        orientation='h',
+        title='Распределение ошибочных выходов по подкатегориям учебных запросов',
+        labels={
+            'subcategory': 'Подкатегория',
+            'error_count': 'Количество выходов'
+        },
+        text=subcategory_errors['error_rate'].round(1).astype(str) + '%'
+    )
+    fig_subcategory_errors.update_traces(
+        textposition='auto',
+        marker_color=COLORS['incorrect_answer']
+    )
+    return fig_subcategory_errors
+
+def error_types_figure(error_types):
+    """Распределение по типам ошибочных выходов"""
+    fig_error_types = px.pie(
+        error_types,
+        values='count',
+        names='error_type',
+        title='Распределние по типам ошибочных выходов',
+        color_discrete_sequence=[
+            '#FF6B6B',  # Красный для вопросов не по теме
+            '#FFB366',  # Оранжевый для неуместных вопросов
+            '#FF99CC',  # Розовый для системных ошибок
+            '#B8B8B8'   # Серый для других ошибок
+        ],
+        hover_data=['percentage']
+    )
+
+    fig_error_types.update_traces(
+        textinfo='percent',
+        textposition='inside'
+    )
+
+    # Увеличиваем размер диаграммы
+    fig_error_types.update_layout(
+        height=600,
+        showlegend=True,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        )
+    )
+
+    return fig_error_types
@@ -0,0 +1,87 @@
+import os
+import streamlit as st
+from config import EXPORT_MAX_DOWNLOAD_BYTES
+from src.database.export import (
+    export_to_file, export_too_large, read_export, remove_export, cleanup_exports, EXPORT_FORMATS
+)
+from src.database.filters import filters_key
+
+FORMAT_LABELS = {
+    'csv': 'CSV',
+    'parquet': 'Parquet (zstd)'
+}
+
+def _remove_export(state_key):
+    """Удаляет подготовленный файл выгрузки"""
+    prepared = st.session_state.pop(state_key, None)
+    if prepared:
+        remove_export(prepared['path'])
+
+def _forget_export(state_key):
+    """Забывает скачанную выгрузку (файл удаляет read_export после чтения)"""
+    st.session_state.pop(state_key, None)
+
+def show_export(filters, conditions, file_name, key):
+    """
+    Выгрузка всех строк по текущим фильтрам.
+
+    Файл формируется только по кнопке "Подготовить выгрузку" (потоком из
+    PostgreSQL во временный файл), а не при каждой перерисовке страницы,
+    и читается с диска только при нажатии "Скачать". После скачивания или
+    смены фильтров файл удаляется; забытые выгрузки удаляет cleanup_exports.
+    Streamlit отдает скачиваемый файл из памяти процесса, поэтому файл
+    больше EXPORT_MAX_DOWNLOAD_BYTES не предлагается к скачиванию.
+    """
+    state_key = f'{key}-file'
+    col_format, col_prepare, col_download = st.columns(3)
+    
+    with col_format:
+        fmt = st.selectbox(
+            "Формат выгрузки",
+            list(EXPORT_FORMATS),
+            format_func=FORMAT_LABELS.get,
+            key=f'{key}-format'
+        )
+    
+    # Подготовленный файл действителен только для тех же фильтров и формата
+    request = (filters_key(filters), tuple(sorted((conditions or {}).items())), fmt)
+    prepared = st.session_state.get(state_key)
+    if prepared and (prepared['request'] != request or not os.path.exists(prepared['path'])):
+        _remove_export(state_key)
+        prepared = None
+    
+    with col_prepare:
+        if st.button("Подготовить выгрузку", key=f'{key}-prepare'):
+            _remove_export(state_key)
+            cleanup_exports()
+            try:
+                with st.spinner("Формирование файла..."):
+                    prepared = {'request': request, 'path': export_to_file(filters, conditions, fmt)}
+                if export_too_large(prepared['path']):
+                    size = os.path.getsize(prepared['path'])
+                    remove_export(prepared['path'])
+                    prepared = None
+                    st.warning(
+                        f"Выгрузка занимает {size / 2 ** 20:.0f} МБ, больше предела "
+                        f"{EXPORT_MAX_DOWNLOAD_BYTES / 2 ** 20:.0f} МБ. Сузьте фильтры "
+                        f"или выберите формат Parquet"
+                    )
+                else:
+                    st.session_state[state_key] = prepared
+            except Exception as e:
+                prepared = None
+                st.error(f"Ошибка при формировании выгрузки: {str(e)}")
+    
+    with col_download:
+        if prepared:
+            mime, suffix = EXPORT_FORMATS[fmt]
+            path = prepared['path']
+            st.download_button(
+                f"📥 Скачать данные ({FORMAT_LABELS[fmt]})",
+                lambda: read_export(path),
+                f"{file_name}{suffix}",
+                mime,
+                key=key,
+                on_click=_forget_export,
+                args=(state_key,)
+            )
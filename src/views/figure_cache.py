@@ -0,0 +1,106 @@
+import sys
+import threading
+from collections import OrderedDict
+import plotly.io as pio
+from config import FIGURE_CACHE_MAX_BYTES
+from src.database import get_dataset_version, load_data_version
+from src.database.aggregation import get_aggregation_mode
+from src.database.filters import filters_key
+
+# Общий для всех сессий кэш готовых графиков. При переходе между страницами
+# с теми же фильтрами графики не строятся заново, а запросы для них не
+# выполняются. Графики хранятся в виде JSON (неизменяемая строка, ее
+# размер известен), старые вытесняются по LRU при превышении предела памяти.
+_lock = threading.Lock()
+_figures = OrderedDict()
+_state = {
+    'version': None,
+    'bytes': 0
+}
+_stats = {
+    'hits': 0,
+    'misses': 0,
+    'evictions': 0,
+    'invalidations': 0
+}
+
+def get_data_version():
+    """
+    Версия данных, по которым строятся графики.
+
+    В режиме 'pandas' это версия датасета в памяти, в режимах 'pushdown' и
+    'rollup' — число строк, максимальный id и счетчик изменений таблицы
+    (см. load_data_version).
+    """
+    if get_aggregation_mode() == 'pandas':
+        return get_dataset_version()
+    return load_data_version()
+
+def cached_figure(view, filters, build, **options):
+    """
+    Возвращает график из кэша или строит его функцией build.
+
+    Ключ графика — (view, версия данных, состояние фильтров, options). При
+    смене версии данных кэш очищается целиком. Результат None (панель не
+    показывается) тоже кэшируется, чтобы не повторять запрос.
+
+    Args:
+        view: имя графика, например 'standard.campus'
+        filters: состояние фильтров из select_filters
+        build: функция без аргументов, возвращающая go.Figure или None
+        options: параметры графика, влияющие на его вид (период и т.п.)
+
+    Returns:
+        go.Figure или None
+    """
+    version = get_data_version()
+    if version is None:
+        return build()
+    key = (view, version, filters_key(filters), tuple(sorted(options.items())))
+
+    with _lock:
+        if _state['version'] != version:
+            if _figures:
+                _stats['invalidations'] += 1
+            _figures.clear()
+            _state['bytes'] = 0
+            _state['version'] = version
+        cached = key in _figures
+        if cached:
+            _figures.move_to_end(key)
+            serialized = _figures[key]
+            _stats['hits'] += 1
+        else:
+            _stats['misses'] += 1
+
+    if cached:
+        return None if serialized is None else pio.from_json(serialized)
+
+    figure = build()
+    serialized = None if figure is None else figure.to_json()
+    size = sys.getsizeof(serialized)
+    with _lock:
+        # Версия могла смениться, пока строился график
+        if _state['version'] == version and size <= FIGURE_CACHE_MAX_BYTES and key not in _figures:
+            _figures[key] = serialized
+            _state['bytes'] += size
+            while _state['bytes'] > FIGURE_CACHE_MAX_BYTES:
+                _, evicted = _figures.popitem(last=False)
+                _state['bytes'] -= sys.getsizeof(evicted)
+                _stats['evictions'] += 1
+    return figure
+
+def get_figure_cache_stats():
+    """Счетчики попаданий, промахов и вытеснений, число графиков и занятая память"""
+    with _lock:
+        stats = dict(_stats)
+        stats['figures'] = len(_figures)
+        stats['bytes'] = _state['bytes']
+        stats['version'] = _state['version']
+    return stats
+
+def clear_figure_cache():
+    """Очищает кэш графиков"""
+    with _lock:
+        _figures.clear()
+        _state['bytes'] = 0
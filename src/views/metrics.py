@@ -2,8 +2,9 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 from src.views.standard import calculate_response_time
+from src.database.aggregation import aggregate
 
-def show_metrics(df):
+def show_metrics(df, filters=None):
     """Отображение основных метрик"""
     # Добавляем CSS для современного дизайна
     st.markdown("""
@@ -123,14 +124,17 @@ def show_metrics(df):
     """, unsafe_allow_html=True)
 
     # Вычисляем метрики
-    if len(df) > 0:
-        df = calculate_response_time(df)
-        error_count = len(df[df['satisfaction'] == 0])
-        total_count = len(df)
+    df = calculate_response_time(df)
+    totals = aggregate(
+        df, [], ['count', 'error_count', 'satisfied_count', 'avg_response_time'], filters=filters
+    ).fillna(0).iloc[0]
+    total_count = int(totals['count'])
+    if total_count > 0:
+        error_count = int(totals['error_count'])
         error_rate = (error_count / total_count) * 100
-        avg_response_time = df['response_time'].mean()
-        satisfied_count = len(df[df['satisfaction'] == 1])
-        unsatisfied_count = len(df[df['satisfaction'] == 0])
+        avg_response_time = totals['avg_response_time']
+        satisfied_count = int(totals['satisfied_count'])
+        unsatisfied_count = error_count
         satisfaction_rate = satisfied_count / total_count if total_count > 0 else 0
         
         # Тренды и статусы (инвертируем логику для ошибок)
@@ -161,7 +165,7 @@ def show_metrics(df):
             </div>
         """, unsafe_allow_html=True)
         st.markdown("<div class='metric-button'>", unsafe_allow_html=True)
-        if st.button("❌ Анализ ошибочных выходов", type="primary", use_container_width=True):
+        if st.button("❌ Анализ ошибочных выходов", type="primary", width='stretch'):
             st.session_state.page = 'errors'
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -177,7 +181,7 @@ def show_metrics(df):
             </div>
         """, unsafe_allow_html=True)
         st.markdown("<div class='metric-button'>", unsafe_allow_html=True)
-        if st.button("⏱️ Анализ времени", type="primary", use_container_width=True):
+        if st.button("⏱️ Анализ времени", type="primary", width='stretch'):
             st.session_state.page = 'response_time'
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -193,7 +197,7 @@ def show_metrics(df):
             </div>
         """, unsafe_allow_html=True)
         st.markdown("<div class='metric-button'>", unsafe_allow_html=True)
-        if st.button("📈 Анализ удовлетворенности", type="primary", use_container_width=True):
+        if st.button("📈 Анализ удовлетворенности", type="primary", width='stretch'):
             st.session_state.page = 'success_rate'
         st.markdown("</div>", unsafe_allow_html=True)
     
@@ -206,11 +210,12 @@ def show_metrics(df):
         </div>
     """, unsafe_allow_html=True)
 
-    if len(df) > 0:
-        categories = df['category'].value_counts()
-        main_category = categories.index[0] if not categories.empty else "Нет данных"
-        category_count = categories.iloc[0] if not categories.empty else 0
-        total_requests = len(df)
+    if total_count > 0:
+        categories = aggregate(df, ['category'], ['count'], filters=filters)
+        categories = categories.sort_values('count', ascending=False, kind='mergesort')
+        main_category = categories['category'].iloc[0] if not categories.empty else "Нет данных"
+        category_count = int(categories['count'].iloc[0]) if not categories.empty else 0
+        total_requests = total_count
         category_percentage = (category_count / total_requests * 100) if total_requests > 0 else 0
         
         st.markdown(f"""
@@ -225,6 +230,6 @@ def show_metrics(df):
         """, unsafe_allow_html=True)
 
         st.markdown("<div style='margin-top: 10px;'>", unsafe_allow_html=True)
-        if st.button("🔍 Детальный анализ категорий", type="primary", use_container_width=True):
+        if st.button("🔍 Детальный анализ категорий", type="primary", width='stretch'):
             st.session_state.page = 'categories'
         st.markdown("</div>", unsafe_allow_html=True)
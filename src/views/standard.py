@@ -2,37 +2,42 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 from src.utils import COLORS
-from datetime import datetime, timedelta
+from src.database import format_display_columns
+from src.database.aggregation import aggregate, fetch_concurrently, has_rows
+from src.database.pagination import fetch_page
+from src.views.developer import SATISFACTION_CONDITIONS
+from src.views.export import show_export
+from src.views.figure_cache import cached_figure
+import pandas as pd
 
 def calculate_response_time(df):
-    """Вычисляет время ответа для каждой строки"""
-    def time_diff(row):
-        q_time = row['question_time']
-        a_time = row['answer_time']
-        
-        base_date = datetime.now().date()
-        q_datetime = datetime.combine(base_date, q_time)
-        a_datetime = datetime.combine(base_date, a_time)
-        
-        if a_datetime < q_datetime:
-            a_datetime = a_datetime + timedelta(days=1)
-            
-        return (a_datetime - q_datetime).total_seconds()
+    """
+    Вычисляет время ответа для каждой строки.
+
+    Данные из базы уже содержат колонку response_time (она считается один раз
+    при загрузке), поэтому расчет выполняется только для других источников.
+    """
+    if 'response_time' in df.columns:
+        return df
     
-    df['response_time'] = df.apply(time_diff, axis=1)
-    return df
+    q_time = pd.to_timedelta(df['question_time'].astype(str))
+    a_time = pd.to_timedelta(df['answer_time'].astype(str))
+    
+    # Если ответ "раньше" вопроса, значит он пришел после полуночи;
+    # assign возвращает копию, переданный DataFrame не меняется
+    return df.assign(response_time=(a_time - q_time).dt.total_seconds() % 86400)
 
-def show_standard_view(df, section='all'):
+def show_standard_view(df, section='all', filters=None):
     """Отображение стандартного режима с фокусом на определенной метрике"""
     # Сначала вычисляем время ответа для всех случаев
     df = calculate_response_time(df)
     
     if section == 'response_time':
-        show_response_time_analysis(df)
+        show_response_time_analysis(df, filters)
     else:
-        show_full_analysis(df)
+        show_full_analysis(df, filters)
 
-def show_full_analysis(df):
+def show_full_analysis(df, filters=None):
     """Отображение стандартного режима"""
     col_back, _ = st.columns([1, 4])
     with col_back:
@@ -40,123 +45,154 @@ def show_full_analysis(df):
             st.session_state.page = 'main'
             st.rerun()
     
-    # Создаем две колонки для графиков
+    # Создаем две колонки для графиков; панели заполняются по мере
+    # готовности данных
     col1, col2 = st.columns(2)
-    
-    with col1:
-        # График распределения по кампусам
-        campus_stats = df.groupby('campus').size().reset_index(name='count')
-        total_count = campus_stats['count'].sum()
-        # Изменяем способ расчета процентов, чтобы сумма всегда была ровно 100%
-        percentages = []
-        running_total = 0
-        for i, count in enumerate(campus_stats['count']):
-            if i == len(campus_stats) - 1:
-                # Для последнего элемента берем остаток до 100%
-                percentage = 100 - running_total
-            else:
-                percentage = (count / total_count * 100).round(1)
-                running_total += percentage
-            percentages.append(percentage)
-        
-        campus_stats['percentage'] = percentages
-        
-        fig_campus = px.pie(
-            campus_stats,
-            values='count',
-            names='campus',
-            title='Распределение запросов по кампусам',
-            color_discrete_sequence=px.colors.qualitative.Set3,
-            hover_data=['percentage']
+    placeholders = {'campus': col1.empty(), 'category_errors': col2.empty()}
+    # Готовые графики берутся из кэша без запросов к данным
+    tasks = {
+        'campus': lambda: cached_figure(
+            'standard.campus', filters,
+            lambda: campus_figure(aggregate(df, ['campus'], ['count'], filters))
+        ),
+        'category_errors': lambda: cached_figure(
+            'standard.category_errors', filters,
+            lambda: category_errors_figure(aggregate(df, ['category'], ['count', 'error_count'], filters))
         )
-        
-        st.plotly_chart(fig_campus, use_container_width=True)
-    
-    with col2:
-        # График распределения ошибок по категориям
-        error_df = df[df['satisfaction'] == 0]
-        # Добавляем проверку на количество уникальных категорий
-        if not error_df.empty and df['category'].nunique() > 1:
-            category_errors = error_df.groupby('category').size().reset_index(name='count')
-            category_errors['percentage'] = (category_errors['count'] / len(error_df) * 100).round(1)
-            
-            fig_category_errors = px.pie(
-                category_errors,
-                values='count',
-                names='category',
-                title='Распределение неудовлетворенности по категориям',
-                color_discrete_sequence=px.colors.qualitative.Set3,
-                hover_data=['percentage']
-            )
-            fig_category_errors.update_traces(
-                textposition='inside',
-                textinfo='percent'
-            )
-            st.plotly_chart(fig_category_errors, use_container_width=True)
+    }
     
     # Последние запросы
     st.write("### Последние запросы")
-    if len(df) > 0:
+    if has_rows(df, filters):
         # Добавляем фильтр удовлетворенности
         satisfaction_filter = st.selectbox(
             "Фильтр по удовлетворенности",
             ['Все', 'Удовлетворительно', 'Неудовлетворительно']
         )
+        conditions = SATISFACTION_CONDITIONS[satisfaction_filter]
+        placeholders['recent'] = st.empty()
+        # Десять последних запросов без сортировки всех строк
+        tasks['recent'] = lambda: fetch_page(df, filters, conditions, limit=10)
         
-        # Определяем колонки и их русские названия
-        columns_to_show = {
-            'date': 'Дата',
-            'question_time': 'Время вопроса',
-            'answer_time': 'Время ответа',
-            'name': 'Имя',
-            'campus': 'Кампус',
-            'education_level': 'Уровень образования',
-            'category': 'Категория',
-            'subcategory': 'Подкатегория',
-            'query': 'Запрос',
-            'response': 'Ответ',
-            'satisfaction': 'Статус'
-        }
-        
-        # Применяем фильтр
-        if satisfaction_filter == 'Удовлетворительно':
-            filtered_df = df[df['satisfaction'] == 1]
-        elif satisfaction_filter == 'Неудовлетворительно':
-            filtered_df = df[df['satisfaction'] == 0]
+        # Выгрузка всех строк по текущим фильтрам
+        show_export(filters, conditions, 'chatbot_analysis', key='download-csv')
+    else:
+        st.info("Нет данных для отображения")
+    
+    # Данные всех панелей запрашиваются одновременно
+    renderers = {
+        'campus': show_figure,
+        'category_errors': show_figure,
+        'recent': show_recent_requests
+    }
+    show_panels(tasks, placeholders, renderers)
+
+def show_panels(tasks, placeholders, renderers):
+    """
+    Запрашивает данные панелей одновременно и выводит каждую в ее место.
+
+    Ошибка запроса показывается только в панели, для которой он шел.
+    """
+    for name, result in fetch_concurrently(tasks):
+        with placeholders[name].container():
+            if isinstance(result, Exception):
+                st.error(f"Ошибка при загрузке данных панели: {str(result)}")
+            else:
+                renderers[name](result)
+
+def show_figure(figure):
+    """Вывод графика (None — панель не показывается)"""
+    if figure is not None:
+        st.plotly_chart(figure, width='stretch')
+
+def campus_figure(campus_stats):
+    """График распределения по кампусам"""
+    total_count = campus_stats['count'].sum()
+    # Изменяем способ расчета процентов, чтобы сумма всегда была ровно 100%
+    percentages = []
+    running_total = 0
+    for i, count in enumerate(campus_stats['count']):
+        if i == len(campus_stats) - 1:
+            # Для последнего элемента берем остаток до 100%
+            percentage = 100 - running_total
         else:
-            filtered_df = df
-        
-        # Подготавливаем данные
-        recent_requests = filtered_df.sort_values(['date', 'question_time'], ascending=[False, False]).head(10)
-        
-        # Переименовываем колонки и меняем значения в столбце статуса
-        display_df = (recent_requests[columns_to_show.keys()]
-                     .rename(columns=columns_to_show)
-                     .copy())
-        
-        display_df['Статус'] = display_df['Статус'].map({
-            1: '✅ Удовлетворительно',
-            0: '❌ Неудовлетворительно'
-        })
+            percentage = (count / total_count * 100).round(1)
+            running_total += percentage
+        percentages.append(percentage)
+    
+    campus_stats = campus_stats.assign(percentage=percentages)
+    
+    fig_campus = px.pie(
+        campus_stats,
+        values='count',
+        names='campus',
+        title='Распределение запросов по кампусам',
+        color_discrete_sequence=px.colors.qualitative.Set3,
+        hover_data=['percentage']
+    )
+    return fig_campus
+
+def category_errors_figure(category_stats):
+    """График распределения ошибок по категориям (None, если ошибок нет)"""
+    total_errors = category_stats['error_count'].sum()
+    # Добавляем проверку на количество уникальных категорий
+    if total_errors > 0 and len(category_stats) > 1:
+        category_errors = (category_stats[category_stats['error_count'] > 0]
+                           [['category', 'error_count']]
+                           .rename(columns={'error_count': 'count'}))
+        category_errors['percentage'] = (category_errors['count'] / total_errors * 100).round(1)
         
-        # Отображаем таблицу
-        st.dataframe(
-            display_df.reset_index(drop=True),
-            hide_index=True
+        fig_category_errors = px.pie(
+            category_errors,
+            values='count',
+            names='category',
+            title='Распределение неудовлетворенности по категориям',
+            color_discrete_sequence=px.colors.qualitative.Set3,
+            hover_data=['percentage']
         )
-        
-        # Добавляем кнопку для скачивания CSV
-        st.download_button(
-            label="📥 Скачать данные (CSV)",
-            data=display_df.to_csv(index=False).encode('utf-8-sig'),
-            file_name="chatbot_analysis.csv",
-            mime="text/csv",
-            key='download-csv'
+        fig_category_errors.update_traces(
+            textposition='inside',
+            textinfo='percent'
         )
-    else:
-        st.info("Нет данных для отображения")
+        return fig_category_errors
+    return None
 
-def show_response_time_analysis(df):
+def show_recent_requests(recent_requests):
+    """Таблица последних запросов"""
+    # Определяем колонки и их русские названия
+    columns_to_show = {
+        'date': 'Дата',
+        'question_time': 'Время вопроса',
+        'answer_time': 'Время ответа',
+        'name': 'Имя',
+        'campus': 'Кампус',
+        'education_level': 'Уровень образования',
+        'category': 'Категория',
+        'subcategory': 'Подкатегория',
+        'query': 'Запрос',
+        'response': 'Ответ',
+        'satisfaction': 'Статус'
+    }
+    
+    recent_requests = format_display_columns(recent_requests)
+    
+    # Переименовываем колонки и меняем значения в столбце статуса
+    display_df = (recent_requests[columns_to_show.keys()]
+                 .rename(columns=columns_to_show)
+                 .copy())
+    
+    display_df['Статус'] = display_df['Статус'].map({
+        1: '✅ Удовлетворительно',
+        0: '❌ Неудовлетворительно'
+    })
+    
+    # Отображаем таблицу
+    st.dataframe(
+        display_df.reset_index(drop=True),
+        hide_index=True
+    )
+
+def show_response_time_analysis(df, filters=None):
     """Анализ времени ответа"""
     col_back, col_title = st.columns([1, 4])
     with col_back:
@@ -166,7 +202,7 @@ def show_response_time_analysis(df):
     with col_title:
         st.title("⏱️ Анализ времени ответа")
 
-    if len(df) > 0:
+    if has_rows(df, filters):
         # Добавляем селектор периода только для анализа времени ответа
         time_period = st.selectbox(
             "Группировать по",
@@ -176,113 +212,153 @@ def show_response_time_analysis(df):
         
         # Используем период из селектора
         if time_period == "Часам":
-            df['period'] = df['timestamp'].dt.hour
+            period = 'hour'
             period_name = 'часам'
         elif time_period == "Дням":
-            df['period'] = df['timestamp'].dt.date
+            period = 'date'
             period_name = 'дням'
         elif time_period == "Неделям":
-            df['period'] = df['timestamp'].dt.isocalendar().week
+            period = 'week'
             period_name = 'неделям'
         else:  # Месяцы
-            # Convert Period to string for months
-            df['period'] = df['timestamp'].dt.strftime('%Y-%m')
+            period = 'month'
             period_name = 'Месяцам'
         
-        # Group and aggregate data
-        period_stats = df.groupby('period', as_index=False).agg({
-            'response_time': ['mean', 'count']
-        })
-        period_stats.columns = ['period', 'avg_response_time', 'count']
-        
-        # Sort values
-        period_stats = period_stats.sort_values('period')
-        
-        # Create figure
-        fig_time = go.Figure()
-        
-        # Add traces
-        fig_time.add_trace(go.Bar(
-            x=period_stats['period'].astype(str),  # Convert to string
-            y=period_stats['count'],
-            name='Количество запросов',
-            marker_color='lightblue'
-        ))
-        
-        fig_time.add_trace(go.Scatter(
-            x=period_stats['period'].astype(str),  # Convert to string
-            y=period_stats['avg_response_time'],
-            name='Среднее время ответа (сек)',
-            yaxis='y2',
-            line=dict(color='orange', width=2)
-        ))
-        
-        # Update layout
-        fig_time.update_layout(
-            title=f'Распределение времени ответа по {period_name}',
-            xaxis_title=period_name.capitalize(),
-            yaxis_title='Количество запросов',
-            yaxis2=dict(
-                title='Среднее время ответа (сек)',
-                overlaying='y',
-                side='right'
-            ),
-            hovermode='x unified'
-        )
-        
-        # Rotate labels if needed
-        if time_period != "Часы":
-            fig_time.update_xaxes(tickangle=45)
-        
-        st.plotly_chart(fig_time, use_container_width=True)
-        
-        # Статистика по времени ответа
+        # Места панелей на странице; данные для них запрашиваются одновременно
+        # и каждая панель отрисовывается, как только готовы ее данные
+        placeholders = {'period': st.empty()}
         col1, col2 = st.columns(2)
-        with col1:
-            response_stats = df['response_time'].describe()
-            st.write("### 📊 Статистика времени ответа")
-            stats_data = {
-                'Метрика': ['Среднее', 'Медиана', 'Минимум', 'Максимум'],
-                'Значение': [
-                    response_stats['mean'],
-                    response_stats['50%'],
-                    response_stats['min'],
-                    response_stats['max']
-                ]
-            }
-            
-            fig_stats = px.bar(
-                stats_data,
-                x='Метрика',
-                y='Значение',
-                title='Статистика времени ответа (в секундах)',
-                color_discrete_sequence=[COLORS['success']]
-            )
-            fig_stats.update_traces(
-                text=fig_stats.data[0].y.round(2),
-                textposition='outside'
-            )
-            st.plotly_chart(fig_stats, use_container_width=True)
-        
-        with col2:
-            # Распределение времени ответа по категориям
-            # Проверяем, выбрана ли конкретная категория
-            if df['category'].nunique() > 1:  # если больше одной категории
-                category_time = df.groupby('category')['response_time'].mean().sort_values(ascending=True)
-                st.write("### 📈 Среднее время ответа по категориям")
-                
-                fig_category_time = px.bar(
-                    x=category_time.values,
-                    y=category_time.index,
-                    orientation='h',
-                    title='Среднее время ответа по категориям',
-                    labels={'x': 'Время (сек)', 'y': 'Категория'},
-                    color_discrete_sequence=[COLORS['success']]
-                )
-                fig_category_time.update_traces(
-                    text=category_time.values.round(2),
-                    textposition='outside'
+        placeholders['stats'] = col1.empty()
+        placeholders['category_time'] = col2.empty()
+        tasks = {
+            # Уже отсортировано по периоду
+            'period': lambda: cached_figure(
+                'standard.period', filters,
+                lambda: period_figure(
+                    aggregate(df, [period], ['avg_response_time', 'count'], filters),
+                    time_period, period_name
+                ),
+                period=period
+            ),
+            'stats': lambda: cached_figure(
+                'standard.response_stats', filters,
+                lambda: response_stats_figure(aggregate(
+                    df, [],
+                    ['avg_response_time', 'median_response_time', 'min_response_time', 'max_response_time'],
+                    filters
+                ))
+            ),
+            'category_time': lambda: cached_figure(
+                'standard.category_time', filters,
+                lambda: category_response_time_figure(
+                    aggregate(df, ['category'], ['avg_response_time'], filters)
                 )
-                st.plotly_chart(fig_category_time, use_container_width=True)
+            )
+        }
+        renderers = {
+            'period': show_figure,
+            'stats': show_response_stats,
+            'category_time': show_category_response_time
+        }
+        show_panels(tasks, placeholders, renderers)
     else:
         st.info("Нет данных для анализа")
+
+def period_figure(period_stats, time_period, period_name):
+    """Количество запросов и среднее время ответа по периодам"""
+    period_stats.columns = ['period', 'avg_response_time', 'count']
+    
+    # Create figure
+    fig_time = go.Figure()
+    
+    # Add traces
+    fig_time.add_trace(go.Bar(
+        x=period_stats['period'].astype(str),  # Convert to string
+        y=period_stats['count'],
+        name='Количество запросов',
+        marker_color='lightblue'
+    ))
+    
+    fig_time.add_trace(go.Scatter(
+        x=period_stats['period'].astype(str),  # Convert to string
+        y=period_stats['avg_response_time'],
+        name='Среднее время ответа (сек)',
+        yaxis='y2',
+        line=dict(color='orange', width=2)
+    ))
+    
+    # Update layout
+    fig_time.update_layout(
+        title=f'Распределение времени ответа по {period_name}',
+        xaxis_title=period_name.capitalize(),
+        yaxis_title='Количество запросов',
+        yaxis2=dict(
+            title='Среднее время ответа (сек)',
+            overlaying='y',
+            side='right'
+        ),
+        hovermode='x unified'
+    )
+    
+    # Rotate labels if needed
+    if time_period != "Часы":
+        fig_time.update_xaxes(tickangle=45)
+    return fig_time
+
+def show_response_stats(fig_stats):
+    """Статистика по времени ответа"""
+    st.write("### 📊 Статистика времени ответа")
+    st.plotly_chart(fig_stats, width='stretch')
+
+def response_stats_figure(response_stats):
+    """График статистики времени ответа"""
+    response_stats = response_stats.iloc[0]
+    stats_data = {
+        'Метрика': ['Среднее', 'Медиана', 'Минимум', 'Максимум'],
+        'Значение': [
+            response_stats['avg_response_time'],
+            response_stats['median_response_time'],
+            response_stats['min_response_time'],
+            response_stats['max_response_time']
+        ]
+    }
+    
+    fig_stats = px.bar(
+        stats_data,
+        x='Метрика',
+        y='Значение',
+        title='Статистика времени ответа (в секундах)',
+        color_discrete_sequence=[COLORS['success']]
+    )
+    fig_stats.update_traces(
+        text=fig_stats.data[0].y.round(2),
+        textposition='outside'
+    )
+    return fig_stats
+
+def show_category_response_time(fig_category_time):
+    """Распределение времени ответа по категориям"""
+    if fig_category_time is not None:
+        st.write("### 📈 Среднее время ответа по категориям")
+        st.plotly_chart(fig_category_time, width='stretch')
+
+def category_response_time_figure(category_stats):
+    """График среднего времени ответа по категориям (None, если категория одна)"""
+    category_time = (category_stats
+                     .set_index('category')['avg_response_time']
+                     .sort_values(ascending=True))
+    if len(category_time) > 1:  # если больше одной категории
+        fig_category_time = px.bar(
+            x=category_time.values,
+            y=category_time.index,
+            orientation='h',
+            title='Среднее время ответа по категориям',
+            labels={'x': 'Время (сек)', 'y': 'Категория'},
+            color_discrete_sequence=[COLORS['success']]
+        )
+        fig_category_time.update_traces(
+            text=category_time.values.round(2),
+            textposition='outside'
+        )
+        return fig_category_time
+    return None
@@ -1,10 +1,9 @@
-import psycopg2
-from config import DB_CONFIG
+from src.database.pool import connect
 
 def test_database():
     try:
         # Подключаемся к базе данных
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = connect()
         cursor = conn.cursor()
         
         # Проверяем количество записей
@@ -37,11 +36,11 @@ def test_database():
 
 if __name__ == "__main__":
     test_database()
-from config import DB_CONFIG
+from src.database.pool import connect
 
 def test_connection():
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = connect()
         print("Successfully connected to the database!")
         conn.close()
         return True
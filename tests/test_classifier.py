@@ -0,0 +1,42 @@
+import pandas as pd
+from src.ingest.classifier import classify_errors
+
+# Классификация до переноса в загрузку (src/views/error_analysis.py)
+def categorize_error(response):
+    response = response.lower()
+    if 'система не отвечает' in response:
+        return 'Система не отвечает'
+    elif 'не относится к вшэ' in response:
+        return 'Вопрос не относится к ВШЭ'
+    elif 'неуместно' in response:
+        return 'Неуместный вопрос'
+    else:
+        return 'Другие ошибки'
+
+RESPONSES = [
+    'Система не отвечает, попробуйте позже',
+    'Вопрос не относится к ВШЭ',
+    'Это неуместно',
+    'Это неуместно, и вопрос не относится к вшэ',
+    'Неуместно: система не отвечает',
+    'СИСТЕМА НЕ ОТВЕЧАЕТ',
+    'Не знаю ответа',
+    ''
+]
+
+def test_matches_categorize_error():
+    responses = pd.Series(RESPONSES)
+    result = classify_errors(responses, pd.Series(0, index=responses.index))
+    assert result.tolist() == [categorize_error(response) for response in RESPONSES]
+
+def test_overlapping_phrases_use_priority():
+    # Фраза второго правила начинается раньше и пересекается с фразой первого
+    rules = [('Первое', ['бвг']), ('Второе', ['аб'])]
+    responses = pd.Series(['абвг', 'аб', 'вг'])
+    result = classify_errors(responses, pd.Series(0, index=responses.index), rules)
+    assert result.tolist() == ['Первое', 'Второе', 'Другие ошибки']
+
+def test_only_failed_responses():
+    responses = pd.Series(['Система не отвечает', 'Система не отвечает', None])
+    result = classify_errors(responses, pd.Series([1, 0, 0]))
+    assert result.tolist() == [None, 'Система не отвечает', 'Другие ошибки']